@@ -0,0 +1,48 @@
+"""on delete cascade and user soft delete
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table)
+foreign_keys = [
+    ("BBR_tasks", "user_id", "BBR_users"),
+    ("BBR_tags", "task_id", "BBR_tasks"),
+    ("BBR_taskdescriptionlists", "task_id", "BBR_tasks"),
+    ("BBR_taskdescriptions", "description_list_id", "BBR_taskdescriptionlists"),
+]
+
+
+def _recreate_foreign_keys(ondelete) -> None:
+    for table, column, referred_table in foreign_keys:
+        name = f"{table}_{column}_fkey"
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(
+            name, table, referred_table, [column], ["id"], ondelete=ondelete
+        )
+
+
+def upgrade() -> None:
+    _recreate_foreign_keys("CASCADE")
+    op.add_column(
+        "BBR_users",
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("BBR_users", "deleted_at")
+    _recreate_foreign_keys(None)
@@ -0,0 +1,85 @@
+"""sync versions and tombstones
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = [
+    "BBR_tasks",
+    "BBR_tags",
+    "BBR_taskdescriptionlists",
+    "BBR_taskdescriptions",
+]
+
+
+def upgrade() -> None:
+    # Existing rows start at version 0, they reach clients in a full sync
+    op.execute(sa.schema.CreateSequence(sa.Sequence("BBR_sync_version_seq")))
+    for table in SYNCED_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "version",
+                sa.BigInteger(),
+                nullable=False,
+                server_default="0",
+            ),
+        )
+        op.add_column(
+            table,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.func.now(),
+            ),
+        )
+        op.create_index(f"ix_{table}_version", table, ["version"])
+    op.create_index(
+        "ix_BBR_tasks_user_id_version", "BBR_tasks", ["user_id", "version"]
+    )
+
+    op.create_table(
+        "BBR_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entity", sa.String(30), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("BBR_users.id", ondelete="CASCADE"),
+            nullable=True,
+        ),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_BBR_tombstones_user_id", "BBR_tombstones", ["user_id"])
+    op.create_index(
+        "ix_BBR_tombstones_user_id_version",
+        "BBR_tombstones",
+        ["user_id", "version"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("BBR_tombstones")
+    op.drop_index("ix_BBR_tasks_user_id_version", "BBR_tasks")
+    for table in SYNCED_TABLES:
+        op.drop_index(f"ix_{table}_version", table)
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "version")
+    op.execute(sa.schema.DropSequence(sa.Sequence("BBR_sync_version_seq")))
@@ -0,0 +1,66 @@
+"""user_id on tags, description lists and descriptions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.api.src.config.backfill import BACKFILLS, run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Child table and the column indexed next to user_id. Lists before
+# descriptions, descriptions copy the user from their list.
+CHILD_TABLES = [
+    ("BBR_tags", None),
+    ("BBR_taskdescriptionlists", "task_id"),
+    ("BBR_taskdescriptions", "description_list_id"),
+]
+
+
+def upgrade() -> None:
+    for table, _ in CHILD_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("BBR_users.id", ondelete="CASCADE"),
+                nullable=True,
+            ),
+        )
+    # In batches, and indexes built after the rows are filled in
+    indexes = []
+    for table, scoped in CHILD_TABLES:
+        indexes += [
+            (f"ix_{table}_user_id", table, ["user_id"]),
+            (f"ix_{table}_user_id_version", table, ["user_id", "version"]),
+        ]
+        if scoped:
+            indexes.append(
+                (f"ix_{table}_user_id_{scoped}", table, ["user_id", scoped])
+            )
+    run_in_migration(
+        [BACKFILLS[f"{table}.user_id"] for table, _ in CHILD_TABLES],
+        indexes,
+    )
+
+
+def downgrade() -> None:
+    for table, scoped in CHILD_TABLES:
+        if scoped:
+            op.drop_index(f"ix_{table}_user_id_{scoped}", table)
+        op.drop_index(f"ix_{table}_user_id_version", table)
+        op.drop_index(f"ix_{table}_user_id", table)
+        op.drop_column(table, "user_id")
@@ -0,0 +1,94 @@
+"""optional hash partitioning of routine tables by user_id
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:00:00.000000
+
+Only partitions when asked for, e.g. `alembic -x partitions=16 upgrade
+head`, otherwise the revision is recorded and changes nothing. See
+backend/api/src/config/partitions.py for the partitioned layout. The
+downgrade rewrites the tables back, locking them until it commits.
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from backend.api.src.config.partitions import (
+    is_partitioned,
+    partition_ddl,
+    unpartition_ddl,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The routine tables and their indexes as of this revision. Indexes added
+# later are created by their own revisions on either layout.
+TABLES = [
+    (
+        "BBR_tasks",
+        [
+            ["id"],
+            ["title"],
+            ["user_id"],
+            ["sort_order"],
+            ["version"],
+            ["user_id", "version"],
+        ],
+    ),
+    (
+        "BBR_tags",
+        [
+            ["id"],
+            ["title"],
+            ["task_id"],
+            ["user_id"],
+            ["version"],
+            ["user_id", "version"],
+        ],
+    ),
+    (
+        "BBR_taskdescriptionlists",
+        [
+            ["id"],
+            ["title"],
+            ["task_id"],
+            ["user_id"],
+            ["version"],
+            ["user_id", "task_id"],
+            ["user_id", "version"],
+        ],
+    ),
+    (
+        "BBR_taskdescriptions",
+        [
+            ["id"],
+            ["description"],
+            ["description_list_id"],
+            ["user_id"],
+            ["version"],
+            ["user_id", "description_list_id"],
+            ["user_id", "version"],
+        ],
+    ),
+]
+
+
+def upgrade() -> None:
+    partitions = context.get_x_argument(as_dictionary=True).get("partitions")
+    if not partitions:
+        return
+    for statement in partition_ddl(int(partitions), TABLES):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if not is_partitioned(op.get_bind()):
+        return
+    for statement in unpartition_ddl(TABLES):
+        op.execute(statement)
@@ -0,0 +1,65 @@
+"""copy-on-write template references
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 12:00:00.000000
+
+Partitioned routine tables have no foreign keys between them, see
+backend/api/src/config/partitions.py, so there the new columns are plain.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.api.src.config.partitions import is_partitioned
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Table, new column, the table it references and on delete
+REFERENCES = [
+    ("BBR_tasks", "template_id", "BBR_tasks", None),
+    (
+        "BBR_taskdescriptionlists",
+        "template_list_id",
+        "BBR_taskdescriptionlists",
+        "SET NULL",
+    ),
+    (
+        "BBR_taskdescriptions",
+        "template_description_id",
+        "BBR_taskdescriptions",
+        "SET NULL",
+    ),
+]
+
+
+def upgrade() -> None:
+    partitioned = is_partitioned(op.get_bind())
+    for table, column, referred, ondelete in REFERENCES:
+        op.add_column(
+            table,
+            sa.Column(
+                column,
+                sa.Integer(),
+                *(
+                    []
+                    if partitioned
+                    else [sa.ForeignKey(f"{referred}.id", ondelete=ondelete)]
+                ),
+                nullable=True,
+            ),
+        )
+    op.create_index("ix_BBR_tasks_template_id", "BBR_tasks", ["template_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_BBR_tasks_template_id", "BBR_tasks")
+    for table, column, _, _ in reversed(REFERENCES):
+        op.drop_column(table, column)
@@ -0,0 +1,38 @@
+"""tag filter and facets index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+from backend.api.src.config.backfill import run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently, tags are written while it runs
+    run_in_migration(
+        [],
+        [
+            (
+                "ix_BBR_tags_user_id_title_task_id",
+                "BBR_tags",
+                ["user_id", "title", "task_id"],
+            )
+        ],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_BBR_tags_user_id_title_task_id", "BBR_tags")
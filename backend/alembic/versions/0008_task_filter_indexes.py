@@ -0,0 +1,64 @@
+"""task list filter indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+from backend.api.src.config.backfill import run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    "ix_BBR_tasks_user_id_sort_order_active",
+    "ix_BBR_tasks_user_id_task_category_id_sort_order",
+    "ix_BBR_tasks_user_id_lower_title",
+]
+
+
+def upgrade() -> None:
+    postgres = op.get_context().dialect.name == "postgresql"
+    # Built concurrently, tasks are written while they run
+    run_in_migration(
+        [],
+        [
+            (
+                "ix_BBR_tasks_user_id_sort_order_active",
+                "BBR_tasks",
+                ["user_id", "sort_order"],
+                "is_active" if postgres else "is_active = 1",
+            ),
+            (
+                "ix_BBR_tasks_user_id_task_category_id_sort_order",
+                "BBR_tasks",
+                ["user_id", "task_category_id", "sort_order"],
+            ),
+            (
+                "ix_BBR_tasks_user_id_lower_title",
+                "BBR_tasks",
+                [
+                    "user_id",
+                    (
+                        "lower(title) text_pattern_ops"
+                        if postgres
+                        else "lower(title)"
+                    ),
+                ],
+            ),
+        ],
+    )
+
+
+def downgrade() -> None:
+    for name in reversed(INDEXES):
+        op.drop_index(name, "BBR_tasks")
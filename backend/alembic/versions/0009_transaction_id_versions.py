@@ -0,0 +1,60 @@
+"""transaction id sync versions
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Revision 0003 left the clock to create_all, sqlite writes need it
+    if not sa.inspect(op.get_bind()).has_table("BBR_sync_clock"):
+        op.create_table(
+            "BBR_sync_clock",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.BigInteger(), nullable=False),
+        )
+    if op.get_context().dialect.name != "postgresql":
+        return
+    # Transaction ids start over from the sequence, the offset keeps the
+    # new versions above every version a client has already synced
+    op.execute(
+        """
+        INSERT INTO "BBR_sync_clock" (id, version)
+        SELECT 1, last_value FROM "BBR_sync_version_seq"
+        ON CONFLICT (id) DO UPDATE SET version = excluded.version
+        """
+    )
+    op.execute(sa.schema.DropSequence(sa.Sequence("BBR_sync_version_seq")))
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    # Continues above the highest transaction id version handed out
+    op.execute(sa.schema.CreateSequence(sa.Sequence("BBR_sync_version_seq")))
+    op.execute(
+        """
+        SELECT setval(
+            '"BBR_sync_version_seq"',
+            pg_current_xact_id()::text::bigint
+            + coalesce(
+                (SELECT version FROM "BBR_sync_clock" WHERE id = 1), 0
+            )
+        )
+        """
+    )
+    op.execute('DELETE FROM "BBR_sync_clock" WHERE id = 1')
@@ -0,0 +1,104 @@
+"""Payload size and encode CPU per response format for task trees.
+
+    python -m backend.api.bench.encodings [tasks] [lists] [descriptions]
+"""
+import sys
+import time
+
+from pydantic import TypeAdapter
+
+from backend.api.src.routes.descriptionlists.schemas import (
+    Tag,
+    TaskDescriptionList,
+)
+from backend.api.src.routes.descriptions.schemas import TaskDescription
+from backend.api.src.routes.tasks.schemas import Task
+from backend.api.src.routes.utils.encoding import (
+    brotli,
+    compress_body,
+    encode_body,
+    msgpack,
+)
+
+
+def build_tasks(tasks: int, lists: int, descriptions: int):
+    return [
+        Task(
+            id=task_id,
+            title=f"Morning routine {task_id}",
+            task_category_id=task_id % 5 + 1,
+            is_active=task_id % 3 != 0,
+            user_id=1,
+            sort_order=task_id * 100,
+            tags=[
+                Tag(id=task_id * 10 + n, title=f"tag {n}", task_id=task_id)
+                for n in range(3)
+            ],
+            description_lists=[
+                TaskDescriptionList(
+                    id=task_id * 100 + list_id,
+                    title=f"Steps {list_id}",
+                    task_id=task_id,
+                    descriptions=[
+                        TaskDescription(
+                            id=task_id * 10000 + list_id * 100 + n,
+                            description=f"Hold the stretch for {n} breaths",
+                            description_list_id=task_id * 100 + list_id,
+                        )
+                        for n in range(descriptions)
+                    ],
+                )
+                for list_id in range(lists)
+            ],
+        )
+        for task_id in range(tasks)
+    ]
+
+
+def measure(fn, repeat: int = 5):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(tasks: int = 100, lists: int = 3, descriptions: int = 8):
+    payload = build_tasks(tasks, lists, descriptions)
+    json_body, json_cpu = measure(
+        lambda: TypeAdapter(list[Task]).dump_json(payload)
+    )
+
+    formats = [("json", "application/json", None)]
+    formats.append(("json+gzip", "application/json", "gzip"))
+    if brotli is not None:
+        formats.append(("json+br", "application/json", "br"))
+    if msgpack is not None:
+        formats.append(("msgpack", "application/msgpack", None))
+        formats.append(("msgpack+gzip", "application/msgpack", "gzip"))
+        if brotli is not None:
+            formats.append(("msgpack+br", "application/msgpack", "br"))
+
+    print(
+        f"{tasks} tasks x {lists} lists x {descriptions} descriptions, "
+        f"json serialization {json_cpu * 1000:.2f} ms cpu"
+    )
+    print(f"{'format':<14}{'bytes':>10}{'ratio':>8}{'encode ms cpu':>15}")
+    for name, media_type, content_encoding in formats:
+        body, cpu = measure(
+            lambda: compress_body(
+                encode_body(json_body, media_type), content_encoding
+            )
+        )
+        print(
+            f"{name:<14}{len(body):>10}{len(body) / len(json_body):>8.2f}"
+            f"{cpu * 1000:>15.2f}"
+        )
+    if brotli is None or msgpack is None:
+        print("Install brotli and msgpack to benchmark all formats")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,166 @@
+"""Rows read and bytes sent for filtered task lists, fetching every task
+and filtering on the client against the is_active, task_category_id and
+title_prefix filters in SQL. Runs on a scratch sqlite file unless
+BENCH_DATABASE_URL is set, the routine tables there are dropped and
+recreated. Prints the plan of each filtered statement, EXPLAIN QUERY PLAN
+on sqlite and EXPLAIN (ANALYZE, BUFFERS) on Postgres.
+
+    python -m backend.api.bench.filters [tasks] [lists] [descriptions]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    String,
+    case,
+    cast,
+    create_engine,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.orm import sessionmaker
+
+from backend.api import models
+from backend.api.bench.read_models import load_data
+from backend.api.src.routes.tasks.controller import (
+    get_user_tasks,
+    task_filters,
+)
+from backend.api.src.routes.tasks.schemas import Task
+from backend.api.src.routes.utils.projection import record_type
+
+CATEGORIES = 5
+
+user = record_type(models.BBR_User)(["id", "username"], [1, "bench"])
+tasks_json = TypeAdapter(list[Task])
+
+# (name, filters, the same filter on the client)
+SCENARIOS = [
+    ("active", {"is_active": True}, lambda task: task.is_active),
+    (
+        "category",
+        {"task_category_id": 2},
+        lambda task: task.task_category_id == 2,
+    ),
+    (
+        "title prefix",
+        {"title_prefix": "evening"},
+        lambda task: task.title.lower().startswith("evening"),
+    ),
+    (
+        "active in category",
+        {"is_active": True, "task_category_id": 2},
+        lambda task: task.is_active and task.task_category_id == 2,
+    ),
+]
+
+
+def spread_tasks(engine):
+    # A third inactive, CATEGORIES categories, every fourth an evening task
+    task = models.BBR_Task
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.BBR_TaskCategory),
+            [
+                {"title": f"bench {index}"}
+                for index in range(2, CATEGORIES + 1)
+            ],
+        )
+        connection.execute(
+            update(task).values(
+                is_active=task.id % 3 != 0,
+                task_category_id=task.id % CATEGORIES + 1,
+                title=case(
+                    (task.id % 4 == 0, literal("Evening routine ")),
+                    else_=literal("Morning routine "),
+                ).concat(cast(task.id, String)),
+            )
+        )
+
+
+def count_rows(tasks):
+    rows = 0
+    for task in tasks:
+        rows += 1 + len(task.tags) + len(task.description_lists)
+        rows += sum(
+            len(lists.descriptions) for lists in task.description_lists
+        )
+    return rows
+
+
+def explain(engine, filters):
+    statement = (
+        select(models.BBR_Task.id)
+        .where(models.BBR_Task.user_id == user.id, *task_filters(**filters))
+        .order_by(models.BBR_Task.sort_order)
+        .limit(100)
+    )
+    sql = str(
+        statement.compile(engine, compile_kwargs={"literal_binds": True})
+    )
+    if engine.dialect.name == "postgresql":
+        sql = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+    else:
+        sql = f"EXPLAIN QUERY PLAN {sql}"
+    with engine.connect() as connection:
+        return [str(row[-1]) for row in connection.exec_driver_sql(sql).all()]
+
+
+def measure(Session, load):
+    # Everything loaded is also sent, the client filters what it received
+    start = time.perf_counter()
+    with Session() as db:
+        sent, kept = load(db)
+        rows = count_rows(sent)
+        # Through the response model, as the endpoint does
+        response = tasks_json.validate_python(sent, from_attributes=True)
+        size = len(tasks_json.dump_json(response))
+    return rows, size, len(kept), time.perf_counter() - start
+
+
+def main(tasks: int = 10000, lists: int = 3, descriptions: int = 5):
+    engine = create_engine(
+        os.getenv(
+            "BENCH_DATABASE_URL",
+            f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        )
+    )
+    Session = sessionmaker(bind=engine)
+    load_data(engine, tasks, lists, descriptions)
+    spread_tasks(engine)
+    print(
+        f"{tasks} tasks x {lists} lists x {descriptions} descriptions,"
+        " one tag per task"
+    )
+    print(f"{'':<28}{'rows read':>12}{'bytes sent':>12}{'kept':>8}{'s':>7}")
+    for name, filters, matches in SCENARIOS:
+
+        def client(db):
+            loaded = get_user_tasks(db, user, limit=None)
+            return loaded, [task for task in loaded if matches(task)]
+
+        def server(db):
+            loaded = get_user_tasks(db, user, limit=None, **filters)
+            return loaded, loaded
+
+        for path, load in [("client", client), ("server", server)]:
+            rows, size, kept, seconds = measure(Session, load)
+            print(
+                f"{name + ', ' + path:<28}{rows:>12}{size:>12}"
+                f"{kept:>8}{seconds:>7.2f}"
+            )
+    # The filtered statements, one page
+    for name, filters, _ in SCENARIOS:
+        print(f"\n{name}:")
+        for line in explain(engine, filters):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,194 @@
+"""Hot query latency and index size, plain tables against tables hash
+partitioned by user_id. Needs a Postgres database in BENCH_DATABASE_URL,
+everything is created in and dropped with the bench_partitions schema.
+
+    python -m backend.api.bench.partitions [users] [tasks] [lists]
+        [descriptions] [partitions]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+from backend.api import models
+from backend.api.src.config.partitions import (
+    PARTITIONED_TABLES,
+    partition_ddl,
+)
+
+SCHEMA = "bench_partitions"
+
+LOAD = [
+    """INSERT INTO "BBR_users" (username, hashed_password, disabled)
+    SELECT 'bench' || u, '', false FROM generate_series(1, :users) u""",
+    """INSERT INTO "BBR_taskcategories" (title) VALUES ('bench')""",
+    """INSERT INTO "BBR_tasks" (title, task_category_id, is_active, user_id,
+        sort_order, version, updated_at)
+    SELECT 'task ' || t, c.id, true, u.id, t * 100, t, now()
+    FROM "BBR_users" u, "BBR_taskcategories" c, generate_series(1, :tasks) t
+    """,
+    """INSERT INTO "BBR_tags" (title, task_id, user_id, version, updated_at)
+    SELECT 'tag', t.id, t.user_id, t.version, now() FROM "BBR_tasks" t""",
+    """INSERT INTO "BBR_taskdescriptionlists" (title, task_id, user_id,
+        version, updated_at)
+    SELECT 'list ' || l, t.id, t.user_id, t.version, now()
+    FROM "BBR_tasks" t, generate_series(1, :lists) l""",
+    """INSERT INTO "BBR_taskdescriptions" (description, description_list_id,
+        user_id, version, updated_at)
+    SELECT 'step ' || d, l.id, l.user_id, l.version, now()
+    FROM "BBR_taskdescriptionlists" l, generate_series(1, :descriptions) d""",
+]
+
+# The queries behind the routine, description and sync endpoints
+QUERIES = [
+    (
+        "user tasks",
+        """SELECT * FROM "BBR_tasks" WHERE user_id = :user_id
+        ORDER BY sort_order""",
+    ),
+    (
+        "task lists",
+        """SELECT * FROM "BBR_taskdescriptionlists"
+        WHERE user_id = :user_id AND task_id = :task_id""",
+    ),
+    (
+        "list descriptions",
+        """SELECT * FROM "BBR_taskdescriptions"
+        WHERE user_id = :user_id AND description_list_id = :list_id""",
+    ),
+    (
+        "sync descriptions",
+        """SELECT * FROM "BBR_taskdescriptions"
+        WHERE user_id = :user_id AND version > :version
+        ORDER BY version, id""",
+    ),
+    (
+        "delete task",
+        """DELETE FROM "BBR_tasks" WHERE user_id = :user_id AND id = :task_id
+        """,
+    ),
+]
+
+
+def sample_params(connection, samples: int):
+    rows = connection.execute(
+        text(
+            """SELECT l.user_id, l.task_id, l.id, l.version
+            FROM "BBR_taskdescriptionlists" l
+            ORDER BY random() LIMIT :samples"""
+        ),
+        {"samples": samples},
+    ).all()
+    return [
+        {
+            "user_id": user_id,
+            "task_id": task_id,
+            "list_id": list_id,
+            "version": version,
+        }
+        for user_id, task_id, list_id, version in rows
+    ]
+
+
+def time_query(connection, query: str, params: list):
+    timings = []
+    for values in params:
+        # Deletes are rolled back, every run sees the same rows
+        transaction = connection.begin_nested()
+        start = time.perf_counter()
+        result = connection.execute(text(query), values)
+        if result.returns_rows:
+            result.all()
+        timings.append(time.perf_counter() - start)
+        transaction.rollback()
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95)]
+
+
+def index_bytes(connection):
+    # pg_partition_tree has no rows for a plain table
+    return sum(
+        connection.execute(
+            text(
+                "SELECT coalesce((SELECT sum(pg_indexes_size(relid))"
+                " FROM pg_partition_tree(CAST(:table AS regclass))),"
+                " pg_indexes_size(CAST(:table AS regclass)))"
+            ),
+            {"table": f'"{table}"'},
+        ).scalar()
+        for table, _ in PARTITIONED_TABLES
+    )
+
+
+def run(engine, sizes: dict, partitions: int, samples: int):
+    with engine.connect() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        connection.commit()
+        models.Base.metadata.create_all(connection)
+        for statement in LOAD:
+            connection.execute(text(statement), sizes)
+        connection.commit()
+        converted = None
+        if partitions:
+            start = time.perf_counter()
+            for statement in partition_ddl(partitions):
+                connection.exec_driver_sql(statement)
+            connection.commit()
+            converted = time.perf_counter() - start
+        connection.execute(text("ANALYZE"))
+        connection.commit()
+
+        # Same sample rows for both layouts
+        connection.execute(text("SELECT setseed(0)"))
+        params = sample_params(connection, samples)
+        results = [
+            (name, *time_query(connection, query, params))
+            for name, query in QUERIES
+        ]
+        size = index_bytes(connection)
+        connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+        connection.commit()
+    return results, size, converted
+
+
+def main(
+    users: int = 1000,
+    tasks: int = 20,
+    lists: int = 3,
+    descriptions: int = 8,
+    partitions: int = 16,
+    samples: int = 200,
+):
+    engine = create_engine(
+        os.environ["BENCH_DATABASE_URL"],
+        connect_args={"options": f"-csearch_path={SCHEMA}"},
+    )
+    sizes = {
+        "users": users,
+        "tasks": tasks,
+        "lists": lists,
+        "descriptions": descriptions,
+    }
+    print(
+        f"{users} users x {tasks} tasks x {lists} lists x {descriptions} "
+        f"descriptions, {samples} samples per query"
+    )
+    for layout, count in [
+        ("plain", 0),
+        (f"{partitions} partitions", partitions),
+    ]:
+        results, size, converted = run(engine, sizes, count, samples)
+        print(f"\n{layout}, indexes {size / 1024 / 1024:.1f} MiB")
+        if converted is not None:
+            print(f"converted in {converted:.1f} s")
+        print(f"{'query':<20}{'mean ms':>10}{'p95 ms':>10}")
+        for name, mean, p95 in results:
+            print(f"{name:<20}{mean * 1000:>10.3f}{p95 * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:6]])
@@ -0,0 +1,168 @@
+"""Latency of the hot writes: the ORM path, the single statement path on
+psycopg2 and the pipelined, prepared path on psycopg 3. Needs a Postgres
+database in BENCH_DATABASE_URL (postgresql://...), everything is created in
+and dropped with the bench_pipeline schema. psycopg 3 is skipped when it
+is not installed.
+
+    python -m backend.api.bench.pipeline [writes]
+
+A local database hides the round trips. To see the cross region link,
+add latency to loopback first, e.g.
+`tc qdisc add dev lo root netem delay 10ms`.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine, insert, text
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal, psycopg
+from backend.api.src.routes.descriptionlists.controller import (
+    create_description_list,
+    pipelined_create_description_list,
+)
+from backend.api.src.routes.descriptionlists.schemas import (
+    TaskDescriptionListCreate,
+)
+from backend.api.src.routes.descriptions.controller import (
+    create_list_description,
+    get_list_description_by_id,
+    pipelined_create_list_description,
+    pipelined_update_list_description,
+    update_list_description,
+)
+from backend.api.src.routes.descriptions.schemas import (
+    TaskDescription,
+    TaskDescriptionCreate,
+)
+
+SCHEMA = "bench_pipeline"
+
+
+def bench_engine(url: str, driver: str):
+    return create_engine(
+        url.replace("postgresql://", f"postgresql+{driver}://", 1),
+        connect_args={"options": f"-csearch_path={SCHEMA}"},
+    )
+
+
+def load_data(engine):
+    with engine.connect() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        connection.commit()
+        models.Base.metadata.create_all(connection)
+        now = models.utcnow()
+        connection.execute(
+            insert(models.BBR_User).values(
+                username="bench", hashed_password="", disabled=False
+            )
+        )
+        connection.execute(insert(models.BBR_TaskCategory).values(title="x"))
+        connection.execute(
+            insert(models.BBR_Task).values(
+                title="bench",
+                task_category_id=1,
+                is_active=True,
+                user_id=1,
+                sort_order=100,
+                version=0,
+                updated_at=now,
+            )
+        )
+        connection.execute(
+            insert(models.BBR_TaskDescriptionList).values(
+                title="bench", task_id=1, user_id=1, version=0, updated_at=now
+            )
+        )
+        connection.execute(
+            insert(models.BBR_TaskDescription).values(
+                description="bench",
+                description_list_id=1,
+                user_id=1,
+                version=0,
+                updated_at=now,
+            )
+        )
+        connection.commit()
+
+
+def operations(pipelined: bool):
+    # Each runs in a fresh session, like a request
+    def create_description(db, n):
+        description = TaskDescriptionCreate(
+            description=f"step {n}", description_list_id=1
+        )
+        if pipelined:
+            return pipelined_create_list_description(db, description)
+        return create_list_description(db, description)
+
+    def create_list(db, n):
+        description_list = TaskDescriptionListCreate(
+            title=f"list {n}", task_id=1
+        )
+        if pipelined:
+            return pipelined_create_description_list(db, description_list)
+        return create_description_list(db, description_list)
+
+    def update_description(db, n):
+        db_description = get_list_description_by_id(db, 1)
+        description = TaskDescription(
+            id=1, description=f"edit {n}", description_list_id=1
+        )
+        if pipelined:
+            return pipelined_update_list_description(
+                db, db_description, description
+            )
+        return update_list_description(db, db_description, description)
+
+    return [
+        ("create description", create_description),
+        ("create list", create_list),
+        ("update description", update_description),
+    ]
+
+
+def time_writes(engine, operation, writes: int):
+    timings = []
+    for n in range(writes):
+        with SessionLocal(bind=engine) as db:
+            start = time.perf_counter()
+            operation(db, n)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95)]
+
+
+def main(writes: int = 500):
+    url = os.environ["BENCH_DATABASE_URL"].replace(
+        "postgres://", "postgresql://", 1
+    )
+    paths = [
+        ("orm psycopg2", "psycopg2", False),
+        ("statement psycopg2", "psycopg2", True),
+    ]
+    if psycopg is not None:
+        paths.append(("pipeline psycopg", "psycopg", True))
+    print(f"{writes} writes per operation")
+    print(f"{'path':<20}{'operation':<20}{'mean ms':>10}{'p95 ms':>10}")
+    for name, driver, pipelined in paths:
+        engine = bench_engine(url, driver)
+        load_data(engine)
+        for operation_name, operation in operations(pipelined):
+            mean, p95 = time_writes(engine, operation, writes)
+            print(
+                f"{name:<20}{operation_name:<20}"
+                f"{mean * 1000:>10.3f}{p95 * 1000:>10.3f}"
+            )
+        with engine.connect() as connection:
+            connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            connection.commit()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,154 @@
+"""Memory per task of a loaded task tree page, ORM instances against
+read-only records. Runs on a scratch sqlite file unless BENCH_DATABASE_URL
+is set, the routine tables there are dropped and recreated.
+
+    python -m backend.api.bench.read_models [tasks] [lists] [descriptions]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.api import models
+from backend.api.src.routes.tasks.controller import (
+    task_sparse_model,
+    task_tree_options,
+)
+from backend.api.src.routes.utils.projection import load_records
+
+
+def load_data(engine, tasks: int, lists: int, descriptions: int):
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    now = models.utcnow()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.BBR_User),
+            [{"username": "bench", "hashed_password": "", "disabled": False}],
+        )
+        connection.execute(
+            insert(models.BBR_TaskCategory), [{"title": "bench"}]
+        )
+        # Ids are assigned in insert order, starting at 1
+        connection.execute(
+            insert(models.BBR_Task),
+            [
+                {
+                    "title": f"Morning routine {task}",
+                    "task_category_id": 1,
+                    "is_active": True,
+                    "user_id": 1,
+                    "sort_order": task * 100,
+                    "version": task,
+                    "updated_at": now,
+                }
+                for task in range(1, tasks + 1)
+            ],
+        )
+        connection.execute(
+            insert(models.BBR_Tag),
+            [
+                {
+                    "title": "tag",
+                    "task_id": task,
+                    "user_id": 1,
+                    "version": 0,
+                    "updated_at": now,
+                }
+                for task in range(1, tasks + 1)
+            ],
+        )
+        connection.execute(
+            insert(models.BBR_TaskDescriptionList),
+            [
+                {
+                    "title": f"Steps {index}",
+                    "task_id": task,
+                    "user_id": 1,
+                    "version": 0,
+                    "updated_at": now,
+                }
+                for task in range(1, tasks + 1)
+                for index in range(lists)
+            ],
+        )
+        connection.execute(
+            insert(models.BBR_TaskDescription),
+            [
+                {
+                    "description": f"Hold the stretch for {index} breaths",
+                    "description_list_id": list_id,
+                    "user_id": 1,
+                    "version": 0,
+                    "updated_at": now,
+                }
+                for list_id in range(1, tasks * lists + 1)
+                for index in range(descriptions)
+            ],
+        )
+
+
+def load_orm(db):
+    return (
+        db.query(models.BBR_Task)
+        .filter(models.BBR_Task.user_id == 1)
+        .options(*task_tree_options)
+        .order_by(models.BBR_Task.sort_order)
+        .all()
+    )
+
+
+def load_projection(db):
+    return load_records(
+        db,
+        task_sparse_model,
+        None,
+        models.BBR_Task.user_id == 1,
+        order_by=[models.BBR_Task.sort_order],
+    )
+
+
+def measure(Session, load):
+    # Bytes still held while the page is alive, that is what the response
+    # is serialized from, and the peak while loading
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with Session() as db:
+        before = tracemalloc.get_traced_memory()[0]
+        tasks = load(db)
+        seconds = time.perf_counter() - start
+        held, peak = tracemalloc.get_traced_memory()
+        count = len(tasks)
+    tracemalloc.stop()
+    del tasks
+    return (held - before) / count, (peak - before) / count, seconds
+
+
+def main(tasks: int = 10000, lists: int = 3, descriptions: int = 5):
+    engine = create_engine(
+        os.getenv(
+            "BENCH_DATABASE_URL",
+            f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        )
+    )
+    Session = sessionmaker(bind=engine)
+    load_data(engine, tasks, lists, descriptions)
+    print(
+        f"{tasks} tasks x {lists} lists x {descriptions} descriptions,"
+        " one tag per task"
+    )
+    print(f"{'':<12}{'held B/task':>14}{'peak B/task':>14}{'load s':>10}")
+    for name, load in [("orm", load_orm), ("records", load_projection)]:
+        held, peak, seconds = measure(Session, load)
+        print(f"{name:<12}{held:>14.0f}{peak:>14.0f}{seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:4]])
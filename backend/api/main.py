@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi.responses import FileResponse, RedirectResponse
 import uvicorn
 from fastapi import FastAPI
@@ -7,14 +9,32 @@ from passlib.context import CryptContext
 
 from backend.api.src.routes.auth import main as auth_main
 from backend.api.src.routes.descriptions import main as descriptions_main
+from backend.api.src.routes.health import main as health_main
+from backend.api.src.routes.health.warmup import warm_up
+from backend.api.src.routes.jobs import handlers as jobs_handlers  # noqa
+from backend.api.src.routes.internal import main as internal_main
+from backend.api.src.routes.jobs import main as jobs_main
+from backend.api.src.routes.jobs.runner import job_runner
+from backend.api.src.routes.mutations import main as mutations_main
+from backend.api.src.routes.notifications import main as notifications_main
+from backend.api.src.routes.notifications.broker import change_broker
+from backend.api.src.routes.sync import main as sync_main
+from backend.api.src.routes.tags import main as tags_main
 from backend.api.src.routes.users import main as users_main
 from backend.api.src.routes.descriptionlists import (
     main as descriptionlists_main,
 )
 from backend.api.src.routes.taskcategories import main as taskcategories_main
 from backend.api.src.routes.tasks import main as tasks_main
+from backend.api.src.routes.utils import ownership  # noqa
+from backend.api.src.routes.utils.cache import shared_cache
+from backend.api.src.routes.utils.profiling import (
+    ProfilingMiddleware,
+    instrument_routes,
+)
 
 from backend.api.src.config.database import engine
+from backend.api.src.config.slow_queries import QueryScopeMiddleware
 
 from backend.api.models import Base
 
@@ -25,7 +45,23 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    instrument_routes(app.routes)
+    shared_cache.start()
+    job_runner.start()
+    change_broker.start()
+    # Loads the task categories among other things, see /api/health/ready
+    warm_up.start()
+    yield
+    warm_up.shutdown()
+    change_broker.shutdown()
+    job_runner.shutdown()
+    shared_cache.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://127.0.0.1:3000",
@@ -44,10 +80,20 @@ app.add_middleware(
 app.include_router(auth_main.router_auth)
 app.include_router(descriptionlists_main.router_lists)
 app.include_router(descriptions_main.router_descriptions)
+app.include_router(health_main.router_health)
+app.include_router(internal_main.router_internal)
+app.include_router(jobs_main.router_jobs)
+app.include_router(mutations_main.router_mutations)
+app.include_router(notifications_main.router_notifications)
+app.include_router(sync_main.router_sync)
+app.include_router(tags_main.router_tags)
 app.include_router(users_main.router_users)
 app.include_router(taskcategories_main.router_categories)
 app.include_router(tasks_main.router_tasks)
 
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(QueryScopeMiddleware)
+
 favicon_path = "backend/static/favicon.ico"
 
 
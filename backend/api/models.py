@@ -1,6 +1,16 @@
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    ForeignKey,
+    Index,
+    String,
+    func,
+    literal_column,
+    text,
+)
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -24,18 +34,36 @@ str50 = Annotated[str, mapped_column(String(50))]
 intpk = Annotated[int, mapped_column(primary_key=True)]
 user_fk = Annotated[
     int,
-    mapped_column(ForeignKey("BBR_users.id"), index=True, nullable=True),
+    mapped_column(
+        ForeignKey("BBR_users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=True,
+    ),
+]
+task_fk = Annotated[
+    int, mapped_column(ForeignKey("BBR_tasks.id", ondelete="CASCADE"))
 ]
-task_fk = Annotated[int, mapped_column(ForeignKey("BBR_tasks.id"))]
 tag_fk = Annotated[int, mapped_column(ForeignKey("BBR_tags.id"))]
 task_category_fk = Annotated[
     int, mapped_column(ForeignKey("BBR_taskcategories.id"))
 ]
 task_description_list_fk = Annotated[
-    int, mapped_column(ForeignKey("BBR_taskdescriptionlists.id"))
+    int,
+    mapped_column(
+        ForeignKey("BBR_taskdescriptionlists.id", ondelete="CASCADE")
+    ),
 ]
 
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+# Sync versions are global and increasing, every flush that changes
+# routine rows takes the next one, see routes/sync/versions.py
+sync_version = Annotated[int, mapped_column(BigInteger, index=True)]
+
+
 class BBR_User(Base):
     __tablename__ = "BBR_users"
     id: Mapped[intpk] = mapped_column(init=False)
@@ -48,15 +76,44 @@ class BBR_User(Base):
     disabled: Mapped[Optional[bool]] = mapped_column(
         nullable=True, default=False
     )
+    # Set when the user is soft deleted and waiting for background purge
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(
+        default=None, nullable=True
+    )
     tasks: Mapped[Optional[List["BBR_Task"]]] = relationship(
         argument="BBR_Task",
         default_factory=list,
         cascade="all, delete",
+        passive_deletes=True,
     )
 
 
 class BBR_Task(Base):
     __tablename__ = "BBR_tasks"
+    __table_args__ = (
+        Index("ix_BBR_tasks_user_id_version", "user_id", "version"),
+        # Task list filters, see routes/tasks/controller.py task_filters
+        Index(
+            "ix_BBR_tasks_user_id_sort_order_active",
+            "user_id",
+            "sort_order",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        Index(
+            "ix_BBR_tasks_user_id_task_category_id_sort_order",
+            "user_id",
+            "task_category_id",
+            "sort_order",
+        ),
+        # text_pattern_ops lets LIKE 'prefix%' use the index in any collation
+        Index(
+            "ix_BBR_tasks_user_id_lower_title",
+            "user_id",
+            func.lower(literal_column("title")).label("lower_title"),
+            postgresql_ops={"lower_title": "text_pattern_ops"},
+        ),
+    )
 
     id: Mapped[intpk] = mapped_column(init=False)
     title: Mapped[str] = mapped_column(index=True)
@@ -66,15 +123,27 @@ class BBR_Task(Base):
     sort_order: Mapped[int] = mapped_column(
         default=None, index=True, nullable=True
     )
+    # Copy-on-write instance of this template, see routes/tasks/templates.py
+    template_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("BBR_tasks.id"), default=None, index=True, nullable=True
+    )
+    version: Mapped[sync_version] = mapped_column(default=0, init=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        default_factory=utcnow, onupdate=utcnow, init=False
+    )
 
     tags: Mapped[Optional[List["BBR_Tag"]]] = relationship(
-        argument="BBR_Tag", default_factory=list, cascade="all, delete"
+        argument="BBR_Tag",
+        default_factory=list,
+        cascade="all, delete",
+        passive_deletes=True,
     )
     description_lists: Mapped[Optional[List["BBR_TaskDescriptionList"]]] = (
         relationship(
             argument="BBR_TaskDescriptionList",
             default_factory=list,
             cascade="all, delete",
+            passive_deletes=True,
         )
     )
 
@@ -89,29 +158,132 @@ class BBR_TaskCategory(Base):
 
 class BBR_Tag(Base):
     __tablename__ = "BBR_tags"
+    __table_args__ = (
+        Index("ix_BBR_tags_user_id_version", "user_id", "version"),
+        # Tag filter and facets, see routes/tags/controller.py
+        Index(
+            "ix_BBR_tags_user_id_title_task_id", "user_id", "title", "task_id"
+        ),
+    )
 
     id: Mapped[intpk] = mapped_column(init=False)
     title: Mapped[str] = mapped_column(String(30), index=True)
     task_id: Mapped[task_fk]
+    # Copy of the task's user_id, see routes/utils/ownership.py
+    user_id: Mapped[user_fk] = mapped_column(default=None, init=False)
+    version: Mapped[sync_version] = mapped_column(default=0, init=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        default_factory=utcnow, onupdate=utcnow, init=False
+    )
 
 
 class BBR_TaskDescriptionList(Base):
     __tablename__ = "BBR_taskdescriptionlists"
+    __table_args__ = (
+        Index(
+            "ix_BBR_taskdescriptionlists_user_id_task_id", "user_id", "task_id"
+        ),
+        Index(
+            "ix_BBR_taskdescriptionlists_user_id_version", "user_id", "version"
+        ),
+    )
 
     id: Mapped[intpk] = mapped_column(init=False)
     title: Mapped[str50] = mapped_column(index=True)
     task_id: Mapped[task_fk]
+    user_id: Mapped[user_fk] = mapped_column(default=None, init=False)
+    version: Mapped[sync_version] = mapped_column(default=0, init=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        default_factory=utcnow, onupdate=utcnow, init=False
+    )
+    # Template list this list was copied from on first edit
+    template_list_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("BBR_taskdescriptionlists.id", ondelete="SET NULL"),
+        default=None,
+        nullable=True,
+    )
 
     descriptions: Mapped[Optional[List["BBR_TaskDescription"]]] = relationship(
         argument="BBR_TaskDescription",
         default_factory=list,
         cascade="all, delete",
+        passive_deletes=True,
     )
 
 
 class BBR_TaskDescription(Base):
     __tablename__ = "BBR_taskdescriptions"
+    __table_args__ = (
+        Index(
+            "ix_BBR_taskdescriptions_user_id_description_list_id",
+            "user_id",
+            "description_list_id",
+        ),
+        Index("ix_BBR_taskdescriptions_user_id_version", "user_id", "version"),
+    )
 
     id: Mapped[intpk] = mapped_column(init=False)
     description: Mapped[str] = mapped_column(index=True)
     description_list_id: Mapped[task_description_list_fk]
+    user_id: Mapped[user_fk] = mapped_column(default=None, init=False)
+    version: Mapped[sync_version] = mapped_column(default=0, init=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        default_factory=utcnow, onupdate=utcnow, init=False
+    )
+    template_description_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("BBR_taskdescriptions.id", ondelete="SET NULL"),
+        default=None,
+        nullable=True,
+    )
+
+
+class BBR_Tombstone(Base):
+    """Marks a deleted task, tag, description list or description, so
+    delta sync can tell clients to drop it."""
+
+    __tablename__ = "BBR_tombstones"
+    __table_args__ = (
+        Index("ix_BBR_tombstones_user_id_version", "user_id", "version"),
+    )
+
+    id: Mapped[intpk] = mapped_column(init=False)
+    entity: Mapped[str] = mapped_column(String(30))
+    entity_id: Mapped[int]
+    user_id: Mapped[user_fk]
+    version: Mapped[int] = mapped_column(BigInteger)
+    deleted_at: Mapped[datetime] = mapped_column(default_factory=utcnow)
+
+
+class BBR_SyncClock(Base):
+    # Version counter on sqlite. On Postgres versions are transaction ids
+    # and the row holds the offset added to them
+    __tablename__ = "BBR_sync_clock"
+
+    id: Mapped[intpk]
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class BBR_Job(Base):
+    __tablename__ = "BBR_jobs"
+
+    id: Mapped[intpk] = mapped_column(init=False)
+    kind: Mapped[str] = mapped_column(String(50), index=True)
+    payload: Mapped[dict] = mapped_column(JSON)
+    # Plain column, not a FK. A purge job outlives the user it deletes.
+    user_id: Mapped[Optional[int]] = mapped_column(
+        default=None, index=True, nullable=True
+    )
+    status: Mapped[str] = mapped_column(
+        String(20), default="queued", index=True
+    )
+    progress: Mapped[float] = mapped_column(default=0.0)
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=3)
+    result: Mapped[Optional[dict]] = mapped_column(
+        JSON, default=None, nullable=True
+    )
+    error: Mapped[Optional[str]] = mapped_column(default=None, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default_factory=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        default_factory=utcnow, onupdate=utcnow
+    )
@@ -0,0 +1,325 @@
+"""Throttled, resumable backfills for large tables.
+
+A backfill updates a table in batches of rows in id order, and commits
+after each batch. Locks are held for one batch only, and replicas keep up
+between batches. The last id of every batch is saved in BBR_backfills, so a
+stopped backfill resumes where it left off. Backfill statements must be
+idempotent: a batch that ran just before a crash runs again.
+
+Backfills are plain SQL and do not take sync versions, see
+routes/sync/versions.py. Clients do not refetch backfilled rows.
+
+Run a backfill from a migration with run_in_migration, or ahead of the
+migration from the command line, so the migration only has new rows left:
+
+    python -m backend.api.src.config.backfill NAME [NAME ...]
+        [--batch-size N] [--sleep SECONDS] [--restart]
+"""
+
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    MetaData,
+    String,
+    Table,
+    text,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+SLEEP_SECONDS = 0.05
+
+metadata = MetaData()
+
+checkpoints = Table(
+    "BBR_backfills",
+    metadata,
+    Column("name", String(100), primary_key=True),
+    Column("last_id", BigInteger, nullable=False),
+    Column("rows", BigInteger, nullable=False),
+    Column("seconds", Float, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+@dataclass
+class Backfill:
+    """SET set_sql on the rows of table matching where. Both are SQL
+    fragments that may refer to the table by its quoted name."""
+
+    name: str
+    table: str
+    set_sql: str
+    where: str = "1 = 1"
+
+
+@dataclass
+class Progress:
+    name: str
+    last_id: int
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _children_user_id(table: str, parent: str, foreign_key: str):
+    return Backfill(
+        name=f"{table}.user_id",
+        table=table,
+        set_sql=(
+            f'user_id = (SELECT "{parent}".user_id FROM "{parent}"'
+            f' WHERE "{parent}".id = "{table}".{foreign_key})'
+        ),
+        where="user_id IS NULL",
+    )
+
+
+# Backfills the command line knows by name. Lists before descriptions,
+# descriptions copy the user from their list.
+BACKFILLS = {
+    backfill.name: backfill
+    for backfill in [
+        _children_user_id("BBR_tags", "BBR_tasks", "task_id"),
+        _children_user_id("BBR_taskdescriptionlists", "BBR_tasks", "task_id"),
+        _children_user_id(
+            "BBR_taskdescriptions",
+            "BBR_taskdescriptionlists",
+            "description_list_id",
+        ),
+        # Same spacing as new tasks get, see routes/tasks/controller.py
+        Backfill(
+            name="BBR_tasks.sort_order",
+            table="BBR_tasks",
+            set_sql="sort_order = id * 100",
+            where="sort_order IS NULL",
+        ),
+    ]
+}
+
+
+def _load_checkpoint(connection, name: str):
+    row = connection.execute(
+        checkpoints.select().where(checkpoints.c.name == name)
+    ).first()
+    if row is None:
+        return Progress(name=name, last_id=0, rows=0, seconds=0.0)
+    return Progress(
+        name=name, last_id=row.last_id, rows=row.rows, seconds=row.seconds
+    )
+
+
+def _save_checkpoint(connection, progress: Progress, exists: bool):
+    values = {
+        "last_id": progress.last_id,
+        "rows": progress.rows,
+        "seconds": progress.seconds,
+        "updated_at": datetime.now(timezone.utc).replace(tzinfo=None),
+    }
+    if exists:
+        connection.execute(
+            checkpoints.update()
+            .where(checkpoints.c.name == progress.name)
+            .values(**values)
+        )
+    else:
+        connection.execute(
+            checkpoints.insert().values(name=progress.name, **values)
+        )
+
+
+def run(
+    connection,
+    backfill: Backfill,
+    batch_size: int = BATCH_SIZE,
+    sleep: float = SLEEP_SECONDS,
+    restart: bool = False,
+):
+    """Run backfill from its checkpoint to the last row, committing after
+    every batch and sleeping `sleep` seconds between batches. Logs and
+    returns the progress, with the rows and time of earlier runs. The
+    checkpoint is deleted once the last batch is done, a later run, for
+    example after a downgrade emptied the column, starts over."""
+    metadata.create_all(connection, checkfirst=True)
+    if restart:
+        connection.execute(
+            checkpoints.delete().where(checkpoints.c.name == backfill.name)
+        )
+    connection.commit()
+
+    progress = _load_checkpoint(connection, backfill.name)
+    exists = progress.last_id > 0 or progress.rows > 0
+    # Keyset batches, every statement starts from an index lookup on id
+    next_batch = text(
+        f'SELECT max(id) FROM (SELECT id FROM "{backfill.table}"'
+        f" WHERE id > :after AND ({backfill.where})"
+        " ORDER BY id LIMIT :batch_size) batch"
+    )
+    update = text(
+        f'UPDATE "{backfill.table}" SET {backfill.set_sql}'
+        f" WHERE id > :after AND id <= :until AND ({backfill.where})"
+    )
+    while True:
+        start = time.perf_counter()
+        until = connection.execute(
+            next_batch,
+            {"after": progress.last_id, "batch_size": batch_size},
+        ).scalar()
+        if until is None:
+            connection.execute(
+                checkpoints.delete().where(checkpoints.c.name == backfill.name)
+            )
+            connection.commit()
+            break
+        result = connection.execute(
+            update, {"after": progress.last_id, "until": until}
+        )
+        progress.last_id = until
+        progress.rows += result.rowcount
+        progress.seconds += time.perf_counter() - start
+        _save_checkpoint(connection, progress, exists)
+        exists = True
+        connection.commit()
+        logger.info(
+            "%s: %d rows, last id %d, %.0f rows/s",
+            backfill.name,
+            progress.rows,
+            progress.last_id,
+            progress.rows_per_second,
+        )
+        if sleep:
+            time.sleep(sleep)
+    logger.info(
+        "%s: done, %d rows in %.1f s, %.0f rows/s",
+        backfill.name,
+        progress.rows,
+        progress.seconds,
+        progress.rows_per_second,
+    )
+    return progress
+
+
+def _is_postgres(connection):
+    return connection.dialect.name == "postgresql"
+
+
+def create_index(
+    connection, name: str, table: str, columns: list, where: str = None
+):
+    """Create an index without blocking writes to the table, partial when
+    `where` is given. On Postgres the connection must be in autocommit
+    mode, CREATE INDEX CONCURRENTLY cannot run in a transaction."""
+    concurrently = ""
+    if _is_postgres(connection):
+        # A failed concurrent build leaves an invalid index behind, which
+        # IF NOT EXISTS would keep
+        invalid = connection.execute(
+            text(
+                "SELECT NOT indisvalid FROM pg_index"
+                " WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": f'"{name}"'},
+        ).scalar()
+        if invalid:
+            connection.exec_driver_sql(
+                f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'
+            )
+        # Partitioned tables only take plain CREATE INDEX
+        partitioned = connection.execute(
+            text(
+                "SELECT relkind = 'p' FROM pg_class"
+                " WHERE oid = to_regclass(:table)"
+            ),
+            {"table": f'"{table}"'},
+        ).scalar()
+        concurrently = "" if partitioned else " CONCURRENTLY"
+    connection.exec_driver_sql(
+        f'CREATE INDEX{concurrently} IF NOT EXISTS "{name}"'
+        f' ON "{table}" ({", ".join(columns)})'
+        + (f" WHERE {where}" if where else "")
+    )
+    connection.commit()
+
+
+def run_in_migration(backfills: list, indexes: list = ()):
+    """Run backfills, then create indexes, each a (name, table, columns)
+    tuple or (name, table, columns, where) for a partial index, from an
+    alembic migration. The migration's transaction is committed first, so
+    schema changes before this call are kept even if a batch fails, and
+    rerunning the migration resumes the backfills.
+    Tune with `alembic -x backfill_batch_size=N -x backfill_sleep=S`."""
+    from alembic import context, op
+
+    if context.is_offline_mode():
+        # No rows to batch by, the script gets single statements
+        for backfill in backfills:
+            op.execute(
+                f'UPDATE "{backfill.table}" SET {backfill.set_sql}'
+                f" WHERE {backfill.where}"
+            )
+        for name, table, columns, *where in indexes:
+            where = text(where[0]) if where else None
+            op.create_index(
+                name,
+                table,
+                [text(column) for column in columns],
+                postgresql_where=where,
+                sqlite_where=where,
+            )
+        return
+    options = context.get_x_argument(as_dictionary=True)
+    batch_size = int(options.get("backfill_batch_size", BATCH_SIZE))
+    sleep = float(options.get("backfill_sleep", SLEEP_SECONDS))
+    with op.get_context().autocommit_block():
+        # Own connections, committing on the migration's would end the
+        # transaction alembic holds open
+        engine = op.get_bind().engine
+        with engine.connect() as connection:
+            for backfill in backfills:
+                run(connection, backfill, batch_size=batch_size, sleep=sleep)
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            for name, table, columns, *where in indexes:
+                create_index(connection, name, table, columns, *where)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.api.src.config.backfill"
+    )
+    parser.add_argument("names", nargs="+", choices=sorted(BACKFILLS))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--sleep", type=float, default=SLEEP_SECONDS)
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore saved progress"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from backend.api.src.config.database import engine
+
+    with engine.connect() as connection:
+        for name in args.names:
+            run(
+                connection,
+                BACKFILLS[name],
+                batch_size=args.batch_size,
+                sleep=args.sleep,
+                restart=args.restart,
+            )
+
+
+if __name__ == "__main__":
+    main()
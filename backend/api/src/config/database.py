@@ -1,9 +1,71 @@
+from itertools import cycle
+
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from backend.env_variables import SQLALCHEMY_DATABASE_URL
+
+from backend.api.src.config.slow_queries import slow_query_log
+from backend.env_variables import (
+    POSTGRES_DRIVER,
+    PREPARE_THRESHOLD,
+    SQLALCHEMY_DATABASE_URL,
+    SQLALCHEMY_REPLICA_URLS,
+)
+
+try:
+    import psycopg
+except ImportError:  # optional, POSTGRES_DRIVER=psycopg falls back
+    psycopg = None
 
 load_dotenv(".env")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+
+def _create_engine(url: str):
+    # postgresql:// urls use psycopg2 unless psycopg 3 is asked for and
+    # installed
+    if (
+        POSTGRES_DRIVER == "psycopg"
+        and psycopg is not None
+        and url.startswith("postgresql://")
+    ):
+        return create_engine(
+            url.replace("postgresql://", "postgresql+psycopg://", 1),
+            echo=False,
+            connect_args={"prepare_threshold": PREPARE_THRESHOLD},
+        )
+    return create_engine(url, echo=False)
+
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+replica_engines = [_create_engine(url) for url in SQLALCHEMY_REPLICA_URLS]
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    for replica_engine in replica_engines
+]
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # Postgres enforces ON DELETE CASCADE by default, sqlite needs a pragma
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+for _engine in [engine, *replica_engines]:
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _enable_sqlite_foreign_keys)
+    slow_query_log.attach(_engine)
+
+_replica_sessionmakers = cycle(ReplicaSessionLocals or [SessionLocal])
+
+
+def next_read_sessionmaker():
+    # Round robin over replicas, primary when no replicas are configured
+    return next(_replica_sessionmakers)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_session_written(session, flush_context):
+    session.info["has_written"] = True
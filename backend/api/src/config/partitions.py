@@ -0,0 +1,244 @@
+"""Postgres hash partitioning of the routine tables by user_id.
+
+Partitioned tables cannot have a primary key or unique index without the
+partition key, and templates have no user. So the partitioned layout keeps
+plain indexes on id, drops the foreign keys between routine tables and
+replaces their ON DELETE CASCADE with row triggers that delete children
+from the parent's partition only. Foreign keys to users and categories
+stay. Used by alembic revision 0005 and backend/api/bench/partitions.py,
+unpartition_ddl converts back for the downgrade.
+"""
+
+# (table, indexed columns), parents before children. The same indexes as
+# the models, plus id and the parent column the ORM loads children by.
+# Migrations pass their own copy to partition_ddl, this one follows the
+# current models.
+PARTITIONED_TABLES = [
+    (
+        "BBR_tasks",
+        [
+            ["id"],
+            ["title"],
+            ["user_id"],
+            ["sort_order"],
+            ["version"],
+            ["template_id"],
+            ["user_id", "version"],
+            ["user_id", "task_category_id", "sort_order"],
+        ],
+    ),
+    (
+        "BBR_tags",
+        [
+            ["id"],
+            ["title"],
+            ["task_id"],
+            ["user_id"],
+            ["version"],
+            ["user_id", "version"],
+            ["user_id", "title", "task_id"],
+        ],
+    ),
+    (
+        "BBR_taskdescriptionlists",
+        [
+            ["id"],
+            ["title"],
+            ["task_id"],
+            ["user_id"],
+            ["version"],
+            ["user_id", "task_id"],
+            ["user_id", "version"],
+        ],
+    ),
+    (
+        "BBR_taskdescriptions",
+        [
+            ["id"],
+            ["description"],
+            ["description_list_id"],
+            ["user_id"],
+            ["version"],
+            ["user_id", "description_list_id"],
+            ["user_id", "version"],
+        ],
+    ),
+]
+
+# (table, column, referred table, on delete)
+FOREIGN_KEYS = [
+    ("BBR_tasks", "user_id", "BBR_users", "CASCADE"),
+    ("BBR_tasks", "task_category_id", "BBR_taskcategories", None),
+    ("BBR_tags", "user_id", "BBR_users", "CASCADE"),
+    ("BBR_taskdescriptionlists", "user_id", "BBR_users", "CASCADE"),
+    ("BBR_taskdescriptions", "user_id", "BBR_users", "CASCADE"),
+]
+
+# Parent table and the (child table, parent column) rows deleted with it
+CASCADES = [
+    (
+        "BBR_tasks",
+        [("BBR_tags", "task_id"), ("BBR_taskdescriptionlists", "task_id")],
+    ),
+    (
+        "BBR_taskdescriptionlists",
+        [("BBR_taskdescriptions", "description_list_id")],
+    ),
+]
+
+
+def _index_name(table: str, columns: list):
+    return f"ix_{table}_{'_'.join(columns)}"
+
+
+def _cascade_function(parent: str, children: list):
+    # Separate statements for templates and users, user_id = OLD.user_id
+    # prunes to one partition, IS NOT DISTINCT FROM would scan them all
+    deletes = [
+        (
+            f'DELETE FROM "{child}" WHERE user_id IS NULL'
+            f" AND {column} = OLD.id;",
+            f'DELETE FROM "{child}" WHERE user_id = OLD.user_id'
+            f" AND {column} = OLD.id;",
+        )
+        for child, column in children
+    ]
+    templates = "\n        ".join(delete for delete, _ in deletes)
+    users = "\n        ".join(delete for _, delete in deletes)
+    return f"""
+CREATE FUNCTION "{parent}_delete_children"() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF OLD.user_id IS NULL THEN
+        {templates}
+    ELSE
+        {users}
+    END IF;
+    RETURN OLD;
+END
+$$"""
+
+
+def partition_ddl(partitions: int, tables: list = PARTITIONED_TABLES):
+    """Statements converting the routine tables, with their rows, to
+    `partitions` hash partitions by user_id, with the (table, indexed
+    columns) in tables. Run them in one transaction, the tables are locked
+    until it commits."""
+    statements = []
+    for table, _ in tables:
+        statements += [
+            f'ALTER TABLE "{table}" RENAME TO "{table}_unpartitioned"',
+            f'CREATE TABLE "{table}" (LIKE "{table}_unpartitioned"'
+            " INCLUDING DEFAULTS) PARTITION BY HASH (user_id)",
+        ]
+        statements += [
+            f'CREATE TABLE "{table}_p{remainder}" PARTITION OF "{table}"'
+            f" FOR VALUES WITH (MODULUS {partitions},"
+            f" REMAINDER {remainder})"
+            for remainder in range(partitions)
+        ]
+        statements += [
+            f'INSERT INTO "{table}" SELECT * FROM "{table}_unpartitioned"',
+            # The id sequence would be dropped with the old table
+            f'ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}".id',
+        ]
+    # Children first, their foreign keys reference the parents
+    statements += [
+        f'DROP TABLE "{table}_unpartitioned"' for table, _ in reversed(tables)
+    ]
+    for table, indexes in tables:
+        statements += [
+            f'CREATE INDEX "{_index_name(table, columns)}" ON "{table}"'
+            f" ({', '.join(columns)})"
+            for columns in indexes
+        ]
+    statements += [
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_fkey"'
+        f' FOREIGN KEY ({column}) REFERENCES "{referred}" (id)'
+        + (f" ON DELETE {ondelete}" if ondelete else "")
+        for table, column, referred, ondelete in FOREIGN_KEYS
+    ]
+    for parent, children in CASCADES:
+        statements += [
+            _cascade_function(parent, children),
+            f'CREATE TRIGGER "{parent}_delete_children" AFTER DELETE'
+            f' ON "{parent}" FOR EACH ROW'
+            f' EXECUTE FUNCTION "{parent}_delete_children"()',
+        ]
+    return statements
+
+
+def unpartition_ddl(tables: list = PARTITIONED_TABLES):
+    """Statements converting the partitioned routine tables, with their
+    rows, back to plain tables with primary keys and ON DELETE CASCADE
+    foreign keys between them. tables are the (table, indexed columns) the
+    tables were partitioned with. Children the triggers missed are deleted,
+    the foreign keys would not hold otherwise. Run them in one
+    transaction."""
+    statements = []
+    for parent, _ in CASCADES:
+        statements += [
+            f'DROP TRIGGER "{parent}_delete_children" ON "{parent}"',
+            f'DROP FUNCTION "{parent}_delete_children"()',
+        ]
+    for table, _ in tables:
+        statements += [
+            f'ALTER TABLE "{table}" RENAME TO "{table}_partitioned"',
+            f'CREATE TABLE "{table}" (LIKE "{table}_partitioned"'
+            " INCLUDING DEFAULTS)",
+            f'INSERT INTO "{table}" SELECT * FROM "{table}_partitioned"',
+            f'ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}".id',
+        ]
+    # Drops the partitions and the index names with them
+    statements += [
+        f'DROP TABLE "{table}_partitioned"' for table, _ in reversed(tables)
+    ]
+    statements += [
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey"'
+        " PRIMARY KEY (id)"
+        for table, _ in tables
+    ]
+    # Parents before children, so orphaned lists take their descriptions
+    for parent, children in CASCADES:
+        statements += [
+            f'DELETE FROM "{child}" WHERE NOT EXISTS (SELECT FROM'
+            f' "{parent}" WHERE "{parent}".id = "{child}".{column})'
+            for child, column in children
+        ]
+    # Only the partitioned layout indexes id and the cascades' columns
+    extra = {(table, "id") for table, _ in tables} | {
+        (child, column)
+        for _, children in CASCADES
+        for child, column in children
+    }
+    for table, indexes in tables:
+        statements += [
+            f'CREATE INDEX "{_index_name(table, columns)}" ON "{table}"'
+            f" ({', '.join(columns)})"
+            for columns in indexes
+            if (table, *columns) not in extra
+        ]
+    statements += [
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_fkey"'
+        f' FOREIGN KEY ({column}) REFERENCES "{referred}" (id)'
+        + (f" ON DELETE {ondelete}" if ondelete else "")
+        for table, column, referred, ondelete in [
+            *FOREIGN_KEYS,
+            *(
+                (child, column, parent, "CASCADE")
+                for parent, children in CASCADES
+                for child, column in children
+            ),
+        ]
+    ]
+    return statements
+
+
+def is_partitioned(connection):
+    return (
+        connection.exec_driver_sql(
+            "SELECT count(*) FROM pg_partitioned_table"
+            " WHERE partrelid = '\"BBR_tasks\"'::regclass"
+        ).scalar()
+        > 0
+    )
@@ -0,0 +1,230 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import event
+
+from backend.env_variables import (
+    SLOW_QUERY_EXPLAIN,
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_MS,
+)
+
+current_scope: ContextVar[Optional[dict]] = ContextVar(
+    "current_scope", default=None
+)
+
+_ROUTES_DIR = os.path.join("backend", "api", "src", "routes")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+# Statements with side effects ANALYZE would repeat, explained without it
+_VOLATILE = re.compile(
+    r"\b(?:nextval|setval|pg_advisory\w*|pg_notify|pg_current_xact_id\w*"
+    r"|txid_current)\s*\(|\bFOR\s+(?:NO\s+KEY\s+|KEY\s+)?(?:UPDATE|SHARE)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(statement: str):
+    # One entry per query shape: no literals, IN lists of any length alike
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def parameter_shape(parameters):
+    # Types only, bound values can hold passwords and personal data
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {
+                "rows": len(parameters),
+                "row": parameter_shape(parameters[0]),
+            }
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def query_origin():
+    """Name the controller function that ran the current statement, or the
+    innermost route module function when the route queries directly."""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        file_name = frame.f_code.co_filename
+        if _ROUTES_DIR in file_name:
+            package, module = os.path.split(file_name)
+            module = os.path.splitext(module)[0]
+            name = (
+                f"{os.path.basename(package)}.{module}.{frame.f_code.co_name}"
+            )
+            if module == "controller":
+                return name
+            fallback = fallback or name
+        frame = frame.f_back
+    return fallback
+
+
+def query_route():
+    scope = current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = route.path if route is not None else scope["path"]
+    return f"{scope['method']} {path}"
+
+
+class SlowQueryLog:
+    """Keeps the last SLOW_QUERY_LOG_SIZE statements slower than
+    SLOW_QUERY_MS.
+
+    On Postgres a SELECT that lands in the log is explained with
+    EXPLAIN (ANALYZE, BUFFERS) on its own connection in a background thread,
+    at most once per query shape per SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS.
+    SELECTs that lock rows or call volatile functions get a plain EXPLAIN.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        size: int,
+        explain: bool = True,
+        explain_interval: float = 60,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.entries = deque(maxlen=size)
+        self.recorded = 0
+        self._explained_at = {}
+        self._lock = threading.Lock()
+        self._explainer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bbr-explain"
+        )
+
+    def attach(self, engine):
+        if self.threshold <= 0:
+            return
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        # On the execution context, a statement that fails leaves nothing
+        # behind for the next one to pick up
+        context.query_started = time.perf_counter()
+
+    def _after_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        started = context.query_started
+        duration = time.perf_counter() - started
+        if duration < self.threshold:
+            return
+        # An execution option, conn.info outlives the checkout in the pool
+        if context.execution_options.get("explaining"):
+            return
+        self.record(conn, statement, parameters, duration)
+
+    def record(self, conn, statement, parameters, duration):
+        sql = normalize_sql(statement)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "sql": sql,
+            "parameters": parameter_shape(parameters),
+            "route": query_route(),
+            "origin": query_origin(),
+            "plan": None,
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.recorded += 1
+            explain = self._should_explain(conn, statement, sql)
+        print("Slow query", entry["duration_ms"], "ms", entry["origin"], sql)
+        if explain:
+            self._explainer.submit(
+                self._explain, conn.engine, statement, parameters, entry
+            )
+
+    def _should_explain(self, conn, statement, sql):
+        # ANALYZE runs the statement again, so never for writes
+        if not self.explain or conn.dialect.name != "postgresql":
+            return False
+        if not statement.lstrip()[:6].upper() == "SELECT":
+            return False
+        now = time.monotonic()
+        if now - self._explained_at.get(sql, -self.explain_interval) < (
+            self.explain_interval
+        ):
+            return False
+        self._explained_at[sql] = now
+        return True
+
+    def _explain(self, engine, statement, parameters, entry):
+        timeout_ms = int(max(self.threshold * 10, 1) * 1000)
+        try:
+            with engine.connect().execution_options(explaining=True) as conn:
+                conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {timeout_ms}"
+                )
+                explain = (
+                    "EXPLAIN "
+                    if _VOLATILE.search(statement)
+                    else "EXPLAIN (ANALYZE, BUFFERS) "
+                )
+                result = conn.exec_driver_sql(explain + statement, parameters)
+                entry["plan"] = "\n".join(row[0] for row in result)
+                conn.rollback()
+        except Exception as error:
+            entry["plan"] = f"EXPLAIN failed: {error}"
+
+    def snapshot(self, limit: Optional[int] = None):
+        with self._lock:
+            entries = list(self.entries)
+        entries.reverse()
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "recorded": self.recorded,
+            "entries": entries[:limit] if limit else entries,
+        }
+
+
+class QueryScopeMiddleware:
+    """Makes the request scope visible to engine events, so slow queries
+    can name their route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+slow_query_log = SlowQueryLog(
+    SLOW_QUERY_MS,
+    SLOW_QUERY_LOG_SIZE,
+    explain=SLOW_QUERY_EXPLAIN,
+    explain_interval=SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+)
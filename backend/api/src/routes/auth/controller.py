@@ -8,7 +8,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
-from backend.api.src.routes.users.controller import get_user_by_username
+from backend.api.src.routes.users.controller import (
+    get_cached_user,
+    get_user_by_username,
+)
 from backend.api.src.routes.users.schemas import User
 from backend.api.src.routes.utils.db_dependency import get_db
 
@@ -54,6 +57,18 @@ def create_access_token(data: dict, expired_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def get_user_by_token(db: Session, token: str):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        token_data = TokenData(username=username)
+    except JWTError:
+        return None
+    return get_cached_user(db, token_data.username)
+
+
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Session = Depends(get_db),
@@ -63,15 +78,7 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    user = get_user_by_username(username=token_data.username, db=db)
+    user = get_user_by_token(db, token)
     if user is None:
         raise credentials_exception
     return user
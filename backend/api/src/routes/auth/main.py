@@ -7,6 +7,7 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
+from backend.api.src.routes.utils.admission import auth_admission
 from backend.api.src.routes.utils.db_dependency import get_db
 
 from .schemas import Token
@@ -30,8 +31,11 @@ router_auth = APIRouter(
 # Authentication endpoints
 
 
-@router_auth.post("/token", response_model=Token)
-async def login_for_access_token(
+# Sync so bcrypt runs in the threadpool instead of blocking the event loop
+@router_auth.post(
+    "/token", response_model=Token, dependencies=[Depends(auth_admission)]
+)
+def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db),
 ) -> Token:
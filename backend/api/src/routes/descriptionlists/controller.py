@@ -1,19 +1,53 @@
+from typing import Optional
+
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
 
 from . import schemas
 from backend.api import models
+from backend.api.src.routes.descriptions.schemas import TaskDescription
+from backend.api.src.routes.utils.ownership import owned_by
+from backend.api.src.routes.utils.pipeline import (
+    parent_user_id,
+    write_returning,
+    written_values,
+)
+from backend.api.src.routes.utils.sparse import SparseModel
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+description_list_sparse_model = SparseModel(
+    models.BBR_TaskDescriptionList,
+    schemas.TaskDescriptionList,
+    relationships={
+        "descriptions": SparseModel(
+            models.BBR_TaskDescription, TaskDescription
+        )
+    },
+    # Copies of template lists replace the template's list, see
+    # routes/tasks/templates.py
+    keys=["template_list_id"],
+)
+
+description_list_tree_options = (
+    selectinload(models.BBR_TaskDescriptionList.descriptions),
+)
+
 # Description list operations
 
 
-def get_description_lists_by_task_id(db: Session, task_id: int):
+def get_description_lists_by_task_id(
+    db: Session, task_id: int, user_id: Optional[int], options=()
+):
     return (
         db.query(models.BBR_TaskDescriptionList)
-        .filter(models.BBR_TaskDescriptionList.task_id == task_id)
+        .filter(
+            owned_by(models.BBR_TaskDescriptionList, user_id),
+            models.BBR_TaskDescriptionList.task_id == task_id,
+        )
+        .options(*options)
         .all()
     )
 
@@ -31,14 +65,60 @@ def create_description_list(
     return db_description_list
 
 
-def get_description_list_by_id(db: Session, id: int):
+def pipelined_create_description_list(
+    db: Session, description_list: schemas.TaskDescriptionListCreate
+):
+    # create_description_list in one statement, see utils/pipeline.py
+    values = description_list.model_dump()
+    values["user_id"] = parent_user_id(
+        models.BBR_Task, description_list.task_id
+    )
+    return write_returning(
+        db,
+        insert(models.BBR_TaskDescriptionList).values(
+            **written_values(values)
+        ),
+        models.BBR_TaskDescriptionList,
+        "create",
+    )
+
+
+def get_description_list_by_id(db: Session, id: int, options=()):
     return (
         db.query(models.BBR_TaskDescriptionList)
         .filter(models.BBR_TaskDescriptionList.id == id)
+        .options(*options)
         .first()
     )
 
 
+def get_user_description_lists_by_ids(
+    db: Session, user_id: int, ids: list, options=description_list_tree_options
+):
+    return (
+        db.query(models.BBR_TaskDescriptionList)
+        .filter(
+            models.BBR_TaskDescriptionList.user_id == user_id,
+            models.BBR_TaskDescriptionList.id.in_(ids),
+        )
+        .options(*options)
+        .all()
+    )
+
+
+def get_description_list_with_task(db: Session, id: int):
+    # List and its owning task in one query, (None, None) if not found
+    return (
+        db.query(models.BBR_TaskDescriptionList, models.BBR_Task)
+        .join(
+            models.BBR_Task,
+            models.BBR_Task.id == models.BBR_TaskDescriptionList.task_id,
+        )
+        .filter(models.BBR_TaskDescriptionList.id == id)
+        .first()
+    ) or (None, None)
+
+
 def get_task_description_list_by_title(db: Session, task_id: int, title: str):
     return (
         db.query(models.BBR_TaskDescriptionList)
@@ -1,32 +1,101 @@
-from typing import Annotated
+from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from backend.api import models
 from backend.api.src.routes.auth.controller import get_current_active_user
 from backend.api.src.routes.descriptionlists.controller import (
     create_description_list,
     delete_description_list,
+    description_list_sparse_model,
+    description_list_tree_options,
     get_description_list_by_id,
     get_task_description_list_by_title,
     get_description_lists_by_task_id,
+    get_user_description_lists_by_ids,
+    pipelined_create_description_list,
     update_description_list,
 )
 from backend.api.src.routes.descriptionlists.schemas import (
     TaskDescriptionList,
+    TaskDescriptionListBatch,
     TaskDescriptionListCreate,
 )
 from backend.api.src.routes.tasks.controller import get_task_by_id
+from backend.api.src.routes.tasks.templates import (
+    TEMPLATE_READ_ONLY,
+    get_list_copy,
+    get_template_lists,
+    get_user_template_lists_by_ids,
+    merge_lists,
+    release_template_list,
+    remove_template_list,
+)
 from backend.api.src.routes.users.schemas import User
-from backend.api.src.routes.utils.db_dependency import get_db
+from backend.api.src.routes.utils.batch import split_batch
+from backend.api.src.routes.utils.pipeline import pipelined_writes
+from backend.api.src.routes.utils.schemas import BatchIds
+from backend.api.src.routes.utils.sparse import (
+    SparseSelection,
+    parse_sparse,
+    sparse_options,
+    sparse_response,
+)
+from backend.api.src.routes.utils.encoding import NegotiatedRoute
+from backend.api.src.routes.utils.db_dependency import (
+    get_db,
+    get_read_db,
+)
 from backend.api.src.routes.tasks.main import router_tasks
 
 router_lists = APIRouter(
     prefix="/api/descriptionlists",
     tags=["Descriptionslists"],
+    route_class=NegotiatedRoute,
 )
 
 # Task description list operations
 
 
+def description_list_options(selection: Optional[SparseSelection]):
+    if selection is None:
+        return description_list_tree_options
+    return sparse_options(description_list_sparse_model, selection)
+
+
+def description_lists_response(
+    db: Session,
+    db_task: models.BBR_Task,
+    selection: Optional[SparseSelection],
+):
+    options_selection = selection
+    if (
+        db_task.template_id is not None
+        and selection is not None
+        and "template_list_id" not in selection.columns
+    ):
+        # template_list_id is needed to merge in the template's lists
+        options_selection = SparseSelection(
+            [*selection.columns, "template_list_id"], selection.expand
+        )
+    description_lists = get_description_lists_by_task_id(
+        db=db,
+        task_id=db_task.id,
+        user_id=db_task.user_id,
+        options=description_list_options(options_selection),
+    )
+    if db_task.template_id is not None:
+        description_lists = merge_lists(
+            db_task.id,
+            description_lists,
+            get_template_lists(db, [db_task.template_id]),
+        )
+    if selection is None:
+        return description_lists
+    return sparse_response(
+        description_list_sparse_model, selection, description_lists
+    )
+
+
 @router_tasks.get(
     "/{id}/descriptionlists/user",
     response_model=list[TaskDescriptionList],
@@ -34,17 +103,19 @@ router_lists = APIRouter(
 def get_user_description_lists_by_task_id_ep(
     id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
+    selection = parse_sparse(description_list_sparse_model, fields, expand)
+
     db_task = get_task_by_id(db, id)
     if not db_task:
         raise HTTPException(
             status_code=400, detail="Task description list task not found"
         )
 
-    description_lists = get_description_lists_by_task_id(db=db, task_id=id)
-
-    return description_lists
+    return description_lists_response(db, db_task, selection)
 
 
 @router_tasks.get(
@@ -52,43 +123,84 @@ def get_user_description_lists_by_task_id_ep(
     response_model=list[TaskDescriptionList],
 )
 def get_null_user_description_lists_by_task_id_ep(
-    id: int, db: Session = Depends(get_db)
+    id: int,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
+    selection = parse_sparse(description_list_sparse_model, fields, expand)
+
     db_task = get_task_by_id(db, id)
     if not db_task:
         raise HTTPException(
             status_code=400, detail="Task description list task not found"
         )
 
-    if not db_task.user_id.is_(None):
-        raise HTTPException("List task user not null")
+    if db_task.user_id is not None:
+        raise HTTPException(status_code=400, detail="List task user not null")
 
-    description_lists = get_description_lists_by_task_id(db=db, task_id=id)
+    return description_lists_response(db, db_task, selection)
 
-    return description_lists
+
+@router_lists.post("/user/batch", response_model=TaskDescriptionListBatch)
+def get_user_description_lists_by_ids_ep(
+    batch: BatchIds,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_read_db),
+):
+    db_lists = get_user_description_lists_by_ids(
+        db, user_id=current_user.id, ids=batch.ids
+    )
+    missing = set(batch.ids) - {db_list.id for db_list in db_lists}
+    if missing:
+        db_lists += get_user_template_lists_by_ids(
+            db, current_user.id, list(missing)
+        )
+    return split_batch(batch.ids, db_lists)
 
 
 @router_lists.get("/{id}/user", response_model=TaskDescriptionList)
 def get_user_description_list_by_id_ep(
     id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
-    db_list = get_description_list_by_id(db, id)
+    selection = parse_sparse(description_list_sparse_model, fields, expand)
+    db_list = get_description_list_by_id(
+        db, id, options=description_list_options(selection)
+    )
 
     if not db_list:
         raise HTTPException(
             status_code=400, detail=f"Description list {id} not registered"
         )
 
+    if selection is not None:
+        return sparse_response(
+            description_list_sparse_model, selection, db_list
+        )
+
     return db_list
 
 
 @router_lists.get("/{id}/nulluser", response_model=TaskDescriptionList)
 def get_null_user_description_list_by_id_ep(
-    id: int, db: Session = Depends(get_db)
+    id: int,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
-    db_list = get_description_list_by_id(db, id)
+    selection = parse_sparse(description_list_sparse_model, fields, expand)
+    # task_id is needed for the template check below
+    if selection is not None and "task_id" not in selection.columns:
+        options = description_list_options(
+            SparseSelection([*selection.columns, "task_id"], selection.expand)
+        )
+    else:
+        options = description_list_options(selection)
+    db_list = get_description_list_by_id(db, id, options=options)
 
     if not db_list:
         raise HTTPException(
@@ -97,8 +209,16 @@ def get_null_user_description_list_by_id_ep(
 
     db_task = get_task_by_id(db, db_list.task_id)
 
-    if not db_task or not db_task.user_id.is_(None):
-        raise HTTPException("List tasks user not null or task not exist")
+    if not db_task or db_task.user_id is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="List tasks user not null or task not exist",
+        )
+
+    if selection is not None:
+        return sparse_response(
+            description_list_sparse_model, selection, db_list
+        )
 
     return db_list
 
@@ -120,6 +240,9 @@ def create_description_list_ep(
             status_code=400, detail="Task description list task not found"
         )
 
+    if db_task.user_id is None:
+        raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+
     title = description_list.title
     db_title = get_task_description_list_by_title(
         db=db, task_id=id, title=title
@@ -130,6 +253,8 @@ def create_description_list_ep(
             status_code=400, detail="Task description list already registered"
         )
 
+    if pipelined_writes(db):
+        return pipelined_create_description_list(db, description_list)
     return create_description_list(db=db, description_list=description_list)
 
 
@@ -150,6 +275,13 @@ def update_description_list_ep(
             status_code=400, detail="Description list is not registered"
         )
 
+    if db_list.user_id is None:
+        # Edits through a copy-on-write task go to the user's copy
+        db_copy = get_list_copy(db, current_user.id, id)
+        if db_copy is None:
+            raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+        db_list = db_copy
+
     if descriptionList.descriptions is None:
         descriptionList.descriptions = db_list.descriptions
 
@@ -170,6 +302,17 @@ def delete_description_list_ep(
             detail=("Task description list" + f" {id} not found"),
         )
 
+    if db_task_description_list.user_id is None:
+        # Only hidden from the user's copy-on-write task, templates are
+        # shared by everyone
+        if not remove_template_list(
+            db, current_user.id, db_task_description_list
+        ):
+            raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+        db.commit()
+        return True
+
+    release_template_list(db, db_task_description_list)
     return delete_description_list(
         db=db, task_description_list=db_task_description_list
     )
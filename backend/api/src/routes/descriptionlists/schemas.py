@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from backend.api.src.routes.descriptions.schemas import TaskDescription
 
@@ -11,7 +11,8 @@ class TagBase(BaseModel):
 
 
 class TagCreate(TagBase):
-    pass
+    # BBR_tags.title is a VARCHAR(30)
+    title: str = Field(min_length=1, max_length=30)
 
 
 class Tag(TagBase):
@@ -36,3 +37,8 @@ class TaskDescriptionList(TaskDescriptionListBase):
 
     class Config:
         from_attributes = True
+
+
+class TaskDescriptionListBatch(BaseModel):
+    items: List[TaskDescriptionList]
+    missing: List[int]
@@ -1,9 +1,18 @@
+from typing import Optional
+
 from passlib.context import CryptContext
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 
 from . import schemas
 
 from backend.api import models
+from backend.api.src.routes.utils.ownership import owned_by
+from backend.api.src.routes.utils.pipeline import (
+    parent_user_id,
+    write_returning,
+    written_values,
+)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -11,14 +20,17 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # List description operations
 
 
-def get_list_descriptions(db: Session, description_list_id: int):
+def get_list_descriptions(
+    db: Session, description_list_id: int, user_id: Optional[int]
+):
     return (
         db.query(models.BBR_TaskDescription)
         .filter(
+            owned_by(models.BBR_TaskDescription, user_id),
             (
                 models.BBR_TaskDescription.description_list_id
                 == description_list_id
-            )
+            ),
         )
         .all()
     )
@@ -32,6 +44,17 @@ def get_list_description_by_id(db: Session, id: int):
     )
 
 
+def get_user_list_descriptions_by_ids(db: Session, user_id: int, ids: list):
+    return (
+        db.query(models.BBR_TaskDescription)
+        .filter(
+            models.BBR_TaskDescription.user_id == user_id,
+            models.BBR_TaskDescription.id.in_(ids),
+        )
+        .all()
+    )
+
+
 def create_list_description(
     db: Session, description: schemas.TaskDescriptionCreate
 ):
@@ -42,6 +65,22 @@ def create_list_description(
     return db_description
 
 
+def pipelined_create_list_description(
+    db: Session, description: schemas.TaskDescriptionCreate
+):
+    # create_list_description in one statement, see utils/pipeline.py
+    values = description.model_dump()
+    values["user_id"] = parent_user_id(
+        models.BBR_TaskDescriptionList, description.description_list_id
+    )
+    return write_returning(
+        db,
+        insert(models.BBR_TaskDescription).values(**written_values(values)),
+        models.BBR_TaskDescription,
+        "create",
+    )
+
+
 def update_list_description(
     db: Session,
     db_description: schemas.TaskDescription,
@@ -53,6 +92,26 @@ def update_list_description(
     return db_description
 
 
+def pipelined_update_list_description(
+    db: Session,
+    db_description: schemas.TaskDescription,
+    description: schemas.TaskDescription,
+):
+    # update_list_description in one statement, see utils/pipeline.py
+    values = {
+        "description": description.description,
+        "description_list_id": description.description_list_id,
+    }
+    return write_returning(
+        db,
+        update(models.BBR_TaskDescription)
+        .where(models.BBR_TaskDescription.id == db_description.id)
+        .values(**written_values(values)),
+        models.BBR_TaskDescription,
+        "update",
+    )
+
+
 def delete_list_description(db: Session, description: schemas.TaskDescription):
     db.delete(description)
     db.commit()
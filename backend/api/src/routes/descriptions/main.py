@@ -1,25 +1,44 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from backend.api.src.routes.auth.controller import get_current_active_user
 from backend.api.src.routes.descriptionlists.controller import (
     get_description_list_by_id,
+    get_description_list_with_task,
 )
 from backend.api.src.routes.descriptions.controller import (
     create_list_description,
     delete_list_description,
     get_list_description_by_id,
     get_list_descriptions,
+    get_user_list_descriptions_by_ids,
+    pipelined_create_list_description,
+    pipelined_update_list_description,
     update_list_description,
 )
 from backend.api.src.routes.descriptions.schemas import (
     TaskDescription,
+    TaskDescriptionBatch,
     TaskDescriptionCreate,
 )
-from backend.api.src.routes.tasks.controller import get_task_by_id
+from backend.api.src.routes.tasks.templates import (
+    TEMPLATE_READ_ONLY,
+    get_description_copy,
+    get_list_copy,
+    get_user_template_descriptions_by_ids,
+    get_user_template_lists_by_ids,
+)
 from backend.api.src.routes.users.schemas import User
-from backend.api.src.routes.utils.db_dependency import get_db
+from backend.api.src.routes.utils.batch import split_batch
+from backend.api.src.routes.utils.pipeline import pipelined_writes
+from backend.api.src.routes.utils.schemas import BatchIds
+from backend.api.src.routes.utils.singleflight import read_coalescer
+from backend.api.src.routes.utils.db_dependency import (
+    get_db,
+    get_read_db,
+)
 from backend.api.src.routes.descriptionlists.main import router_lists
 
 router_descriptions = APIRouter(
@@ -27,6 +46,8 @@ router_descriptions = APIRouter(
     tags=["Descriptions"],
 )
 
+task_descriptions_adapter = TypeAdapter(list[TaskDescription])
+
 # List description operations
 
 
@@ -37,41 +58,70 @@ router_descriptions = APIRouter(
 def get_user_list_descriptions_ep(
     id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    db_list = get_description_list_by_id(db=db, id=id)
+    db_list, db_task = get_description_list_with_task(db=db, id=id)
 
     if not db_list:
         raise HTTPException(
             status_code=400, detail=(f"Description list {id} not registered")
         )
 
-    db_task = get_task_by_id(db, db_list.task_id)
+    if db_task.user_id is None:
+        # Template lists shown in the user's copy-on-write tasks
+        template_lists = get_user_template_lists_by_ids(
+            db, current_user.id, [id]
+        )
+        if template_lists:
+            return template_lists[0].descriptions
 
-    if not db_task or db_task.user_id != current_user.id:
+    if db_task.user_id != current_user.id:
         raise HTTPException(status_code=400, detail="Task not exist for user")
 
-    return get_list_descriptions(db=db, description_list_id=id)
+    return get_list_descriptions(
+        db=db, description_list_id=id, user_id=db_task.user_id
+    )
 
 
 @router_lists.get(
     "/{id}/descriptions/nulluser",
     response_model=list[TaskDescription],
 )
-def get_null_user_list_descriptions_ep(id: int, db: Session = Depends(get_db)):
-    db_list = get_description_list_by_id(db=db, id=id)
-
-    if not db_list:
-        raise HTTPException(
-            status_code=400, detail=(f"Description list {id} not registered")
+def get_null_user_list_descriptions_ep(
+    id: int, db: Session = Depends(get_read_db)
+):
+    # Shared templates get bursts of identical requests, run the queries
+    # and serialization once per burst
+    def fetch_descriptions_json():
+        db_list, db_task = get_description_list_with_task(db=db, id=id)
+
+        if not db_list:
+            raise HTTPException(
+                status_code=400,
+                detail=(f"Description list {id} not registered"),
+            )
+
+        if db_task.user_id is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="List tasks user not null or task not exist",
+            )
+
+        return task_descriptions_adapter.dump_json(
+            task_descriptions_adapter.validate_python(
+                get_list_descriptions(
+                    db=db, description_list_id=id, user_id=db_task.user_id
+                ),
+                from_attributes=True,
+            )
         )
 
-    db_task = get_task_by_id(db, db_list.task_id)
-
-    if not db_task or not db_task.user_id.is_(None):
-        raise HTTPException("List tasks user not null or task not exist")
-
-    return get_list_descriptions(db=db, description_list_id=id)
+    return Response(
+        content=read_coalescer.do(
+            ("list_descriptions", id), fetch_descriptions_json
+        ),
+        media_type="application/json",
+    )
 
 
 @router_lists.post(
@@ -89,9 +139,39 @@ def create_list_description_ep(
     if not db_list:
         raise HTTPException(f"Description list {id} not registered")
 
+    if db_list.user_id is None:
+        # Descriptions added through a copy-on-write task go to the user's
+        # copy of the list
+        db_copy = get_list_copy(db, current_user.id, id)
+        if db_copy is None:
+            raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+        db.flush()
+        description.description_list_id = db_copy.id
+
+    if pipelined_writes(db):
+        return pipelined_create_list_description(db, description)
     return create_list_description(db, description=description)
 
 
+@router_descriptions.post("/user/batch", response_model=TaskDescriptionBatch)
+def get_user_list_descriptions_by_ids_ep(
+    batch: BatchIds,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_read_db),
+):
+    db_descriptions = get_user_list_descriptions_by_ids(
+        db, user_id=current_user.id, ids=batch.ids
+    )
+    missing = set(batch.ids) - {
+        db_description.id for db_description in db_descriptions
+    }
+    if missing:
+        db_descriptions += get_user_template_descriptions_by_ids(
+            db, current_user.id, list(missing)
+        )
+    return split_batch(batch.ids, db_descriptions)
+
+
 @router_descriptions.post("/{id}/update", response_model=TaskDescription)
 def update_list_description_ep(
     description: TaskDescription,
@@ -105,6 +185,28 @@ def update_list_description_ep(
             status_code=400, detail="Description is not registered"
         )
 
+    if db_description is not None and db_description.user_id is None:
+        # Edits through a copy-on-write task go to the user's copy
+        db_copy = get_description_copy(db, current_user.id, description.id)
+        if db_copy is None:
+            raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+        db.flush()
+        if (
+            description.description_list_id
+            == db_description.description_list_id
+        ):
+            description.description_list_id = db_copy.description_list_id
+        db_description = db_copy
+
+    # Moves go through the ORM, which passes on the new list's user and
+    # tombstones the row for the old one, see utils/ownership.py
+    moved = description.description_list_id != (
+        db_description.description_list_id
+    )
+    if pipelined_writes(db) and not moved:
+        return pipelined_update_list_description(
+            db, db_description, description
+        )
     return update_list_description(db, db_description, description)
 
 
@@ -121,4 +223,11 @@ def delete_list_description_ep(
     if not db_description:
         raise HTTPException("List description not registered")
 
+    if db_description.user_id is None:
+        db_copy = get_description_copy(db, current_user.id, description_id)
+        if db_copy is None:
+            raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+        db.flush()
+        db_description = db_copy
+
     return delete_list_description(db, db_description)
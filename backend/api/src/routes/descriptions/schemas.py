@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel
 
 
@@ -15,3 +17,8 @@ class TaskDescription(TaskDescriptionBase):
 
     class Config:
         from_attributes = True
+
+
+class TaskDescriptionBatch(BaseModel):
+    items: List[TaskDescription]
+    missing: List[int]
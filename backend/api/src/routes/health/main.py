@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from .warmup import warm_up
+
+router_health = APIRouter(
+    prefix="/api/health",
+    tags=["Health"],
+    include_in_schema=False,
+)
+
+
+@router_health.get("")
+def get_liveness_ep():
+    return {"status": "ok"}
+
+
+@router_health.get("/ready")
+def get_readiness_ep():
+    # 503 keeps the load balancer away until the warm-up has finished
+    snapshot = warm_up.snapshot()
+    return JSONResponse(
+        snapshot, status_code=200 if snapshot["ready"] else 503
+    )
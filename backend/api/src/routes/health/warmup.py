@@ -0,0 +1,156 @@
+import threading
+import time
+
+from backend.api import models
+from backend.api.src.config.database import (
+    ReplicaSessionLocals,
+    SessionLocal,
+    engine,
+    replica_engines,
+)
+from backend.api.src.routes.auth.controller import pwd_context
+from backend.api.src.routes.descriptionlists.controller import (
+    get_user_description_lists_by_ids,
+)
+from backend.api.src.routes.descriptions.controller import (
+    get_user_list_descriptions_by_ids,
+)
+from backend.api.src.routes.sync.controller import get_user_changes
+from backend.api.src.routes.taskcategories.registry import (
+    task_category_registry,
+)
+from backend.api.src.routes.tasks.controller import (
+    get_null_user_tasks,
+    get_user_routine_summary,
+    get_user_task_records_by_ids,
+    get_user_tasks,
+)
+from backend.api.src.routes.tasks.schemas import Task
+from backend.api.src.routes.users.controller import (
+    get_cached_user,
+    get_user_by_username,
+)
+from backend.api.src.routes.utils.projection import record_type
+from backend.env_variables import (
+    WARMUP,
+    WARMUP_CONNECTIONS,
+    WARMUP_RETRY_SECONDS,
+)
+
+# Nobody has id 0, the hot statements compile and run but find nothing
+_nobody = record_type(models.BBR_User)(["id", "username"], [0, ""])
+
+
+def open_connections():
+    # Connections closed here go back to the pool, up to its size (5)
+    for pool_engine in [engine, *replica_engines]:
+        connections = [
+            pool_engine.connect() for _ in range(WARMUP_CONNECTIONS)
+        ]
+        for connection in connections:
+            connection.close()
+
+
+def load_password_hashing():
+    # passlib loads and self tests the bcrypt backend on first use
+    pwd_context.dummy_verify()
+
+
+def compile_statements():
+    # SQLAlchemy caches compiled statements per engine, reads run on the
+    # replicas and auth on the primary
+    with SessionLocal() as db:
+        get_user_by_username(db, "")
+        get_cached_user(db, "")
+    for Session in [SessionLocal, *ReplicaSessionLocals]:
+        with Session() as db:
+            get_user_tasks(db, _nobody)
+            get_user_task_records_by_ids(db, _nobody, [0])
+            get_user_routine_summary(db, _nobody)
+            get_user_description_lists_by_ids(db, 0, [0])
+            get_user_list_descriptions_by_ids(db, 0, [0])
+            get_user_changes(db, 0)
+
+
+def load_catalog():
+    task_category_registry.load()
+    for Session in [SessionLocal, *ReplicaSessionLocals]:
+        with Session() as db:
+            # Also runs the template trees through the response model
+            for task in get_null_user_tasks(db):
+                Task.model_validate(task).model_dump_json()
+
+
+class WarmUp:
+    """Pays the first request costs before traffic arrives.
+
+    After a deploy or a cold start, the first requests would open the
+    database connections, load bcrypt, compile the statements and read the
+    categories and templates. start() does that in a background thread,
+    and /api/health/ready reports ready once every step has passed. A
+    failed run, such as the database not being up yet, is retried every
+    WARMUP_RETRY_SECONDS.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.ready = threading.Event()
+        self.error = None
+        self.seconds: dict[str, float] = {}
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if not WARMUP:
+            self.ready.set()
+            return
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run_until_ready, name="bbr-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def run(self):
+        for name, step in self.steps:
+            start = time.perf_counter()
+            step()
+            self.seconds[name] = time.perf_counter() - start
+        self.error = None
+        self.ready.set()
+
+    def _run_until_ready(self):
+        while not self._stopped.is_set():
+            try:
+                self.run()
+                return
+            except Exception as error:
+                self.error = f"{type(error).__name__}: {error}"
+                print("Warm-up failed, retrying:", error)
+                self._stopped.wait(WARMUP_RETRY_SECONDS)
+
+    def snapshot(self):
+        return {
+            "ready": self.ready.is_set(),
+            "error": self.error,
+            "steps_ms": {
+                name: seconds * 1000 for name, seconds in self.seconds.items()
+            },
+        }
+
+
+warm_up = WarmUp(
+    [
+        ("connections", open_connections),
+        ("password_hashing", load_password_hashing),
+        ("statements", compile_statements),
+        ("catalog", load_catalog),
+    ]
+)
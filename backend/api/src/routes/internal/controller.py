@@ -0,0 +1,20 @@
+import hmac
+from typing import Annotated, Optional
+
+from fastapi import Header, HTTPException
+
+from backend.env_variables import INTERNAL_API_TOKEN
+
+
+def is_internal_token(token: Optional[str]):
+    if not INTERNAL_API_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, INTERNAL_API_TOKEN)
+
+
+def require_internal_token(
+    x_internal_token: Annotated[Optional[str], Header()] = None,
+):
+    # Look like a missing route to anyone without the token
+    if not is_internal_token(x_internal_token):
+        raise HTTPException(status_code=404, detail="Not Found")
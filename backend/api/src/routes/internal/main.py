@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from backend.api.src.config.slow_queries import slow_query_log
+
+from backend.api.src.routes.internal.controller import require_internal_token
+from backend.api.src.routes.notifications.broker import change_broker
+from backend.api.src.routes.utils.admission import auth_admission
+from backend.api.src.routes.utils.cache import shared_cache
+from backend.api.src.routes.utils.singleflight import read_coalescer
+
+router_internal = APIRouter(
+    prefix="/api/internal",
+    tags=["Internal"],
+    dependencies=[Depends(require_internal_token)],
+    include_in_schema=False,
+)
+
+
+@router_internal.get("/metrics")
+def get_metrics_ep():
+    return {
+        "auth_admission": auth_admission.snapshot(),
+        "read_coalescer": read_coalescer.snapshot(),
+        "notifications": dict(change_broker.metrics),
+        "cache": shared_cache.snapshot(),
+    }
+
+
+@router_internal.get("/slow-queries")
+def get_slow_queries_ep(limit: Optional[int] = None):
+    return slow_query_log.snapshot(limit)
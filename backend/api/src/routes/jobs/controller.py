@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.env_variables import JOB_MAX_ATTEMPTS
+
+# Job operations
+
+
+def get_job_by_id(db: Session, id: int):
+    return db.query(models.BBR_Job).filter(models.BBR_Job.id == id).first()
+
+
+def create_job(db: Session, kind: str, payload: dict, user_id: int = None):
+    db_job = models.BBR_Job(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        max_attempts=JOB_MAX_ATTEMPTS,
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def claim_job(db: Session, id: int):
+    # Conditional update, so only one worker thread or process runs a job
+    claimed = (
+        db.query(models.BBR_Job)
+        .filter(models.BBR_Job.id == id, models.BBR_Job.status == "queued")
+        .update(
+            {
+                models.BBR_Job.status: "running",
+                models.BBR_Job.attempts: models.BBR_Job.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return claimed == 1
+
+
+def update_job(db: Session, id: int, **values):
+    db.query(models.BBR_Job).filter(models.BBR_Job.id == id).update(
+        values, synchronize_session=False
+    )
+    db.commit()
+
+
+def touch_job(db: Session, id: int):
+    # Heartbeat of a running job, keeps requeue_stale_jobs off it
+    db.query(models.BBR_Job).filter(
+        models.BBR_Job.id == id, models.BBR_Job.status == "running"
+    ).update(
+        {models.BBR_Job.updated_at: datetime.now(timezone.utc)},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def requeue_stale_jobs(db: Session, stale_seconds: float):
+    stale_before = datetime.now(timezone.utc) - timedelta(
+        seconds=stale_seconds
+    )
+    stale = [
+        models.BBR_Job.status == "running",
+        models.BBR_Job.updated_at < stale_before,
+    ]
+    ids = [id for (id,) in db.query(models.BBR_Job.id).filter(*stale)]
+    # The status check again, a job may have finished in between
+    db.query(models.BBR_Job).filter(models.BBR_Job.id.in_(ids), *stale).update(
+        {models.BBR_Job.status: "queued"}, synchronize_session=False
+    )
+    db.commit()
+    return ids
+
+
+def get_queued_job_ids(db: Session):
+    return [
+        id
+        for (id,) in db.query(models.BBR_Job.id)
+        .filter(models.BBR_Job.status == "queued")
+        .order_by(models.BBR_Job.id)
+        .all()
+    ]
@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session
+
+from backend.api.src.routes.notifications.broker import change_broker
+from backend.api.src.routes.tasks.controller import (
+    copy_task_for_user,
+    get_task_by_id,
+    rebalance_user_task_sort_order,
+)
+from backend.api.src.routes.users.controller import (
+    get_user_by_id,
+    purge_user,
+)
+from backend.api.src.routes.utils.cache import (
+    routine_summary_key,
+    shared_cache,
+)
+from backend.api.src.routes.utils.read_your_writes import (
+    mark_written,
+    user_key,
+)
+
+from .runner import job_runner
+
+# Job handlers get their own session, the job payload and a progress
+# callback. The return value is stored as the job result.
+
+
+def copy_task_job(db: Session, payload: dict, report_progress):
+    db_task = get_task_by_id(db, payload["task_id"])
+    db_user = get_user_by_id(db, payload["user_id"])
+    if not db_task or not db_user:
+        raise ValueError("Task or user not found")
+    db_copied_task = copy_task_for_user(
+        db,
+        db_task,
+        db_user,
+        report_progress=report_progress,
+        copy_on_write=payload.get("copy_on_write", False),
+    )
+    mark_written(user_key(db_user.username))
+    return {"task_id": db_copied_task.id}
+
+
+def purge_user_job(db: Session, payload: dict, report_progress):
+    purge_user(db, payload["user_id"], report_progress=report_progress)
+    return {"user_id": payload["user_id"]}
+
+
+def rebalance_task_sort_order_job(db: Session, payload: dict, report_progress):
+    count = rebalance_user_task_sort_order(
+        db, payload["user_id"], report_progress=report_progress
+    )
+    db_user = get_user_by_id(db, payload["user_id"])
+    if db_user:
+        mark_written(user_key(db_user.username))
+    # Bulk updates bypass the session change events
+    shared_cache.invalidate(routine_summary_key(payload["user_id"]))
+    change_broker.notify(
+        {payload["user_id"]: [{"type": "task", "op": "reorder"}]}
+    )
+    return {"tasks": count}
+
+
+job_runner.register("copy_task", copy_task_job, concurrency=2)
+job_runner.register("purge_user", purge_user_job, concurrency=1)
+job_runner.register(
+    "rebalance_task_sort_order", rebalance_task_sort_order_job, concurrency=1
+)
@@ -0,0 +1,42 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.api.src.routes.auth.controller import get_current_active_user
+from backend.api.src.routes.jobs.controller import get_job_by_id
+from backend.api.src.routes.jobs.schemas import Job, JobProgress
+from backend.api.src.routes.users.schemas import User
+from backend.api.src.routes.utils.db_dependency import get_db
+
+router_jobs = APIRouter(
+    prefix="/api/jobs",
+    tags=["Jobs"],
+)
+
+# Job operations. Status is read from primary, replicas may lag behind.
+
+
+def get_user_job(db: Session, id: int, user: User):
+    db_job = get_job_by_id(db=db, id=id)
+    if not db_job or db_job.user_id != user.id:
+        raise HTTPException(status_code=400, detail="Job not found")
+    return db_job
+
+
+@router_jobs.get("/{id}", response_model=Job)
+def get_job_ep(
+    id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    return get_user_job(db, id, current_user)
+
+
+@router_jobs.get("/{id}/progress", response_model=JobProgress)
+def get_job_progress_ep(
+    id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    return get_user_job(db, id, current_user)
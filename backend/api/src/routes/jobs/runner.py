@@ -0,0 +1,181 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.api.src.config.database import SessionLocal
+from backend.env_variables import (
+    JOB_HEARTBEAT_SECONDS,
+    JOB_POLL_SECONDS,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_STALE_SECONDS,
+    JOB_WORKERS,
+)
+
+from .controller import (
+    claim_job,
+    create_job,
+    get_job_by_id,
+    get_queued_job_ids,
+    requeue_stale_jobs,
+    touch_job,
+    update_job,
+)
+
+
+class JobRunner:
+    """Runs BBR_jobs rows on a local thread pool, no broker needed.
+
+    The table is the source of truth: enqueue() commits the row before
+    submitting it, and start() picks up rows left queued by a previous
+    process. Running jobs touch their row every JOB_HEARTBEAT_SECONDS,
+    jobs left running by a crashed worker stop doing so and are requeued
+    at start and every JOB_POLL_SECONDS after. Handlers get their own
+    session and a progress callback.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._handlers = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+        self._poller = None
+        self._stopped = threading.Event()
+
+    def register(self, kind: str, handler, concurrency: int = 1):
+        self._handlers[kind] = handler
+        self._limits[kind] = threading.BoundedSemaphore(concurrency)
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="bbr-job"
+        )
+        with SessionLocal() as db:
+            requeue_stale_jobs(db, JOB_STALE_SECONDS)
+            for id in get_queued_job_ids(db):
+                self.submit(id)
+        self._stopped.clear()
+        self._poller = threading.Thread(
+            target=self._poll, name="bbr-job-poll", daemon=True
+        )
+        self._poller.start()
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join(timeout=5)
+            self._poller = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def requeue_stale(self):
+        with SessionLocal() as db:
+            ids = requeue_stale_jobs(db, JOB_STALE_SECONDS)
+        for id in ids:
+            self.submit(id)
+        return ids
+
+    def _poll(self):
+        while not self._stopped.wait(JOB_POLL_SECONDS):
+            try:
+                self.requeue_stale()
+            except Exception as error:
+                print("Requeueing stale jobs failed:", error)
+
+    def _heartbeat(self, id: int, finished: threading.Event):
+        # Handlers report progress per step, a long step would look stale
+        while not finished.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with SessionLocal() as db:
+                    touch_job(db, id)
+            except Exception as error:
+                print("Job", id, "heartbeat failed:", error)
+
+    def enqueue(self, db, kind: str, payload: dict, user_id: int = None):
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind {kind}")
+        db_job = create_job(db, kind=kind, payload=payload, user_id=user_id)
+        self.submit(db_job.id)
+        return db_job
+
+    def submit(self, id: int, delay: float = 0):
+        # Without a running pool (scripts, tests) the job stays queued
+        # until a process with a started runner picks it up.
+        if self._executor is None:
+            return
+        if delay:
+            timer = threading.Timer(delay, self.submit, args=(id,))
+            timer.daemon = True
+            timer.start()
+            return
+        self._executor.submit(self._run, id)
+
+    def _run(self, id: int):
+        with SessionLocal() as db:
+            db_job = get_job_by_id(db, id)
+            if db_job is None or db_job.status != "queued":
+                return
+            kind = db_job.kind
+        limit = self._limits[kind]
+        # Kind is at its concurrency limit, try again a bit later without
+        # holding a pool thread.
+        if not limit.acquire(blocking=False):
+            self.submit(id, delay=0.5)
+            return
+        try:
+            with SessionLocal() as db:
+                if not claim_job(db, id):
+                    return
+                db_job = get_job_by_id(db, id)
+                # Detach so no connection is held while the handler runs
+                db.expunge(db_job)
+            self._execute(db_job)
+        finally:
+            limit.release()
+
+    def _execute(self, db_job):
+        def report_progress(progress: float):
+            with SessionLocal() as db:
+                update_job(db, db_job.id, progress=min(max(progress, 0), 1))
+
+        handler = self._handlers[db_job.kind]
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(db_job.id, finished),
+            name=f"bbr-job-{db_job.id}-heartbeat",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            with SessionLocal() as db:
+                result = handler(db, db_job.payload, report_progress)
+        except Exception:
+            error = traceback.format_exc(limit=5)
+            print("Job", db_job.id, "failed:", error)
+            with SessionLocal() as db:
+                if db_job.attempts < db_job.max_attempts:
+                    update_job(db, db_job.id, status="queued", error=error)
+                    self.submit(
+                        db_job.id,
+                        delay=JOB_RETRY_DELAY_SECONDS * db_job.attempts,
+                    )
+                else:
+                    update_job(db, db_job.id, status="failed", error=error)
+            return
+        finally:
+            finished.set()
+            heartbeat.join()
+        with SessionLocal() as db:
+            update_job(
+                db,
+                db_job.id,
+                status="succeeded",
+                progress=1.0,
+                result=result,
+                error=None,
+            )
+
+
+job_runner = JobRunner()
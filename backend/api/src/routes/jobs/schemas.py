@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class JobProgress(BaseModel):
+    id: int
+    status: str
+    progress: float
+
+    class Config:
+        from_attributes = True
+
+
+class Job(JobProgress):
+    kind: str
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,313 @@
+from typing import Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.api.src.routes.descriptionlists.controller import (
+    get_user_description_lists_by_ids,
+)
+from backend.api.src.routes.descriptions.controller import (
+    get_user_list_descriptions_by_ids,
+)
+from backend.api.src.routes.taskcategories.registry import (
+    task_category_registry,
+)
+from backend.api.src.routes.tasks.templates import (
+    get_description_copy,
+    get_list_copy,
+    release_template_list,
+)
+from backend.api.src.routes.users.schemas import User
+
+from .schemas import (
+    DescriptionData,
+    DescriptionListData,
+    Mutation,
+    TaskData,
+)
+
+_MODELS = {
+    "task": models.BBR_Task,
+    "description_list": models.BBR_TaskDescriptionList,
+    "description": models.BBR_TaskDescription,
+}
+_DATA = {
+    "task": TaskData,
+    "description_list": DescriptionListData,
+    "description": DescriptionData,
+}
+_REQUIRED = {
+    "task": ("title", "task_category_id"),
+    "description_list": ("title", "task_id"),
+    "description": ("description", "description_list_id"),
+}
+# Field holding the parent reference, and the parent's type
+_PARENT = {
+    "description_list": ("task_id", "task"),
+    "description": ("description_list_id", "description_list"),
+}
+
+
+class MutationError(ValueError):
+    # index is None when the batch as a whole failed
+    def __init__(self, index: Optional[int], detail: str):
+        super().__init__(
+            detail if index is None else f"Operation {index}: {detail}"
+        )
+        self.index = index
+        self.detail = detail
+
+
+class _Batch:
+    """Rows an operation batch can reference: the user's rows loaded up
+    front and the rows created by earlier operations."""
+
+    def __init__(self):
+        self.rows = {type: {} for type in _MODELS}
+        self.created = {type: {} for type in _MODELS}
+        self.list_titles = set()
+
+    def forget(self, type: str, ref):
+        if isinstance(ref, str):
+            self.created[type].pop(ref, None)
+        else:
+            self.rows[type].pop(ref, None)
+
+    def resolve(self, index: int, type: str, ref):
+        if isinstance(ref, str):
+            row = self.created[type].get(ref)
+        else:
+            row = self.rows[type].get(ref)
+        if row is None:
+            label = type.replace("_", " ").capitalize()
+            raise MutationError(index, f"{label} {ref} not found")
+        return row
+
+
+def _referenced_ids(operations: list[Mutation], data: list):
+    ids = {type: set() for type in _MODELS}
+    for operation, values in zip(operations, data):
+        if isinstance(operation.id, int):
+            ids[operation.type].add(operation.id)
+        if operation.type in _PARENT:
+            field, parent_type = _PARENT[operation.type]
+            parent = getattr(values, field)
+            if isinstance(parent, int):
+                ids[parent_type].add(parent)
+    return ids
+
+
+def _get_user_tasks_by_ids(db: Session, user: User, ids: list[int]):
+    # Bare rows, operations do not touch the task trees
+    return (
+        db.query(models.BBR_Task)
+        .filter(
+            models.BBR_Task.id.in_(ids), models.BBR_Task.user_id == user.id
+        )
+        .all()
+    )
+
+
+def _load(db: Session, user: User, batch: _Batch, ids: dict):
+    # One query per type, rows of other users are simply not found
+    if ids["task"]:
+        for db_task in _get_user_tasks_by_ids(db, user, list(ids["task"])):
+            batch.rows["task"][db_task.id] = db_task
+    if ids["description_list"]:
+        for db_list in get_user_description_lists_by_ids(
+            db, user.id, list(ids["description_list"]), options=()
+        ):
+            batch.rows["description_list"][db_list.id] = db_list
+    if ids["description"]:
+        for db_description in get_user_list_descriptions_by_ids(
+            db, user.id, list(ids["description"])
+        ):
+            batch.rows["description"][db_description.id] = db_description
+    # Template rows shown in copy-on-write tasks resolve to the user's
+    # copies, made now if needed
+    for list_id in (
+        ids["description_list"] - batch.rows["description_list"].keys()
+    ):
+        db_list = get_list_copy(db, user.id, list_id)
+        if db_list is not None:
+            batch.rows["description_list"][list_id] = db_list
+    for description_id in (
+        ids["description"] - batch.rows["description"].keys()
+    ):
+        db_description = get_description_copy(db, user.id, description_id)
+        if db_description is not None:
+            batch.rows["description"][description_id] = db_description
+    task_ids = set(batch.rows["task"])
+    task_ids.update(
+        db_list.task_id for db_list in batch.rows["description_list"].values()
+    )
+    if task_ids:
+        # Existing list titles, they are unique within a task
+        batch.list_titles.update(
+            db.execute(
+                select(
+                    models.BBR_TaskDescriptionList.task_id,
+                    models.BBR_TaskDescriptionList.title,
+                ).where(models.BBR_TaskDescriptionList.task_id.in_(task_ids))
+            ).all()
+        )
+
+
+def _task_key(db_task):
+    # Tasks created in the batch have no id yet
+    return db_task.id if db_task.id is not None else id(db_task)
+
+
+def _check_list_title(index: int, batch: _Batch, task_key, title: str):
+    if (task_key, title) in batch.list_titles:
+        raise MutationError(index, "Task description list already registered")
+    batch.list_titles.add((task_key, title))
+
+
+def _create(db: Session, user: User, batch: _Batch, index, operation, values):
+    for field in _REQUIRED[operation.type]:
+        if getattr(values, field) is None:
+            raise MutationError(index, f"{field} is required")
+    if operation.type == "task":
+        db_row = models.BBR_Task(
+            title=values.title,
+            task_category_id=values.task_category_id,
+            is_active=True if values.is_active is None else values.is_active,
+            user_id=user.id,
+            sort_order=values.sort_order,
+        )
+        db.add(db_row)
+    else:
+        field, parent_type = _PARENT[operation.type]
+        parent = batch.resolve(index, parent_type, getattr(values, field))
+        if operation.type == "description_list":
+            _check_list_title(index, batch, _task_key(parent), values.title)
+            db_row = models.BBR_TaskDescriptionList(
+                title=values.title, task_id=parent.id
+            )
+            collection = "description_lists"
+        else:
+            db_row = models.BBR_TaskDescription(
+                description=values.description,
+                description_list_id=parent.id,
+            )
+            collection = "descriptions"
+        if parent.id is None:
+            # Parent created in this batch, the flush fills in the key
+            getattr(parent, collection).append(db_row)
+        else:
+            db.add(db_row)
+    if operation.temp_id is not None:
+        if operation.temp_id in batch.created[operation.type]:
+            raise MutationError(
+                index, f"Duplicate temp_id {operation.temp_id}"
+            )
+        batch.created[operation.type][operation.temp_id] = db_row
+    return db_row
+
+
+def _update(batch: _Batch, index, operation, values):
+    db_row = batch.resolve(index, operation.type, operation.id)
+    changes = values.model_dump(exclude_unset=True)
+    if operation.type in _PARENT and _PARENT[operation.type][0] in changes:
+        raise MutationError(
+            index, "Moving rows to another parent is not supported"
+        )
+    if (
+        operation.type == "description_list"
+        and changes.get("title", db_row.title) != db_row.title
+    ):
+        task_key = db_row.task_id
+        if task_key is None:
+            task_key = _task_key(
+                next(
+                    db_task
+                    for db_task in batch.created["task"].values()
+                    if db_row in db_task.description_lists
+                )
+            )
+        _check_list_title(index, batch, task_key, changes["title"])
+        batch.list_titles.discard((task_key, db_row.title))
+    columns = _MODELS[operation.type].__table__.c
+    for field, value in changes.items():
+        if value is None and not columns[field].nullable:
+            raise MutationError(index, f"{field} cannot be null")
+    for field, value in changes.items():
+        setattr(db_row, field, value)
+    return db_row
+
+
+def apply_mutations(db: Session, user: User, operations: list[Mutation]):
+    """Apply create, update and delete operations in order and in one
+    transaction. Nothing is written until every operation validated, and
+    the single flush groups the statements of each table. Raises
+    MutationError naming the first failing operation."""
+    data = []
+    for index, operation in enumerate(operations):
+        if operation.op != "create" and operation.id is None:
+            raise MutationError(index, "id is required")
+        try:
+            data.append(_DATA[operation.type].model_validate(operation.data))
+        except ValidationError as error:
+            detail = error.errors()[0]
+            field = ".".join(map(str, detail["loc"]))
+            raise MutationError(index, f"{field}: {detail['msg']}")
+        category_id = getattr(data[-1], "task_category_id", None)
+        if category_id is not None and not task_category_registry.exists(
+            id=category_id
+        ):
+            raise MutationError(index, "Task category not found")
+    try:
+        return _apply(db, user, operations, data)
+    except IntegrityError as error:
+        # Constraints the checks above do not cover, such as a row deleted
+        # by another request in the meantime
+        detail = str(error.orig).splitlines()[0]
+        raise MutationError(None, f"Database constraint failed: {detail}")
+
+
+def _apply(db: Session, user: User, operations: list[Mutation], data: list):
+    batch = _Batch()
+    _load(db, user, batch, _referenced_ids(operations, data))
+
+    rows = []
+    new_tasks = []
+    for index, (operation, values) in enumerate(zip(operations, data)):
+        if operation.op == "create":
+            db_row = _create(db, user, batch, index, operation, values)
+            if operation.type == "task" and db_row.sort_order is None:
+                new_tasks.append(db_row)
+        elif operation.op == "update":
+            db_row = _update(batch, index, operation, values)
+        else:
+            db_row = batch.resolve(index, operation.type, operation.id)
+            batch.forget(operation.type, operation.id)
+            if operation.type == "description_list":
+                release_template_list(db, db_row)
+            if db_row in db.new:
+                db.expunge(db_row)
+            else:
+                db.delete(db_row)
+        rows.append(db_row)
+
+    db.flush()
+    # Same default order as create_user_task, known once ids are
+    for db_task in new_tasks:
+        db_task.sort_order = db_task.id * 100
+    db.flush()
+    # Read ids before commit expires the rows, some may be gone by then
+    results = [
+        {
+            "index": index,
+            "op": operation.op,
+            "type": operation.type,
+            "id": db_row.id,
+            "temp_id": operation.temp_id,
+        }
+        for index, (operation, db_row) in enumerate(zip(operations, rows))
+    ]
+    db.commit()
+    return results
@@ -0,0 +1,39 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.api.src.routes.auth.controller import get_current_active_user
+from backend.api.src.routes.mutations.controller import (
+    MutationError,
+    apply_mutations,
+)
+from backend.api.src.routes.mutations.schemas import (
+    MutationBatch,
+    MutationBatchResult,
+)
+from backend.api.src.routes.users.schemas import User
+from backend.api.src.routes.utils.db_dependency import get_db
+
+router_mutations = APIRouter(
+    prefix="/api/mutations",
+    tags=["Mutations"],
+)
+
+
+@router_mutations.post("", response_model=MutationBatchResult)
+def apply_mutations_ep(
+    batch: MutationBatch,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    """Apply an ordered list of task, description list and description
+    creates, updates and deletes in one transaction. Creates can set a
+    temp_id that later operations use in place of an id. Either every
+    operation is applied or none is."""
+    try:
+        results = apply_mutations(db, current_user, batch.operations)
+    except MutationError as error:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"results": results}
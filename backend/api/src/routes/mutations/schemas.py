@@ -0,0 +1,50 @@
+from typing import List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field
+
+# A real id, or the temp_id of a create earlier in the same batch
+Ref = Union[int, str]
+
+
+class TaskData(BaseModel):
+    title: Optional[str] = None
+    task_category_id: Optional[int] = None
+    is_active: Optional[bool] = None
+    sort_order: Optional[int] = None
+
+
+class DescriptionListData(BaseModel):
+    title: Optional[str] = None
+    task_id: Optional[Ref] = None
+
+
+class DescriptionData(BaseModel):
+    description: Optional[str] = None
+    description_list_id: Optional[Ref] = None
+
+
+class Mutation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    type: Literal["task", "description_list", "description"]
+    # Target of update and delete
+    id: Optional[Ref] = None
+    # Name for a created row that later operations can reference
+    temp_id: Optional[str] = None
+    data: dict = {}
+
+
+class MutationBatch(BaseModel):
+    operations: List[Mutation] = Field(max_length=500)
+
+
+class MutationResult(BaseModel):
+    index: int
+    op: str
+    type: str
+    # None for rows created and deleted in the same batch
+    id: Optional[int] = None
+    temp_id: Optional[str] = None
+
+
+class MutationBatchResult(BaseModel):
+    results: List[MutationResult]
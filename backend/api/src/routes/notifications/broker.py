@@ -0,0 +1,185 @@
+import asyncio
+import json
+import select
+import threading
+
+from sqlalchemy import func
+from sqlalchemy import select as sql_select
+
+from backend.api.src.config.database import engine
+from backend.env_variables import NOTIFY_CHANNEL, NOTIFY_QUEUE_SIZE
+
+# Postgres drops NOTIFY payloads over 8000 bytes
+_MAX_PAYLOAD = 7500
+
+
+class Subscription:
+    """One connection's queue of event batches.
+
+    The queue is bounded. When a slow client lets it fill up, the queued
+    events are dropped and replaced with a single resync event, so one
+    slow client never holds memory or blocks the publishers.
+    """
+
+    def __init__(self, user_id: int, loop, size: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+    def put(self, events: list):
+        # Runs on the subscription's event loop
+        try:
+            self.queue.put_nowait(events)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait([{"type": "resync"}])
+
+    async def get(self):
+        # Everything queued so far goes out as one message
+        events = list(await self.queue.get())
+        while not self.queue.empty():
+            events.extend(self.queue.get_nowait())
+        return events
+
+
+class ChangeBroker:
+    """Fans change events out to the owning user's open connections.
+
+    On Postgres, events are sent with pg_notify inside the writing
+    transaction, and every worker process LISTENs on NOTIFY_CHANNEL. So a
+    write in one worker reaches connections held by all of them, and only
+    after commit. Other databases deliver in process after commit, which
+    covers a single worker.
+    """
+
+    def __init__(self, queue_size: int = NOTIFY_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.use_listen = engine.dialect.name == "postgresql"
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._stopped = threading.Event()
+        self.metrics = {"published": 0, "delivered": 0, "connections": 0}
+
+    def subscribe(self, user_id: int):
+        subscription = Subscription(
+            user_id, asyncio.get_running_loop(), self.queue_size
+        )
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self.metrics["connections"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+            self.metrics["connections"] -= 1
+
+    def send_in_transaction(self, connection, changes: dict[int, list]):
+        # Queued by Postgres with the transaction, delivered on commit
+        for payload in self._payloads(changes):
+            connection.execute(
+                sql_select(func.pg_notify(NOTIFY_CHANNEL, payload))
+            )
+
+    def notify(self, changes: dict[int, list]):
+        # For writes the session events do not see, such as bulk updates
+        if self.use_listen:
+            with engine.begin() as connection:
+                self.send_in_transaction(connection, changes)
+        else:
+            self.publish(changes)
+
+    def publish(self, changes: dict[int, list]):
+        with self._lock:
+            self.metrics["published"] += sum(map(len, changes.values()))
+        for user_id, events in changes.items():
+            self.deliver(user_id, events)
+
+    def deliver(self, user_id: int, events: list):
+        # Safe to call from any thread
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+            self.metrics["delivered"] += len(subscriptions) * len(events)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, events
+                )
+            except RuntimeError:
+                # Event loop already closed, the connection is gone
+                pass
+
+    def _payloads(self, changes: dict[int, list]):
+        for user_id, events in changes.items():
+            payload = json.dumps({"user_id": user_id, "events": events})
+            if len(payload) <= _MAX_PAYLOAD:
+                yield payload
+            else:
+                # A change too large to send is still worth a refetch
+                yield json.dumps(
+                    {"user_id": user_id, "events": [{"type": "resync"}]}
+                )
+
+    def start(self):
+        if not self.use_listen or self._listener is not None:
+            return
+        self._stopped.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="bbr-notify", daemon=True
+        )
+        self._listener.start()
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen_once()
+            except Exception as error:
+                print("Change listener failed, reconnecting:", error)
+                self._stopped.wait(1)
+
+    def _listen_once(self):
+        raw_connection = engine.raw_connection()
+        try:
+            dbapi_connection = raw_connection.driver_connection
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            while not self._stopped.is_set():
+                for notify in _received(dbapi_connection):
+                    message = json.loads(notify.payload)
+                    self.deliver(message["user_id"], message["events"])
+        finally:
+            raw_connection.invalidate()
+            raw_connection.close()
+
+
+def _received(dbapi_connection):
+    # Notifications that arrive within a second
+    if hasattr(dbapi_connection, "poll"):
+        # psycopg2
+        ready, _, _ = select.select([dbapi_connection], [], [], 1)
+        if not ready:
+            return
+        dbapi_connection.poll()
+        while dbapi_connection.notifies:
+            yield dbapi_connection.notifies.pop(0)
+    else:
+        # psycopg 3.2+
+        yield from dbapi_connection.notifies(timeout=1)
+
+
+change_broker = ChangeBroker()
@@ -0,0 +1,88 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.utils.cache import (
+    routine_summary_key,
+    shared_cache,
+)
+
+from .broker import change_broker
+
+# Tracked models, the event type sent to clients and the parent column
+# included in the event
+TRACKED = {
+    models.BBR_Task: ("task", None),
+    models.BBR_Tag: ("tag", "task_id"),
+    models.BBR_TaskDescriptionList: ("description_list", "task_id"),
+    models.BBR_TaskDescription: ("description", "description_list_id"),
+}
+
+
+def _value(obj, name: str):
+    # Read without triggering a load, deleted rows cannot be refreshed
+    return inspect(obj).dict.get(name)
+
+
+def owner_of(obj):
+    # Every tracked row carries its task's user, templates have none.
+    # Expired rows still in the database load it, deleted ones cannot
+    state = inspect(obj)
+    if "user_id" in state.dict or state.deleted:
+        return state.dict.get("user_id")
+    return obj.user_id
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    changed = [
+        *((obj, "create") for obj in session.new),
+        *(
+            (obj, "update")
+            for obj in session.dirty
+            if session.is_modified(obj, include_collections=False)
+        ),
+        *((obj, "delete") for obj in session.deleted),
+    ]
+    changed = [(obj, op) for obj, op in changed if type(obj) in TRACKED]
+    if not changed:
+        return
+
+    changes: dict[int, list] = {}
+    for obj, op in changed:
+        user_id = owner_of(obj)
+        # Templates have no owner to notify
+        if user_id is None:
+            continue
+        change_type, parent = TRACKED[type(obj)]
+        change = {"type": change_type, "op": op, "id": _value(obj, "id")}
+        if parent:
+            change[parent] = _value(obj, parent)
+        changes.setdefault(user_id, []).append(change)
+    if not changes:
+        return
+
+    session.info.setdefault("changed_users", set()).update(changes)
+    if change_broker.use_listen:
+        change_broker.send_in_transaction(session.connection(), changes)
+        return
+    pending = session.info.setdefault("pending_changes", {})
+    for user_id, events in changes.items():
+        pending.setdefault(user_id, []).extend(events)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_changes(session: Session):
+    changed_users = session.info.pop("changed_users", None)
+    if changed_users:
+        shared_cache.invalidate(*map(routine_summary_key, changed_users))
+    pending = session.info.pop("pending_changes", None)
+    if pending:
+        change_broker.publish(pending)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_changes(session: Session, previous_transaction):
+    session.info.pop("changed_users", None)
+    session.info.pop("pending_changes", None)
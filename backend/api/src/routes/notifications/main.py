@@ -0,0 +1,77 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.auth.controller import get_user_by_token
+from backend.env_variables import NOTIFY_HEARTBEAT_SECONDS
+
+from . import changes  # noqa: registers the session listeners
+from .broker import change_broker
+
+router_notifications = APIRouter(
+    prefix="/api/notifications",
+    tags=["Notifications"],
+)
+
+
+def get_active_user_id(token: Optional[str]):
+    if not token:
+        return None
+    with SessionLocal() as db:
+        user = get_user_by_token(db, token)
+        if user is None or user.disabled:
+            return None
+        return user.id
+
+
+async def _receive_until_closed(websocket: WebSocket):
+    # Clients only listen, reading is how a close gets noticed
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router_notifications.websocket("/ws")
+async def notifications_ws(websocket: WebSocket, token: Optional[str] = None):
+    """Pushes a JSON list of change events whenever the user's tasks, tags,
+    description lists or descriptions change. Browsers cannot set headers
+    on WebSockets, so the access token comes as ?token=.
+
+    Events look like {"type": "description", "op": "update", "id": 3,
+    "description_list_id": 1}. {"type": "resync"} means events were dropped
+    and the client should refetch, {"type": "ping"} is the heartbeat.
+    """
+    user_id = await run_in_threadpool(get_active_user_id, token)
+    if user_id is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = change_broker.subscribe(user_id)
+    closed = asyncio.create_task(_receive_until_closed(websocket))
+    try:
+        while True:
+            next_events = asyncio.create_task(subscription.get())
+            done, _ = await asyncio.wait(
+                {next_events, closed},
+                timeout=NOTIFY_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if closed in done:
+                next_events.cancel()
+                break
+            if next_events in done:
+                events = next_events.result()
+            else:
+                next_events.cancel()
+                events = [{"type": "ping"}]
+            await websocket.send_json(events)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        change_broker.unsubscribe(subscription)
+        closed.cancel()
@@ -0,0 +1,206 @@
+from sqlalchemy import BigInteger, Text, and_, cast, func, insert, or_
+from sqlalchemy import select, true, update
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.api.src.routes.tasks.templates import TemplateList
+
+
+def _xid_version(xid):
+    # xid8 has no cast to bigint, text has. The sync clock row holds the
+    # offset that keeps versions above the sequence ones of revision 0003.
+    clock = models.BBR_SyncClock
+    offset = func.coalesce(
+        select(clock.version).where(clock.id == 1).scalar_subquery(), 0
+    )
+    return cast(cast(xid, Text), BigInteger) + offset
+
+
+def sync_version_value():
+    """The sync version of the current transaction, as a Postgres
+    expression: its transaction id. A client that synced up to N must not
+    miss an N - 1 committed later, so sync_watermark only serves versions
+    below the oldest transaction still running. Writers take no lock."""
+    return _xid_version(func.pg_current_xact_id())
+
+
+def next_sync_version(db: Session):
+    # Core statements on the session connection, no autoflush
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        return connection.execute(select(sync_version_value())).scalar_one()
+    # Elsewhere a counter row, its lock makes writers commit in order
+    clock = models.BBR_SyncClock.__table__
+    version = connection.execute(
+        update(clock)
+        .where(clock.c.id == 1)
+        .values(version=clock.c.version + 1)
+        .returning(clock.c.version)
+    ).scalar()
+    if version is None:
+        version = 1
+        connection.execute(insert(clock).values(id=1, version=version))
+    return version
+
+
+def sync_watermark(db: Session):
+    """The highest version every writer of which has committed or rolled
+    back, None where versions already commit in order. Rows up to it are
+    all visible to statements that start afterwards."""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    xmin = func.pg_snapshot_xmin(func.pg_current_snapshot())
+    return db.execute(select(_xid_version(xmin) - 1)).scalar_one()
+
+
+def _changed_between(model, since: int, until):
+    conditions = [model.version > since] if since else []
+    if until is not None:
+        conditions.append(model.version <= until)
+    return conditions
+
+
+def _get_user_changed(db: Session, model, user_id: int, since: int, until):
+    # Every synced table carries the user_id, no joins up to the task
+    return (
+        db.query(model)
+        .filter(
+            model.user_id == user_id, *_changed_between(model, since, until)
+        )
+        .order_by(model.version, model.id)
+        .all()
+    )
+
+
+def get_user_changed_tasks(db: Session, user_id: int, since: int, until):
+    return _get_user_changed(db, models.BBR_Task, user_id, since, until)
+
+
+def get_user_changed_tags(db: Session, user_id: int, since: int, until):
+    return _get_user_changed(db, models.BBR_Tag, user_id, since, until)
+
+
+def get_user_changed_description_lists(
+    db: Session, user_id: int, since: int, until
+):
+    return _get_user_changed(
+        db, models.BBR_TaskDescriptionList, user_id, since, until
+    )
+
+
+def get_user_changed_descriptions(
+    db: Session, user_id: int, since: int, until
+):
+    return _get_user_changed(
+        db, models.BBR_TaskDescription, user_id, since, until
+    )
+
+
+def get_user_template_changes(db: Session, user_id: int, since: int, until):
+    """Template lists and descriptions shown in the user's copy-on-write
+    tasks. All of them for tasks changed between since and until, which
+    includes new ones, and the template rows changed between them for the
+    rest."""
+    task = models.BBR_Task
+    description_list = models.BBR_TaskDescriptionList
+    description = models.BBR_TaskDescription
+    referencing = db.execute(
+        select(task.id, task.template_id, task.version).where(
+            task.user_id == user_id, task.template_id.is_not(None)
+        )
+    ).all()
+    if not referencing:
+        return [], []
+    task_ids = {template_id: id for id, template_id, _ in referencing}
+    fresh = [
+        template_id
+        for _, template_id, version in referencing
+        if version > since and (until is None or version <= until)
+    ]
+    copied = select(description_list.template_list_id).where(
+        description_list.user_id == user_id,
+        description_list.template_list_id.is_not(None),
+    )
+    shown = (
+        description_list.task_id.in_(task_ids),
+        description_list.user_id.is_(None),
+        description_list.id.not_in(copied),
+    )
+
+    def changed(model):
+        between = and_(true(), *_changed_between(model, since, until))
+        if not since:
+            return between
+        return or_(description_list.task_id.in_(fresh), between)
+
+    lists = (
+        db.query(description_list)
+        .filter(*shown, changed(description_list))
+        .order_by(description_list.version, description_list.id)
+        .all()
+    )
+    descriptions = (
+        db.query(description)
+        .join(
+            description_list,
+            description_list.id == description.description_list_id,
+        )
+        .filter(*shown, changed(description))
+        .order_by(description.version, description.id)
+        .all()
+    )
+    return [
+        TemplateList(db_list, task_ids[db_list.task_id]) for db_list in lists
+    ], descriptions
+
+
+def get_user_tombstones(db: Session, user_id: int, since: int, until):
+    tombstone = models.BBR_Tombstone
+    return (
+        db.query(tombstone)
+        .filter(
+            tombstone.user_id == user_id,
+            *_changed_between(tombstone, since, until),
+        )
+        .order_by(tombstone.version, tombstone.id)
+        .all()
+    )
+
+
+def get_user_changes(db: Session, user_id: int, since: int = 0):
+    """Rows of the user's routine changed after version since, and the
+    tombstones of rows deleted after it. since=0 returns the whole
+    routine and no tombstones.
+
+    On Postgres only versions up to the sync watermark are served, and
+    the watermark is returned as the next since: a transaction still
+    running may commit a lower version than the ones already visible."""
+    until = sync_watermark(db)
+    template_lists, template_descriptions = get_user_template_changes(
+        db, user_id, since, until
+    )
+    changes = {
+        "tasks": get_user_changed_tasks(db, user_id, since, until),
+        "tags": get_user_changed_tags(db, user_id, since, until),
+        "description_lists": [
+            *get_user_changed_description_lists(db, user_id, since, until),
+            *template_lists,
+        ],
+        "descriptions": [
+            *get_user_changed_descriptions(db, user_id, since, until),
+            *template_descriptions,
+        ],
+        "deleted": (
+            get_user_tombstones(db, user_id, since, until) if since else []
+        ),
+    }
+    if until is not None:
+        changes["version"] = max(since, until)
+    else:
+        changes["version"] = max(
+            [
+                since,
+                *(row.version for rows in changes.values() for row in rows),
+            ]
+        )
+    return changes
@@ -0,0 +1,30 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from backend.api.src.routes.auth.controller import get_current_active_user
+from backend.api.src.routes.sync.controller import get_user_changes
+from backend.api.src.routes.sync.schemas import SyncChanges
+from backend.api.src.routes.users.schemas import User
+from backend.api.src.routes.utils.db_dependency import get_read_db
+from backend.api.src.routes.utils.encoding import NegotiatedRoute
+
+from . import versions  # noqa: registers the version listener
+
+router_sync = APIRouter(
+    prefix="/api/sync",
+    tags=["Sync"],
+    route_class=NegotiatedRoute,
+)
+
+
+@router_sync.get("", response_model=SyncChanges)
+def get_sync_ep(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    since: int = 0,
+    db: Session = Depends(get_read_db),
+):
+    """Changes to the user's routine after version since. Pass the
+    returned version as since next time, start with 0 for everything."""
+    return get_user_changes(db, current_user.id, since)
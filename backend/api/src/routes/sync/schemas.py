@@ -0,0 +1,65 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class SyncTask(BaseModel):
+    id: int
+    title: str
+    task_category_id: int
+    is_active: bool
+    user_id: Optional[int] = None
+    sort_order: Optional[int] = None
+    template_id: Optional[int] = None
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncTag(BaseModel):
+    id: int
+    title: str
+    task_id: int
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncDescriptionList(BaseModel):
+    id: int
+    title: str
+    task_id: int
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncDescription(BaseModel):
+    id: int
+    description: str
+    description_list_id: int
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class Tombstone(BaseModel):
+    entity: str
+    entity_id: int
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncChanges(BaseModel):
+    version: int
+    tasks: List[SyncTask]
+    tags: List[SyncTag]
+    description_lists: List[SyncDescriptionList]
+    descriptions: List[SyncDescription]
+    deleted: List[Tombstone]
@@ -0,0 +1,97 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.notifications.changes import TRACKED
+
+from .controller import next_sync_version
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _assign_sync_versions(session: Session, flush_context, instances):
+    # Every routine row written by a flush gets the flush's version, every
+    # deleted one a tombstone with it
+    changed = [
+        obj
+        for obj in [*session.new, *session.dirty]
+        if type(obj) in TRACKED
+        and (obj in session.new or session.is_modified(obj, False))
+    ]
+    deleted = [obj for obj in session.deleted if type(obj) in TRACKED]
+    if not changed and not deleted:
+        return
+
+    version = next_sync_version(session)
+    for obj in changed:
+        obj.version = version
+    # Tombstones added without a version, see routes/tasks/templates.py
+    for obj in session.new:
+        if isinstance(obj, models.BBR_Tombstone) and obj.version is None:
+            obj.version = version
+    if not deleted:
+        return
+    adopters = _template_adopters(
+        session, [obj for obj in deleted if obj.user_id is None]
+    )
+    for obj in deleted:
+        # Template rows are shown to every user with a copy-on-write task
+        user_ids = (
+            [obj.user_id]
+            if obj.user_id is not None
+            else adopters.get((type(obj), obj.id), [])
+        )
+        session.add_all(
+            models.BBR_Tombstone(
+                entity=TRACKED[type(obj)][0],
+                entity_id=obj.id,
+                user_id=user_id,
+                version=version,
+            )
+            for user_id in user_ids
+        )
+
+
+def _template_adopters(session: Session, rows: list):
+    """(model, id) of the template lists and descriptions in rows to the
+    users whose tasks reference their template, see
+    routes/tasks/templates.py."""
+    task = models.BBR_Task
+    description_list = models.BBR_TaskDescriptionList
+    template_ids = {}
+    for obj in rows:
+        if type(obj) is description_list:
+            template_ids[(description_list, obj.id)] = obj.task_id
+    list_ids = {
+        obj.description_list_id
+        for obj in rows
+        if type(obj) is models.BBR_TaskDescription
+    }
+    connection = session.connection()
+    if list_ids:
+        # The lists are still there, the flush has not run yet
+        list_tasks = dict(
+            connection.execute(
+                select(description_list.id, description_list.task_id).where(
+                    description_list.id.in_(list_ids)
+                )
+            ).all()
+        )
+        for obj in rows:
+            if type(obj) is models.BBR_TaskDescription:
+                template_ids[(type(obj), obj.id)] = list_tasks.get(
+                    obj.description_list_id
+                )
+    if not template_ids:
+        return {}
+    users = {}
+    for user_id, template_id in connection.execute(
+        select(task.user_id, task.template_id)
+        .where(task.template_id.in_(set(template_ids.values())))
+        .distinct()
+    ):
+        users.setdefault(template_id, []).append(user_id)
+    return {
+        key: users.get(template_id, [])
+        for key, template_id in template_ids.items()
+    }
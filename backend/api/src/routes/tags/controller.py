@@ -0,0 +1,68 @@
+from sqlalchemy import distinct, func, select
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.api.src.routes.descriptionlists.schemas import TagCreate
+
+
+def get_tag_by_id(db: Session, id: int):
+    return db.query(models.BBR_Tag).filter(models.BBR_Tag.id == id).first()
+
+
+def get_task_tag_by_title(db: Session, task_id: int, title: str):
+    return (
+        db.query(models.BBR_Tag)
+        .filter(
+            models.BBR_Tag.task_id == task_id, models.BBR_Tag.title == title
+        )
+        .first()
+    )
+
+
+def get_user_tags(db: Session, user_id: int):
+    return (
+        db.query(models.BBR_Tag)
+        .filter(models.BBR_Tag.user_id == user_id)
+        .order_by(models.BBR_Tag.title, models.BBR_Tag.task_id)
+        .all()
+    )
+
+
+def get_user_tag_facets(db: Session, user_id: int):
+    # One grouped query, read from the (user_id, title, task_id) index
+    tasks = func.count(distinct(models.BBR_Tag.task_id))
+    return db.execute(
+        select(models.BBR_Tag.title, tasks.label("tasks"))
+        .where(models.BBR_Tag.user_id == user_id)
+        .group_by(models.BBR_Tag.title)
+        .order_by(tasks.desc(), models.BBR_Tag.title)
+    ).all()
+
+
+def user_tag_task_ids(user_id: int, title: str):
+    """Ids of the user's tasks tagged title, to filter task queries."""
+    return select(models.BBR_Tag.task_id).where(
+        models.BBR_Tag.user_id == user_id, models.BBR_Tag.title == title
+    )
+
+
+def create_tag(db: Session, tag: TagCreate):
+    db_tag = models.BBR_Tag(**tag.model_dump())
+    db.add(db_tag)
+    db.commit()
+    db.refresh(db_tag)
+    return db_tag
+
+
+def update_tag(db: Session, db_tag: models.BBR_Tag, tag: TagCreate):
+    db_tag.title = tag.title
+    db_tag.task_id = tag.task_id
+    db.commit()
+    db.refresh(db_tag)
+    return db_tag
+
+
+def delete_tag(db: Session, db_tag: models.BBR_Tag):
+    db.delete(db_tag)
+    db.commit()
+    return True
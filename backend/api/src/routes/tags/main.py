@@ -0,0 +1,95 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.api.src.routes.auth.controller import get_current_active_user
+from backend.api.src.routes.descriptionlists.schemas import Tag, TagCreate
+from backend.api.src.routes.tags.controller import (
+    create_tag,
+    delete_tag,
+    get_tag_by_id,
+    get_task_tag_by_title,
+    get_user_tag_facets,
+    get_user_tags,
+    update_tag,
+)
+from backend.api.src.routes.tags.schemas import TagFacet
+from backend.api.src.routes.tasks.controller import get_task_by_id
+from backend.api.src.routes.users.schemas import User
+from backend.api.src.routes.utils.db_dependency import get_db, get_read_db
+
+router_tags = APIRouter(
+    prefix="/api/tags",
+    tags=["Tags"],
+)
+
+
+def validate_user_task(db: Session, task_id: int, user_id: int):
+    db_task = get_task_by_id(db, task_id)
+    if not db_task or db_task.user_id != user_id:
+        raise HTTPException(status_code=400, detail="Task not exist for user")
+
+
+def get_user_tag(db: Session, id: int, user_id: int):
+    db_tag = get_tag_by_id(db, id)
+    if not db_tag or db_tag.user_id != user_id:
+        raise HTTPException(status_code=400, detail=f"Tag {id} not found")
+    return db_tag
+
+
+def validate_unique_title(db: Session, tag: TagCreate):
+    if get_task_tag_by_title(db, tag.task_id, tag.title) is not None:
+        raise HTTPException(status_code=400, detail="Tag already registered")
+
+
+@router_tags.get("/user", response_model=list[Tag])
+def get_user_tags_ep(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_read_db),
+):
+    return get_user_tags(db, current_user.id)
+
+
+@router_tags.get("/user/facets", response_model=list[TagFacet])
+def get_user_tag_facets_ep(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_read_db),
+):
+    """Tag titles with the number of the user's tasks tagged with each,
+    most used first. Filter tasks with GET /api/tasks/user-tasks?tag=."""
+    return get_user_tag_facets(db, current_user.id)
+
+
+@router_tags.post("", response_model=Tag)
+def create_tag_ep(
+    tag: TagCreate,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    validate_user_task(db, tag.task_id, current_user.id)
+    validate_unique_title(db, tag)
+    return create_tag(db, tag)
+
+
+@router_tags.post("/{id}/update", response_model=Tag)
+def update_tag_ep(
+    id: int,
+    tag: TagCreate,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    db_tag = get_user_tag(db, id, current_user.id)
+    if (tag.title, tag.task_id) != (db_tag.title, db_tag.task_id):
+        validate_user_task(db, tag.task_id, current_user.id)
+        validate_unique_title(db, tag)
+    return update_tag(db, db_tag, tag)
+
+
+@router_tags.post("/{id}/delete")
+def delete_tag_ep(
+    id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    return delete_tag(db, get_user_tag(db, id, current_user.id))
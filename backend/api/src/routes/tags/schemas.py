@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class TagFacet(BaseModel):
+    title: str
+    tasks: int
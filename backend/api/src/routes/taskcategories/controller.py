@@ -2,6 +2,7 @@ from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from . import schemas
+from .registry import task_category_registry
 
 from backend.api import models
 
@@ -35,6 +36,7 @@ def create_task_category(
     db.add(db_task_category)
     db.commit()
     db.refresh(db_task_category)
+    task_category_registry.invalidate()
     return db_task_category
 
 
@@ -46,10 +48,12 @@ def update_task_category(
     db_task_category.title = task_category.title
     db_task_category.description = task_category.description
     db.commit()
+    task_category_registry.invalidate()
     return db_task_category
 
 
 def delete_task_category(db: Session, task_category: schemas.TaskCategory):
     db.delete(task_category)
     db.commit()
+    task_category_registry.invalidate()
     return True
@@ -0,0 +1,76 @@
+import threading
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.utils.cache import (
+    TASK_CATEGORIES_KEY,
+    shared_cache,
+)
+
+from .schemas import TaskCategory
+
+
+class TaskCategoryRegistry:
+    """Process wide in-memory copy of BBR_taskcategories.
+
+    The table is tiny and almost static, so it is loaded once and reloaded
+    lazily after a version bump. The mutating controllers call invalidate(),
+    which bumps the version in every worker through the shared cache.
+    Loads read the primary, a lagging replica would cache the old rows
+    under the new version.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories: dict[int, TaskCategory] = {}
+        self._ordered: list[TaskCategory] = []
+        self._loaded_version = -1
+        self.version = 0
+
+    def bump_version(self):
+        with self._lock:
+            self.version += 1
+
+    def invalidate(self):
+        shared_cache.invalidate(TASK_CATEGORIES_KEY)
+
+    def is_stale(self):
+        return self._loaded_version != self.version
+
+    def load(self):
+        version = self.version
+        with SessionLocal() as db:
+            db_categories = (
+                db.query(models.BBR_TaskCategory)
+                .order_by(models.BBR_TaskCategory.id)
+                .all()
+            )
+            ordered = [
+                TaskCategory.model_validate(db_category)
+                for db_category in db_categories
+            ]
+        with self._lock:
+            self._ordered = ordered
+            self._categories = {category.id: category for category in ordered}
+            self._loaded_version = version
+
+    def ensure_loaded(self):
+        if self.is_stale():
+            self.load()
+
+    def get_all(self, skip: int = 0, limit: int = 100):
+        self.ensure_loaded()
+        return self._ordered[skip : skip + limit]
+
+    def get(self, id: int):
+        self.ensure_loaded()
+        return self._categories.get(id)
+
+    def exists(self, id: int):
+        return self.get(id) is not None
+
+
+task_category_registry = TaskCategoryRegistry()
+shared_cache.on_invalidate(
+    TASK_CATEGORIES_KEY, task_category_registry.bump_version
+)
@@ -1,44 +1,79 @@
+from typing import Optional
+
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Sequence,
+    distinct,
+    func,
+    insert,
+    literal,
+    not_,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session, selectinload
 
 from backend.api.src.routes.descriptionlists.controller import (
-    create_description_list,
-)
-from backend.api.src.routes.descriptionlists.schemas import (
-    TaskDescriptionListCreate,
+    description_list_sparse_model,
 )
-from backend.api.src.routes.descriptions.controller import (
-    create_list_description,
+from backend.api.src.routes.descriptionlists.schemas import Tag
+from backend.api.src.routes.sync.controller import (
+    next_sync_version,
+    sync_version_value,
 )
-from backend.api.src.routes.descriptions.schemas import TaskDescriptionCreate
+from backend.api.src.routes.tags.controller import user_tag_task_ids
 from backend.api.src.routes.users.schemas import User
+from backend.api.src.routes.utils.pipeline import write_returning
+from backend.api.src.routes.utils.projection import load_records
+from backend.api.src.routes.utils.sparse import SparseModel, SparseSelection
 
-from .schemas import Task, TaskBase
+from .templates import get_referencing_task, release_template
+from .schemas import (
+    RoutineSummary,
+    Task,
+    TaskBase,
+    TaskCategorySummary,
+    TaskSummary,
+)
 from backend.api import models
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Task operations
+task_sparse_model = SparseModel(
+    models.BBR_Task,
+    Task,
+    relationships={
+        "tags": SparseModel(models.BBR_Tag, Tag),
+        "description_lists": description_list_sparse_model,
+    },
+    # Needed to merge in the template's lists, see templates.py
+    keys=["template_id"],
+)
 
+# Full task trees are serialized with tags, lists and descriptions. Load
+# each level in one query instead of lazily per row.
+task_tree_options = (
+    selectinload(models.BBR_Task.tags),
+    selectinload(models.BBR_Task.description_lists).selectinload(
+        models.BBR_TaskDescriptionList.descriptions
+    ),
+)
 
-def get_task_by_id(db: Session, id: int):
-    return db.query(models.BBR_Task).filter(models.BBR_Task.id == id).first()
+# Task operations
 
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100):
+def get_task_by_id(db: Session, id: int, options=()):
     return (
         db.query(models.BBR_Task)
-        .order_by(models.BBR_Task.sort_order)
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .filter(models.BBR_Task.id == id)
+        .options(*options)
+        .first()
     )
 
 
-def get_null_user_tasks(db: Session, skip: int = 0, limit: int = 100):
+def get_tasks(db: Session, skip: int = 0, limit: int = 100):
     return (
         db.query(models.BBR_Task)
-        .filter(models.BBR_Task.user_id.is_(None))
         .order_by(models.BBR_Task.sort_order)
         .offset(skip)
         .limit(limit)
@@ -46,17 +81,201 @@ def get_null_user_tasks(db: Session, skip: int = 0, limit: int = 100):
     )
 
 
-def get_user_tasks(db: Session, user: User, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.BBR_Task)
-        .filter(models.BBR_Task.user_id == user.id)
-        .order_by(models.BBR_Task.sort_order)
-        .offset(skip)
-        .limit(limit)
-        .all()
+# List endpoints return read-only records instead of ORM instances, see
+# routes/utils/projection.py
+
+
+def task_filters(
+    is_active: Optional[bool] = None,
+    task_category_id: Optional[int] = None,
+    title_prefix: Optional[str] = None,
+):
+    # Each filter has an index led by user_id, see models.BBR_Task
+    where = []
+    if is_active is not None:
+        where.append(
+            models.BBR_Task.is_active
+            if is_active
+            else not_(models.BBR_Task.is_active)
+        )
+    if task_category_id is not None:
+        where.append(models.BBR_Task.task_category_id == task_category_id)
+    if title_prefix:
+        where.append(
+            func.lower(models.BBR_Task.title).startswith(
+                title_prefix.lower(), autoescape=True
+            )
+        )
+    return where
+
+
+def get_null_user_tasks(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    selection: Optional[SparseSelection] = None,
+    is_active: Optional[bool] = None,
+    task_category_id: Optional[int] = None,
+    title_prefix: Optional[str] = None,
+):
+    return load_records(
+        db,
+        task_sparse_model,
+        selection,
+        models.BBR_Task.user_id.is_(None),
+        *task_filters(is_active, task_category_id, title_prefix),
+        order_by=[models.BBR_Task.sort_order],
+        offset=skip,
+        limit=limit,
     )
 
 
+def get_user_tasks(
+    db: Session,
+    user: User,
+    skip: int = 0,
+    limit: int = 100,
+    selection: Optional[SparseSelection] = None,
+    tag: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    task_category_id: Optional[int] = None,
+    title_prefix: Optional[str] = None,
+):
+    where = [
+        models.BBR_Task.user_id == user.id,
+        *task_filters(is_active, task_category_id, title_prefix),
+    ]
+    if tag is not None:
+        where.append(models.BBR_Task.id.in_(user_tag_task_ids(user.id, tag)))
+    return load_records(
+        db,
+        task_sparse_model,
+        selection,
+        *where,
+        order_by=[models.BBR_Task.sort_order],
+        offset=skip,
+        limit=limit,
+    )
+
+
+def get_user_task_records_by_ids(db: Session, user: User, ids: list[int]):
+    return load_records(
+        db,
+        task_sparse_model,
+        None,
+        models.BBR_Task.id.in_(ids),
+        models.BBR_Task.user_id == user.id,
+    )
+
+
+def get_user_routine_summary(db: Session, user: User):
+    # One grouped query gives the list and description counts per task,
+    # category counts and totals are folded from those rows.
+    task = models.BBR_Task
+    description_list = models.BBR_TaskDescriptionList
+    description = models.BBR_TaskDescription
+    rows = db.execute(
+        select(
+            task.id,
+            task.task_category_id,
+            task.is_active,
+            task.template_id,
+            func.count(distinct(description_list.id)),
+            func.count(description.id),
+        )
+        .outerjoin(description_list, description_list.task_id == task.id)
+        .outerjoin(
+            description,
+            description.description_list_id == description_list.id,
+        )
+        .where(task.user_id == user.id)
+        .group_by(
+            task.id, task.task_category_id, task.is_active, task.template_id
+        )
+        .order_by(task.sort_order, task.id)
+    ).all()
+    template_counts = get_user_template_counts(
+        db, user, {row.template_id for row in rows} - {None}
+    )
+
+    categories: dict[int, TaskCategorySummary] = {}
+    task_counts = []
+    for (
+        task_id,
+        task_category_id,
+        is_active,
+        template_id,
+        lists,
+        descriptions,
+    ) in rows:
+        template_lists, template_descriptions = template_counts.get(
+            template_id, (0, 0)
+        )
+        category = categories.setdefault(
+            task_category_id,
+            TaskCategorySummary(
+                task_category_id=task_category_id,
+                active_tasks=0,
+                inactive_tasks=0,
+            ),
+        )
+        if is_active:
+            category.active_tasks += 1
+        else:
+            category.inactive_tasks += 1
+        task_counts.append(
+            TaskSummary(
+                task_id=task_id,
+                task_category_id=task_category_id,
+                is_active=is_active,
+                description_lists=lists + template_lists,
+                descriptions=descriptions + template_descriptions,
+            )
+        )
+
+    return RoutineSummary(
+        tasks=len(task_counts),
+        description_lists=sum(t.description_lists for t in task_counts),
+        descriptions=sum(t.descriptions for t in task_counts),
+        categories=sorted(
+            categories.values(), key=lambda c: c.task_category_id
+        ),
+        task_counts=task_counts,
+    )
+
+
+def get_user_template_counts(db: Session, user: User, template_ids: set):
+    # Lists and descriptions of the templates that copy-on-write tasks
+    # still show, per template
+    if not template_ids:
+        return {}
+    description_list = models.BBR_TaskDescriptionList
+    description = models.BBR_TaskDescription
+    copied = select(description_list.template_list_id).where(
+        description_list.user_id == user.id,
+        description_list.template_list_id.is_not(None),
+    )
+    return {
+        template_id: (lists, descriptions)
+        for template_id, lists, descriptions in db.execute(
+            select(
+                description_list.task_id,
+                func.count(distinct(description_list.id)),
+                func.count(description.id),
+            )
+            .outerjoin(
+                description,
+                description.description_list_id == description_list.id,
+            )
+            .where(
+                description_list.task_id.in_(template_ids),
+                description_list.id.not_in(copied),
+            )
+            .group_by(description_list.task_id)
+        )
+    }
+
+
 def create_user_task(db: Session, task: TaskBase, user: User):
     db_task = models.BBR_Task(**task.model_dump(), user_id=user.id)
     db.add(db_task)
@@ -77,59 +296,96 @@ def create_user_task(db: Session, task: TaskBase, user: User):
     return update_task(db, db_task=db_task, task=sorted_task)
 
 
-def copy_task_for_user(db: Session, task: Task, user: User):
-    print("Starting task duplication for user:", user.id)
-    db_new_task = create_user_task(
-        db,
-        TaskBase(
-            title=task.title,
-            task_category_id=task.task_category_id,
-            is_active=task.is_active,
+def pipelined_create_user_task(db: Session, task: TaskBase, user: User):
+    # create_user_task in one statement, see utils/pipeline.py. The id is
+    # taken first, sort_order is derived from it.
+    task_id = select(
+        Sequence("BBR_tasks_id_seq").next_value().label("id")
+    ).subquery()
+    values = {
+        **task.model_dump(),
+        "user_id": user.id,
+        "updated_at": models.utcnow(),
+    }
+    columns = models.BBR_Task.__table__.c
+    statement = insert(models.BBR_Task).from_select(
+        ["id", "sort_order", "version", *values],
+        select(
+            task_id.c.id,
+            task_id.c.id * 100,
+            sync_version_value(),
+            *[
+                literal(value, columns[name].type)
+                for name, value in values.items()
+            ],
         ),
-        user,
     )
-    print("New task created with id:", db_new_task.id)
+    return write_returning(db, statement, models.BBR_Task, "create")
 
-    # Update tags
-    update_task(
-        db,
-        db_new_task,
-        Task(
-            id=db_new_task.id,
-            title=db_new_task.title,
-            task_category_id=db_new_task.task_category_id,
-            is_active=db_new_task.is_active,
-            user_id=db_new_task.user_id,
-            sort_order=db_new_task.id * 100,
-            tags=task.tags,
-            description_lists=db_new_task.description_lists,
-        ),
+
+def copy_task_for_user(
+    db: Session,
+    task: Task,
+    user: User,
+    report_progress=None,
+    copy_on_write: bool = False,
+):
+    # Copy-on-write copies reference the template and leave its lists in
+    # place, see templates.py. A second copy of the same template for the
+    # user is a full copy.
+    if copy_on_write and get_referencing_task(db, user.id, task.id):
+        copy_on_write = False
+
+    print("Starting task duplication for user:", user.id)
+    # One transaction, a job that fails midway leaves no partial copy for
+    # its retry to duplicate. The flush assigns the id sort_order is
+    # derived from, as in create_user_task.
+    db_new_task = models.BBR_Task(
+        title=task.title,
+        task_category_id=task.task_category_id,
+        is_active=task.is_active,
+        user_id=user.id,
+        template_id=task.id if copy_on_write else None,
     )
-    print("Task updated successfully with id:", db_new_task.id)
-
-    # Create descriptions
-    for description_list in task.description_lists:
-        # Create new list
-        print("Creating new description list for task:", db_new_task.id)
-        db_list = TaskDescriptionListCreate(
-            title=description_list.title, task_id=db_new_task.id
+    db.add(db_new_task)
+    db.flush()
+    db_new_task.sort_order = db_new_task.id * 100
+    print("New task created with id:", db_new_task.id)
+
+    # Copy tags, lists and descriptions as new rows and flush them
+    # together, so each table gets a single batched INSERT
+    for tag in task.tags:
+        db_new_task.tags.append(
+            models.BBR_Tag(title=tag.title, task_id=db_new_task.id)
         )
-        new_db_list = create_description_list(db, db_list)
-        print("New description list created with id:", new_db_list.id)
-
-        for description in description_list.descriptions:
-            # Create new description
-            print("Creating new description for list:", new_db_list.id)
-            db_description = TaskDescriptionCreate(
-                description=description.description,
-                description_list_id=new_db_list.id,
+
+    description_lists = [] if copy_on_write else task.description_lists
+    for index, description_list in enumerate(description_lists):
+        db_new_task.description_lists.append(
+            models.BBR_TaskDescriptionList(
+                title=description_list.title,
+                task_id=db_new_task.id,
+                descriptions=[
+                    models.BBR_TaskDescription(
+                        description=description.description,
+                        description_list_id=None,
+                    )
+                    for description in description_list.descriptions
+                ],
             )
-            db_new_description = create_list_description(db, db_description)
-            print("New description created with id:", db_new_description.id)
+        )
+
+        if report_progress:
+            report_progress((index + 1) / len(description_lists) / 2)
+
+    # The batched INSERTs are the other half
+    db.commit()
+    if report_progress:
+        report_progress(1.0)
 
     print("Task duplication completed successfully for user:", user.id)
 
-    return get_task_by_id(db, db_new_task.id)
+    return get_task_by_id(db, db_new_task.id, options=task_tree_options)
 
 
 def update_task(
@@ -147,7 +403,43 @@ def update_task(
     return db_task
 
 
+def rebalance_user_task_sort_order(
+    db: Session, user_id: int, batch_size: int = 500, report_progress=None
+):
+    # Renumber in steps of 100 so there is room to insert between tasks
+    task_ids = [
+        id
+        for (id,) in db.query(models.BBR_Task.id)
+        .filter(models.BBR_Task.user_id == user_id)
+        .order_by(models.BBR_Task.sort_order, models.BBR_Task.id)
+        .all()
+    ]
+    for start in range(0, len(task_ids), batch_size):
+        # Bulk updates skip the flush listener, so bump sync versions here
+        version = next_sync_version(db)
+        updated_at = models.utcnow()
+        db.execute(
+            update(models.BBR_Task),
+            [
+                {
+                    "id": id,
+                    "sort_order": (start + index + 1) * 100,
+                    "version": version,
+                    "updated_at": updated_at,
+                }
+                for index, id in enumerate(
+                    task_ids[start : start + batch_size]
+                )
+            ],
+        )
+        db.commit()
+        if report_progress:
+            report_progress((start + batch_size) / len(task_ids))
+    return len(task_ids)
+
+
 def delete_task(db: Session, task: Task):
+    release_template(db, task)
     db.delete(task)
     db.commit()
     return True
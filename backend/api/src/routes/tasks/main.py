@@ -1,9 +1,14 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
 from backend.api.src.routes.auth.controller import get_current_active_user
+from backend.api.src.routes.jobs.runner import job_runner
+from backend.api.src.routes.jobs.schemas import Job
+from backend.api.src.routes.taskcategories.registry import (
+    task_category_registry,
+)
 from backend.api.src.routes.tasks.controller import (
     copy_task_for_user,
     create_user_task,
@@ -11,27 +16,111 @@ from backend.api.src.routes.tasks.controller import (
     get_null_user_tasks,
     get_task_by_id,
     get_user_tasks,
+    get_user_routine_summary,
+    pipelined_create_user_task,
+    get_user_task_records_by_ids,
+    task_sparse_model,
+    task_tree_options,
     update_task,
 )
-from backend.api.src.routes.tasks.schemas import Task, TaskBase, TaskCreate
+from backend.api.src.routes.tasks.templates import (
+    TEMPLATE_READ_ONLY,
+    with_templates,
+)
+from backend.api.src.routes.tasks.schemas import (
+    RoutineSummary,
+    Task,
+    TaskBase,
+    TaskBatch,
+    TaskCreate,
+)
 from backend.api.src.routes.users.schemas import User
-from backend.api.src.routes.utils.db_dependency import get_db
+from backend.api.src.routes.utils.batch import split_batch
+from backend.api.src.routes.utils.schemas import BatchIds
+from backend.api.src.routes.utils.singleflight import read_coalescer
+from backend.api.src.routes.utils.sparse import (
+    SparseSelection,
+    parse_sparse,
+    sparse_options,
+    sparse_response,
+)
+from backend.api.src.routes.utils.cache import (
+    routine_summary_key,
+    shared_cache,
+)
+from backend.api.src.routes.utils.encoding import NegotiatedRoute
+from backend.api.src.routes.utils.pipeline import pipelined_writes
+from backend.api.src.routes.utils.db_dependency import (
+    get_db,
+    get_read_db,
+)
+from backend.env_variables import TEMPLATE_COPY_ON_WRITE
 
 
 router_tasks = APIRouter(
     prefix="/api/tasks",
     tags=["Tasks"],
+    route_class=NegotiatedRoute,
 )
 
 # Task operations
 
 
+def task_options(selection: Optional[SparseSelection]):
+    if selection is None:
+        return task_tree_options
+    if (
+        "description_lists" in selection.expand
+        and "template_id" not in selection.columns
+    ):
+        # template_id is needed to merge in the template's lists
+        selection = SparseSelection(
+            [*selection.columns, "template_id"], selection.expand
+        )
+    return sparse_options(task_sparse_model, selection)
+
+
+def tasks_with_templates(
+    db: Session, selection: Optional[SparseSelection], tasks: list
+):
+    if selection is None or "description_lists" in selection.expand:
+        return with_templates(db, tasks)
+    return tasks
+
+
+def task_response(selection: Optional[SparseSelection], content):
+    if selection is None:
+        return content
+    return sparse_response(task_sparse_model, selection, content)
+
+
+def validate_task_category_id(task_category_id: int):
+    if not task_category_registry.exists(id=task_category_id):
+        raise HTTPException(status_code=400, detail="Task category not found")
+
+
 @router_tasks.get("", response_model=list[Task])
 def get_null_user_tasks_ep(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    task_category_id: Optional[int] = None,
+    title_prefix: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
-    tasks = get_null_user_tasks(db, skip=skip, limit=limit)
-    return tasks
+    selection = parse_sparse(task_sparse_model, fields, expand)
+    tasks = get_null_user_tasks(
+        db,
+        skip=skip,
+        limit=limit,
+        selection=selection,
+        is_active=is_active,
+        task_category_id=task_category_id,
+        title_prefix=title_prefix,
+    )
+    return task_response(selection, tasks)
 
 
 @router_tasks.post("", response_model=TaskCreate)
@@ -40,6 +129,9 @@ def create_task_ep(
     current_user: Annotated[User, Depends(get_current_active_user)],
     db: Session = Depends(get_db),
 ):
+    validate_task_category_id(task.task_category_id)
+    if pipelined_writes(db):
+        return pipelined_create_user_task(db, task, current_user)
     return create_user_task(db, task, current_user)
 
 
@@ -47,9 +139,10 @@ def create_task_ep(
 def copy_task_for_user_ep(
     id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
+    copy_on_write: bool = TEMPLATE_COPY_ON_WRITE,
     db: Session = Depends(get_db),
 ):
-    db_task = get_null_user_task_by_id_ep(id, db)
+    db_task = get_null_user_task(db, id)
 
     if not db_task:
         raise HTTPException(status_code=400, detail="No task found")
@@ -57,9 +150,55 @@ def copy_task_for_user_ep(
     if db_task.user_id is not None:
         raise HTTPException(status_code=400, detail="Task user not None")
 
-    db_copied_task = copy_task_for_user(db, db_task, current_user)
+    validate_task_category_id(db_task.task_category_id)
 
-    return db_copied_task
+    db_copied_task = copy_task_for_user(
+        db, db_task, current_user, copy_on_write=copy_on_write
+    )
+
+    return with_templates(db, [db_copied_task])[0]
+
+
+@router_tasks.post("/user-tasks/{id}/copy/job", response_model=Job)
+def copy_task_for_user_job_ep(
+    id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    copy_on_write: bool = TEMPLATE_COPY_ON_WRITE,
+    db: Session = Depends(get_db),
+):
+    db_task = get_null_user_task(db, id)
+
+    if not db_task:
+        raise HTTPException(status_code=400, detail="No task found")
+
+    if db_task.user_id is not None:
+        raise HTTPException(status_code=400, detail="Task user not None")
+
+    validate_task_category_id(db_task.task_category_id)
+
+    return job_runner.enqueue(
+        db,
+        "copy_task",
+        {
+            "task_id": db_task.id,
+            "user_id": current_user.id,
+            "copy_on_write": copy_on_write,
+        },
+        user_id=current_user.id,
+    )
+
+
+@router_tasks.post("/user-tasks/rebalance", response_model=Job)
+def rebalance_user_tasks_ep(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_db),
+):
+    return job_runner.enqueue(
+        db,
+        "rebalance_task_sort_order",
+        {"user_id": current_user.id},
+        user_id=current_user.id,
+    )
 
 
 @router_tasks.get("/user-tasks", response_model=list[Task])
@@ -67,9 +206,41 @@ def get_user_tasks_ep(
     current_user: Annotated[User, Depends(get_current_active_user)],
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    tag: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    task_category_id: Optional[int] = None,
+    title_prefix: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    selection = parse_sparse(task_sparse_model, fields, expand)
+    tasks = get_user_tasks(
+        db,
+        current_user,
+        skip=skip,
+        limit=limit,
+        selection=selection,
+        tag=tag,
+        is_active=is_active,
+        task_category_id=task_category_id,
+        title_prefix=title_prefix,
+    )
+    return task_response(selection, tasks_with_templates(db, selection, tasks))
+
+
+@router_tasks.get("/user-tasks/summary", response_model=RoutineSummary)
+def get_user_routine_summary_ep(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_read_db),
 ):
-    return get_user_tasks(db, current_user, skip=skip, limit=limit)
+    # Invalidated after every commit that touches the user's routine
+    key = routine_summary_key(current_user.id)
+    summary, version = shared_cache.get(key)
+    if summary is None:
+        summary = get_user_routine_summary(db, current_user).model_dump()
+        shared_cache.set(key, version, summary)
+    return summary
 
 
 @router_tasks.post("/user-tasks/{id}/delete")
@@ -84,33 +255,61 @@ def delete_user_task_ep(
     return delete_task(db=db, task=db_task)
 
 
+@router_tasks.post("/user/batch", response_model=TaskBatch)
+def get_user_tasks_by_ids_ep(
+    batch: BatchIds,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Session = Depends(get_read_db),
+):
+    db_tasks = get_user_task_records_by_ids(db, current_user, batch.ids)
+    return split_batch(batch.ids, with_templates(db, db_tasks))
+
+
 @router_tasks.post("/{id}/user", response_model=Task)
 def get_user_task_by_id_ep(
     id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    db: Session = Depends(get_db),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
-    db_task = get_task_by_id(db=db, id=id)
+    selection = parse_sparse(task_sparse_model, fields, expand)
+    db_task = get_task_by_id(db=db, id=id, options=task_options(selection))
 
     if not db_task:
         raise HTTPException(status_code=400, detail="Task not found")
 
-    return db_task
+    return task_response(
+        selection, tasks_with_templates(db, selection, [db_task])[0]
+    )
 
 
-@router_tasks.post("/{id}/nulluser", response_model=Task)
-def get_null_user_task_by_id_ep(id: int, db: Session = Depends(get_db)):
-    db_task = get_task_by_id(db=db, id=id)
+def get_null_user_task(db: Session, id: int):
+    db_task = get_task_by_id(db=db, id=id, options=task_tree_options)
 
     if not db_task:
-        raise HTTPException("Task not found")
+        raise HTTPException(status_code=400, detail="Task not found")
 
     if db_task.user_id is not None:
-        raise HTTPException("Task user not null")
+        raise HTTPException(status_code=400, detail="Task user not null")
 
     return db_task
 
 
+@router_tasks.post("/{id}/nulluser", response_model=Task)
+def get_null_user_task_by_id_ep(id: int, db: Session = Depends(get_read_db)):
+    # Shared templates get bursts of identical requests, run the query
+    # and serialization once per burst
+    def fetch_task_json():
+        db_task = get_null_user_task(db, id)
+        return Task.model_validate(db_task).model_dump_json()
+
+    return Response(
+        content=read_coalescer.do(("task", id), fetch_task_json),
+        media_type="application/json",
+    )
+
+
 @router_tasks.post("/{id}/update", response_model=Task)
 def update_task_ep(
     id: int,
@@ -123,6 +322,11 @@ def update_task_ep(
     if not db_task:
         raise HTTPException("Task not found")
 
+    if db_task.user_id is None:
+        raise HTTPException(status_code=400, detail=TEMPLATE_READ_ONLY)
+
+    validate_task_category_id(task.task_category_id)
+
     if not task.tags:
         task.tags = db_task.tags
 
@@ -21,8 +21,36 @@ class TaskCreate(TaskBase):
 class Task(TaskCreate):
     id: int
     sort_order: Optional[int] = None
+    template_id: Optional[int] = None
     tags: Optional[List[Tag]] = None
     description_lists: Optional[List[TaskDescriptionList]] = None
 
     class Config:
         from_attributes = True
+
+
+class TaskBatch(BaseModel):
+    items: List[Task]
+    missing: List[int]
+
+
+class TaskCategorySummary(BaseModel):
+    task_category_id: int
+    active_tasks: int
+    inactive_tasks: int
+
+
+class TaskSummary(BaseModel):
+    task_id: int
+    task_category_id: int
+    is_active: bool
+    description_lists: int
+    descriptions: int
+
+
+class RoutineSummary(BaseModel):
+    tasks: int
+    description_lists: int
+    descriptions: int
+    categories: List[TaskCategorySummary]
+    task_counts: List[TaskSummary]
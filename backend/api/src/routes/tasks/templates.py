@@ -0,0 +1,367 @@
+"""Copy-on-write template instances.
+
+A task copied from a template in copy-on-write mode keeps its own fields
+and tags, and references the template through template_id instead of
+duplicating its description lists. Reads merge the template's lists into
+the task. The first edit of a list, or of one of its descriptions, copies
+that list with its descriptions into the task, and the copy replaces the
+template's list from then on.
+
+A user has at most one copy-on-write instance per template, so a template
+list id and the user are enough to find the instance it is shown in.
+
+Template rows are shared by every instance. User routes never write them,
+edits without a copy-on-write task to copy into are rejected.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from backend.api import models
+
+TEMPLATE_READ_ONLY = "Templates cannot be changed"
+
+template_list_options = (
+    selectinload(models.BBR_TaskDescriptionList.descriptions),
+)
+
+
+class TemplateList:
+    """A template's description list shown as a list of the task that
+    references the template. Everything but task_id is the template's."""
+
+    def __init__(self, db_list, task_id: int):
+        self._db_list = db_list
+        self.task_id = task_id
+
+    def __getattr__(self, name):
+        return getattr(self._db_list, name)
+
+
+class TaskWithTemplate:
+    """A task with its template's lists merged into description_lists."""
+
+    def __init__(self, db_task, description_lists: list):
+        self._db_task = db_task
+        self.description_lists = description_lists
+
+    def __getattr__(self, name):
+        return getattr(self._db_task, name)
+
+
+def get_referencing_task(db: Session, user_id: int, template_id: int):
+    return (
+        db.query(models.BBR_Task)
+        .filter(
+            models.BBR_Task.user_id == user_id,
+            models.BBR_Task.template_id == template_id,
+        )
+        .first()
+    )
+
+
+def get_template_lists(
+    db: Session, template_ids, options=template_list_options
+):
+    return (
+        db.query(models.BBR_TaskDescriptionList)
+        .filter(
+            models.BBR_TaskDescriptionList.user_id.is_(None),
+            models.BBR_TaskDescriptionList.task_id.in_(template_ids),
+        )
+        .options(*options)
+        .order_by(models.BBR_TaskDescriptionList.id)
+        .all()
+    )
+
+
+def merge_lists(task_id: int, own_lists, template_lists):
+    overridden = {db_list.template_list_id for db_list in own_lists}
+    merged = [
+        *own_lists,
+        *(
+            TemplateList(db_list, task_id)
+            for db_list in template_lists
+            if db_list.id not in overridden
+        ),
+    ]
+    # Copies take their template list's place, new lists come after
+    return sorted(
+        merged, key=lambda db_list: db_list.template_list_id or db_list.id
+    )
+
+
+def with_templates(db: Session, tasks: list):
+    """The tasks with their templates' lists merged in, one query for all
+    templates. Tasks need their description_lists loaded."""
+    template_ids = {
+        db_task.template_id
+        for db_task in tasks
+        if db_task.template_id is not None
+    }
+    if not template_ids:
+        return tasks
+    template_lists = {}
+    for db_list in get_template_lists(db, template_ids):
+        template_lists.setdefault(db_list.task_id, []).append(db_list)
+    return [
+        (
+            db_task
+            if db_task.template_id is None
+            else TaskWithTemplate(
+                db_task,
+                merge_lists(
+                    db_task.id,
+                    db_task.description_lists,
+                    template_lists.get(db_task.template_id, []),
+                ),
+            )
+        )
+        for db_task in tasks
+    ]
+
+
+def get_user_template_lists_by_ids(db: Session, user_id: int, ids: list):
+    """Template lists among ids that the user's tasks show, as the user
+    sees them. Lists the user has copied are not included."""
+    task = models.BBR_Task
+    description_list = models.BBR_TaskDescriptionList
+    copied = select(description_list.template_list_id).where(
+        description_list.user_id == user_id,
+        description_list.template_list_id.is_not(None),
+    )
+    return [
+        TemplateList(db_list, task_id)
+        for task_id, db_list in db.query(task.id, description_list)
+        .join(description_list, description_list.task_id == task.template_id)
+        .filter(
+            task.user_id == user_id,
+            description_list.id.in_(ids),
+            description_list.id.not_in(copied),
+        )
+        .options(*template_list_options)
+        .all()
+    ]
+
+
+def get_user_template_descriptions_by_ids(
+    db: Session, user_id: int, ids: list
+):
+    """Template descriptions among ids that the user's tasks show."""
+    task = models.BBR_Task
+    description_list = models.BBR_TaskDescriptionList
+    description = models.BBR_TaskDescription
+    copied = select(description_list.template_list_id).where(
+        description_list.user_id == user_id,
+        description_list.template_list_id.is_not(None),
+    )
+    return (
+        db.query(description)
+        .join(
+            description_list,
+            description_list.id == description.description_list_id,
+        )
+        .join(task, task.template_id == description_list.task_id)
+        .filter(
+            task.user_id == user_id,
+            description.id.in_(ids),
+            description_list.id.not_in(copied),
+        )
+        .all()
+    )
+
+
+def _copies(db: Session):
+    # Copies made in this session, queries do not see them before a flush
+    return db.info.setdefault("template_copies", {})
+
+
+def copy_template_list(db: Session, db_task, template_list):
+    """Add a copy of template_list and its descriptions to db_task.
+    Clients saw the template's rows as the task's, tombstones tell them
+    to drop those for the copies."""
+    db_list = models.BBR_TaskDescriptionList(
+        title=template_list.title,
+        task_id=db_task.id,
+        template_list_id=template_list.id,
+        descriptions=[
+            models.BBR_TaskDescription(
+                description=db_description.description,
+                description_list_id=None,
+                template_description_id=db_description.id,
+            )
+            for db_description in template_list.descriptions
+        ],
+    )
+    db.add(db_list)
+    _copies(db)[(db_task.user_id, template_list.id)] = db_list
+    _add_tombstones(db, db_task.user_id, template_list)
+    return db_list
+
+
+def _add_tombstones(db: Session, user_id: int, template_list):
+    # The version is the flush's, see routes/sync/versions.py
+    db.add_all(
+        [
+            models.BBR_Tombstone(
+                entity="description_list",
+                entity_id=template_list.id,
+                user_id=user_id,
+                version=None,
+            ),
+            *(
+                models.BBR_Tombstone(
+                    entity="description",
+                    entity_id=db_description.id,
+                    user_id=user_id,
+                    version=None,
+                )
+                for db_description in template_list.descriptions
+            ),
+        ]
+    )
+
+
+def get_list_copy(db: Session, user_id: int, list_id: int):
+    """The user's own copy of template list list_id, copied on first use.
+    None when no task of the user shows the list."""
+    db_list = _copies(db).get((user_id, list_id))
+    if db_list is not None:
+        return db_list
+    db_list = (
+        db.query(models.BBR_TaskDescriptionList)
+        .filter(
+            models.BBR_TaskDescriptionList.user_id == user_id,
+            models.BBR_TaskDescriptionList.template_list_id == list_id,
+        )
+        .first()
+    )
+    if db_list is not None:
+        return db_list
+    row = (
+        db.query(models.BBR_Task, models.BBR_TaskDescriptionList)
+        .join(
+            models.BBR_TaskDescriptionList,
+            models.BBR_TaskDescriptionList.task_id
+            == models.BBR_Task.template_id,
+        )
+        .filter(
+            models.BBR_Task.user_id == user_id,
+            models.BBR_TaskDescriptionList.id == list_id,
+        )
+        .options(*template_list_options)
+        .first()
+    )
+    if row is None:
+        return None
+    db_task, template_list = row
+    return copy_template_list(db, db_task, template_list)
+
+
+def get_description_copy(db: Session, user_id: int, description_id: int):
+    """The user's own copy of template description description_id, made by
+    copying its list on first use. None when no task of the user shows the
+    description, or the user deleted their copy."""
+    db_description = (
+        db.query(models.BBR_TaskDescription)
+        .filter(
+            models.BBR_TaskDescription.user_id == user_id,
+            models.BBR_TaskDescription.template_description_id
+            == description_id,
+        )
+        .first()
+    )
+    if db_description is not None:
+        return db_description
+    template_description = db.get(models.BBR_TaskDescription, description_id)
+    if (
+        template_description is None
+        or template_description.user_id is not None
+    ):
+        return None
+    db_list = get_list_copy(
+        db, user_id, template_description.description_list_id
+    )
+    if db_list is None:
+        return None
+    return next(
+        (
+            db_description
+            for db_description in db_list.descriptions
+            if db_description.template_description_id == description_id
+        ),
+        None,
+    )
+
+
+def _task_copies(db: Session, db_task):
+    # Template list id to the task's copy of it, saved or not
+    copies = {
+        db_list.template_list_id: db_list
+        for db_list in db_task.description_lists
+        if db_list.template_list_id is not None
+    }
+    copies.update(
+        (template_list_id, db_list)
+        for (_, template_list_id), db_list in _copies(db).items()
+        if db_list.task_id == db_task.id
+    )
+    return copies
+
+
+def detach_task(db: Session, db_task, removed_list_id=None):
+    """Copy the template lists the task still shows, except
+    removed_list_id, and stop referencing the template. Hiding a single
+    template list is not supported, so the task becomes a plain copy."""
+    copies = _task_copies(db, db_task)
+    for template_list in get_template_lists(db, [db_task.template_id]):
+        if template_list.id in copies:
+            continue
+        if template_list.id == removed_list_id:
+            _add_tombstones(db, db_task.user_id, template_list)
+        else:
+            copy_template_list(db, db_task, template_list)
+    db_task.template_id = None
+
+
+def release_template_list(db: Session, db_list):
+    """Call before deleting db_list. Without its copy the task would show
+    the template's list again, so the task detaches from the template."""
+    if db_list.template_list_id is None:
+        return
+    db_task = db.get(models.BBR_Task, db_list.task_id)
+    if db_task is not None and db_task.template_id is not None:
+        detach_task(db, db_task)
+
+
+def remove_template_list(db: Session, user_id: int, template_list):
+    """Remove template_list, and the user's copy of it, from the user's
+    task that shows it. False when no task of the user shows it."""
+    db_task = get_referencing_task(db, user_id, template_list.task_id)
+    if db_task is None:
+        return False
+    db_list = _task_copies(db, db_task).get(template_list.id)
+    detach_task(db, db_task, removed_list_id=template_list.id)
+    if db_list is None:
+        return True
+    if db_list in db.new:
+        _copies(db).pop((user_id, template_list.id), None)
+        db.expunge(db_list)
+    else:
+        db.delete(db_list)
+    return True
+
+
+def release_template(db: Session, db_template):
+    """Call before deleting template task db_template. template_id has no
+    ON DELETE action, so every task still showing its lists gets its own
+    copies and stops referencing it first."""
+    if db_template.user_id is not None:
+        return
+    adopters = (
+        db.query(models.BBR_Task)
+        .filter(models.BBR_Task.template_id == db_template.id)
+        .all()
+    )
+    for db_task in adopters:
+        detach_task(db, db_task)
@@ -1,7 +1,14 @@
+from datetime import datetime, timezone
+
 from passlib.context import CryptContext
+from sqlalchemy import func, literal, select, union_all
 from sqlalchemy.orm import Session
 
 from backend.api import models
+from backend.api.src.routes.jobs.controller import create_job
+from backend.api.src.routes.utils.cache import shared_cache, user_cache_key
+from backend.api.src.routes.utils.projection import record_type
+from backend.env_variables import PURGE_BATCH_SIZE
 
 from . import schemas
 
@@ -13,6 +20,10 @@ def get_users(db: Session):
     return db_users
 
 
+def get_user_by_id(db: Session, id: int):
+    return db.query(models.BBR_User).filter(models.BBR_User.id == id).first()
+
+
 def get_user_by_username(db: Session, username: str):
     db_user = (
         db.query(models.BBR_User)
@@ -22,6 +33,31 @@ def get_user_by_username(db: Session, username: str):
     return db_user
 
 
+# What auth needs on every request, the password hash stays out of the cache
+_cached_user_columns = ["id", "username", "email", "full_name", "disabled"]
+
+
+def get_cached_user(db: Session, username: str):
+    """The user as a read-only record, from the shared cache when it has
+    them. Controllers that change or delete a user invalidate it."""
+    key = user_cache_key(username)
+    values, version = shared_cache.get(key)
+    if values is None:
+        row = db.execute(
+            select(
+                *[
+                    getattr(models.BBR_User, column)
+                    for column in _cached_user_columns
+                ]
+            ).where(models.BBR_User.username == username)
+        ).first()
+        if row is None:
+            return None
+        values = list(row)
+        shared_cache.set(key, version, values)
+    return record_type(models.BBR_User)(_cached_user_columns, values)
+
+
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = pwd_context.hash(user.password)
     db_user = models.BBR_User(
@@ -38,6 +74,96 @@ def create_user(db: Session, user: schemas.UserCreate):
 
 
 def delete_user(db: Session, user: schemas.UserInDB):
+    username = user.username
     db.delete(user)
     db.commit()
+    shared_cache.invalidate(user_cache_key(username))
+    return True
+
+
+def count_user_rows(db: Session, user_id: int, limit: int):
+    """The user's tasks, lists and descriptions, counted up to limit. The
+    UNION ALL stops reading once limit rows are found, so the cost does
+    not grow with the routine."""
+    rows = (
+        union_all(
+            *[
+                select(literal(1)).where(model.user_id == user_id)
+                for model in [
+                    models.BBR_Task,
+                    models.BBR_TaskDescriptionList,
+                    models.BBR_TaskDescription,
+                ]
+            ]
+        )
+        .limit(limit)
+        .subquery()
+    )
+    return db.scalar(select(func.count()).select_from(rows))
+
+
+def soft_delete_user(db: Session, user: schemas.UserInDB):
+    # The purge job row commits with the soft delete, a crash in between
+    # cannot leave a hidden user that is never purged
+    user.disabled = True
+    user.deleted_at = datetime.now(timezone.utc)
+    username = user.username
+    db_job = create_job(
+        db, kind="purge_user", payload={"user_id": user.id}, user_id=user.id
+    )
+    shared_cache.invalidate(user_cache_key(username))
+    return db_job
+
+
+def _delete_in_batches(db: Session, model, condition, batch_size: int):
+    while True:
+        batch_ids = select(model.id).where(condition).limit(batch_size)
+        deleted = (
+            db.query(model)
+            .filter(model.id.in_(batch_ids))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        if deleted < batch_size:
+            break
+
+
+def purge_user(
+    db: Session,
+    user_id: int,
+    batch_size: int = PURGE_BATCH_SIZE,
+    report_progress=None,
+):
+    username = db.scalar(
+        select(models.BBR_User.username).where(models.BBR_User.id == user_id)
+    )
+    # Children are deleted bottom up in small batches to keep every
+    # transaction short. Bulk deletes write no tombstones, nor could the
+    # user's clients fetch them: tombstones go with the user, who can no
+    # longer sign in. A new account starts over with since=0.
+    task_ids = select(models.BBR_Task.id).where(
+        models.BBR_Task.user_id == user_id
+    )
+    list_ids = select(models.BBR_TaskDescriptionList.id).where(
+        models.BBR_TaskDescriptionList.task_id.in_(task_ids)
+    )
+    batches = [
+        (
+            models.BBR_TaskDescription,
+            models.BBR_TaskDescription.description_list_id.in_(list_ids),
+        ),
+        (
+            models.BBR_TaskDescriptionList,
+            models.BBR_TaskDescriptionList.task_id.in_(task_ids),
+        ),
+        (models.BBR_Tag, models.BBR_Tag.task_id.in_(task_ids)),
+        (models.BBR_Task, models.BBR_Task.user_id == user_id),
+        (models.BBR_User, models.BBR_User.id == user_id),
+    ]
+    for index, (model, condition) in enumerate(batches):
+        _delete_in_batches(db, model, condition, batch_size)
+        if report_progress:
+            report_progress((index + 1) / len(batches))
+    if username is not None:
+        shared_cache.invalidate(user_cache_key(username))
     return True
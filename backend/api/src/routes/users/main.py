@@ -4,13 +4,19 @@ from backend.api.src.routes.auth.controller import (
     authenticate_user,
     get_current_active_user,
 )
+from backend.api.src.routes.jobs.runner import job_runner
 from backend.api.src.routes.users.controller import (
+    count_user_rows,
     create_user,
     delete_user,
+    get_user_by_id,
     get_user_by_username,
     get_users,
+    soft_delete_user,
 )
+from backend.api.src.routes.utils.admission import auth_admission
 from backend.api.src.routes.utils.db_dependency import get_db
+from backend.env_variables import PURGE_THRESHOLD_ROWS
 from .schemas import User, UserNextAuth, UserCreate
 
 from typing import Annotated
@@ -26,7 +32,9 @@ router_users = APIRouter(
 )
 
 
-@router_users.post("", response_model=UserNextAuth)
+@router_users.post(
+    "", response_model=UserNextAuth, dependencies=[Depends(auth_admission)]
+)
 def get_user_ep(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db),
@@ -48,7 +56,7 @@ def get_all_users_ep(db: Session = Depends(get_db)):
     return users
 
 
-@router_users.post("/create")
+@router_users.post("/create", dependencies=[Depends(auth_admission)])
 def create_user_ep(
     user: UserCreate,
     db: Session = Depends(get_db),
@@ -65,4 +73,12 @@ def delete_user_ep(
     current_user: Annotated[User, Depends(get_current_active_user)],
     db: Session = Depends(get_db),
 ):
-    return delete_user(db=db, user=current_user)
+    # current_user is a cached record, these need the row
+    db_user = get_user_by_id(db, current_user.id)
+    # Large routines are hidden right away and purged by a background job
+    rows = count_user_rows(db, current_user.id, PURGE_THRESHOLD_ROWS + 1)
+    if rows > PURGE_THRESHOLD_ROWS:
+        db_job = soft_delete_user(db=db, user=db_user)
+        job_runner.submit(db_job.id)
+        return True
+    return delete_user(db=db, user=db_user)
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+from backend.env_variables import (
+    AUTH_CLIENT_BURST,
+    AUTH_CLIENT_RATE,
+    AUTH_GLOBAL_BURST,
+    AUTH_GLOBAL_RATE,
+    AUTH_MAX_IN_FLIGHT,
+    TRUST_FORWARDED_FOR,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def retry_after(self):
+        return max(1, int((1 - self.tokens) / self.rate) + 1)
+
+
+class AdmissionController:
+    """Sheds load on CPU heavy routes before they run.
+
+    Each request needs a token from its client's bucket and from the
+    global bucket, and a free in-flight slot. Rejections are immediate:
+    429 for a client over its rate, 503 when the route is saturated.
+    Use as a route dependency.
+    """
+
+    def __init__(
+        self,
+        client_rate: float,
+        client_burst: float,
+        global_rate: float,
+        global_burst: float,
+        max_in_flight: int,
+        max_clients: int = 10000,
+    ):
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_in_flight = max_in_flight
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._clients: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._global = TokenBucket(global_rate, global_burst)
+        self._in_flight = 0
+        self.metrics = {
+            "admitted": 0,
+            "rejected_in_flight": 0,
+            "rejected_client_rate": 0,
+            "rejected_global_rate": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+        }
+
+    def _client_bucket(self, client: str):
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self._clients[client] = bucket
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def acquire(self, client: str):
+        now = time.monotonic()
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.metrics["rejected_in_flight"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server busy, try again",
+                    headers={"Retry-After": "1"},
+                )
+            bucket = self._client_bucket(client)
+            if not bucket.take(now):
+                self.metrics["rejected_client_rate"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(bucket.retry_after())},
+                )
+            if not self._global.take(now):
+                self.metrics["rejected_global_rate"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server busy, try again",
+                    headers={"Retry-After": str(self._global.retry_after())},
+                )
+            self._in_flight += 1
+            self.metrics["admitted"] += 1
+            self.metrics["in_flight"] = self._in_flight
+            self.metrics["peak_in_flight"] = max(
+                self.metrics["peak_in_flight"], self._in_flight
+            )
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self.metrics["in_flight"] = self._in_flight
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.metrics, "tracked_clients": len(self._clients)}
+
+    # Async, so admission runs on the event loop and a rejection never
+    # waits for a threadpool slot
+    async def __call__(self, request: Request):
+        self.acquire(request_client(request))
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def request_client(request: Request):
+    if TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# Shared by every route that runs bcrypt
+auth_admission = AdmissionController(
+    client_rate=AUTH_CLIENT_RATE,
+    client_burst=AUTH_CLIENT_BURST,
+    global_rate=AUTH_GLOBAL_RATE,
+    global_burst=AUTH_GLOBAL_BURST,
+    max_in_flight=AUTH_MAX_IN_FLIGHT,
+)
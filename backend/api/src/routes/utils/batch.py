@@ -0,0 +1,8 @@
+def split_batch(ids: list[int], rows: list):
+    # Found rows in request order, and the ids that were not found or are
+    # not visible to the user. Duplicate ids are returned once.
+    rows_by_id = {row.id: row for row in rows}
+    unique_ids = list(dict.fromkeys(ids))
+    items = [rows_by_id[id] for id in unique_ids if id in rows_by_id]
+    missing = [id for id in unique_ids if id not in rows_by_id]
+    return {"items": items, "missing": missing}
@@ -0,0 +1,338 @@
+"""Cache shared by the worker processes, with invalidation fan-out.
+
+Values live in a backend: MemoryBackend keeps them in this process,
+RedisBackend in any server speaking the Redis protocol (CACHE_URL), so
+every worker sees the same entries. Each key has a version token next to
+it. invalidate() replaces the token, so an entry stored before the write
+never matches again, and a reader that started before the write cannot
+store a stale value over it.
+
+invalidate() also publishes the keys on CACHE_CHANNEL. Every worker drops
+them from its near cache, a few seconds of recently read entries kept in
+process to skip the round trip, and runs the callbacks registered with
+on_invalidate(), which is how in-process copies such as the task category
+registry stay in step with writes on other workers.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from backend.env_variables import (
+    CACHE_CHANNEL,
+    CACHE_LOCAL_SECONDS,
+    CACHE_TTL_SECONDS,
+    CACHE_URL,
+)
+
+try:
+    import redis
+except ImportError:  # optional, CACHE_URL falls back to MemoryBackend
+    redis = None
+
+
+class MemoryBackend:
+    """Entries and invalidations stay in this process. Right for a single
+    worker and for tests, other workers never see its invalidations."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, bytes]] = {}
+        self._subscribers = []
+
+    def get_many(self, keys: list):
+        now = time.monotonic()
+        with self._lock:
+            entries = [self._entries.get(key) for key in keys]
+        return [
+            value if value is not None and expires > now else None
+            for expires, value in (entry or (0, None) for entry in entries)
+        ]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            # Dropping everything keeps versions and values consistent
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def publish(self, message: bytes):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def close(self):
+        self._subscribers.clear()
+
+
+class RedisBackend:
+    """Entries in a Redis protocol server, invalidations over its pub/sub.
+    Redis, Valkey or a local stand-in all work."""
+
+    shared = True
+
+    def __init__(self, url: str, channel: str = CACHE_CHANNEL):
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._prefix = f"{channel}:"
+        self._callbacks = []
+        self._listener = None
+        self._stopped = threading.Event()
+
+    def get_many(self, keys: list):
+        return self._client.mget([self._prefix + key for key in keys])
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self._client.set(self._prefix + key, value, px=int(ttl * 1000))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def publish(self, message: bytes):
+        self._client.publish(self.channel, message)
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+        if self._listener is None:
+            self._stopped.clear()
+            self._listener = threading.Thread(
+                target=self._listen, name="bbr-cache", daemon=True
+            )
+            self._listener.start()
+
+    def close(self):
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+            self._listener = None
+        self._callbacks.clear()
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen_once()
+            except Exception as error:
+                print("Cache listener failed, reconnecting:", error)
+                self._stopped.wait(1)
+
+    def _listen_once(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self.channel)
+            while not self._stopped.is_set():
+                message = pubsub.get_message(timeout=1)
+                if message is not None:
+                    for callback in list(self._callbacks):
+                        callback(message["data"])
+        finally:
+            pubsub.close()
+
+
+class SharedCache:
+    """get and set JSON values by key, invalidate after writes.
+
+    get returns the key's version with the value. Pass it back to set, so
+    a write that lands while the value is loaded is not hidden:
+
+        value, version = cache.get(key)
+        if value is None:
+            value = load()
+            cache.set(key, version, value)
+
+    Backend errors count as misses, the cache never fails a request.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl: float = CACHE_TTL_SECONDS,
+        local_seconds: float = CACHE_LOCAL_SECONDS,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        # A process local backend is already as near as it gets
+        self.local_seconds = local_seconds if backend.shared else 0
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._local: dict[str, tuple[float, str, object]] = {}
+        # Bumped on every invalidation received, a near cache fill that
+        # raced with one is skipped
+        self._generation = 0
+        self._callbacks: dict[str, list] = {}
+        self._latencies = deque(maxlen=1000)
+        self._started = False
+        self.metrics = {
+            "hits": 0,
+            "local_hits": 0,
+            "misses": 0,
+            "errors": 0,
+            "invalidations_sent": 0,
+            "invalidations_received": 0,
+        }
+
+    def start(self):
+        if not self._started:
+            self._started = True
+            self.backend.subscribe(self._received)
+
+    def shutdown(self):
+        self.backend.close()
+        self._started = False
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            local = self._local.get(key)
+            generation = self._generation
+            if local is not None and local[0] > now:
+                self.metrics["local_hits"] += 1
+                return local[2], local[1]
+        try:
+            stored, version = self.backend.get_many([key, _version_key(key)])
+        except Exception as error:
+            print("Cache read failed:", error)
+            self._count("errors")
+            return None, None
+        version = version.decode() if isinstance(version, bytes) else version
+        entry = json.loads(stored) if stored is not None else None
+        if entry is None or entry["version"] != version:
+            self._count("misses")
+            return None, version
+        self._count("hits")
+        self._keep_local(key, version, entry["value"], generation)
+        return entry["value"], version
+
+    def set(self, key: str, version, value):
+        # The near cache is filled by get, which checks the version
+        entry = json.dumps({"version": version, "value": value})
+        try:
+            self.backend.set(key, entry.encode(), self.ttl)
+        except Exception as error:
+            print("Cache write failed:", error)
+            self._count("errors")
+
+    def invalidate(self, *keys: str):
+        """Call after the write commits, so nobody reloads the old rows."""
+        if not keys:
+            return
+        try:
+            for key in keys:
+                # Outlives the entries, an expired version would match
+                # entries stored before it was set
+                self.backend.set(
+                    _version_key(key), uuid.uuid4().hex.encode(), self.ttl * 2
+                )
+        except Exception as error:
+            print("Cache invalidation failed:", error)
+            self._count("errors")
+        self._apply(keys)
+        message = {"keys": keys, "origin": self.origin, "sent": time.time()}
+        self._count("invalidations_sent")
+        try:
+            self.backend.publish(json.dumps(message).encode())
+        except Exception as error:
+            print("Cache invalidation publish failed:", error)
+            self._count("errors")
+
+    def on_invalidate(self, key: str, callback):
+        """callback() runs in every process when key is invalidated."""
+        self._callbacks.setdefault(key, []).append(callback)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._generation += 1
+        self.backend.clear()
+
+    def snapshot(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+            latencies = sorted(self._latencies)
+        hits = metrics["hits"] + metrics["local_hits"]
+        reads = hits + metrics["misses"]
+        metrics["hit_rate"] = hits / reads if reads else 0.0
+        metrics["backend"] = type(self.backend).__name__
+        # Send to receive, across hosts this includes their clock skew
+        if latencies:
+            metrics["invalidation_latency_ms"] = {
+                "mean": sum(latencies) / len(latencies) * 1000,
+                "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+                "max": latencies[-1] * 1000,
+            }
+        return metrics
+
+    def _received(self, data: bytes):
+        message = json.loads(data)
+        with self._lock:
+            self.metrics["invalidations_received"] += 1
+            self._latencies.append(max(time.time() - message["sent"], 0.0))
+        # The sender applied its own invalidation right away
+        if message["origin"] != self.origin:
+            self._apply(message["keys"])
+
+    def _apply(self, keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._local.pop(key, None)
+        for key in keys:
+            for callback in self._callbacks.get(key, ()):
+                callback()
+
+    def _keep_local(self, key: str, version, value, generation: int):
+        if not self.local_seconds:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            if len(self._local) >= 10000:
+                self._local.clear()
+            self._local[key] = (
+                time.monotonic() + self.local_seconds,
+                version,
+                value,
+            )
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+
+# Keys of the cached values, writers and readers build them here
+TASK_CATEGORIES_KEY = "taskcategories"
+
+
+def user_cache_key(username: str):
+    return f"user:{username}"
+
+
+def routine_summary_key(user_id: int):
+    return f"summary:{user_id}"
+
+
+def _version_key(key: str):
+    return f"version:{key}"
+
+
+def _backend():
+    if CACHE_URL and redis is not None:
+        return RedisBackend(CACHE_URL)
+    if CACHE_URL:
+        print("CACHE_URL is set but redis is not installed, caching in memory")
+    return MemoryBackend()
+
+
+shared_cache = SharedCache(_backend())
@@ -1,9 +1,34 @@
 # Dependency
-from backend.api.src.config.database import SessionLocal
+from fastapi import Request
 
+from backend.api.src.config.database import (
+    SessionLocal,
+    next_read_sessionmaker,
+)
+from backend.api.src.routes.utils.read_your_writes import (
+    client_key,
+    is_sticky,
+    mark_written,
+)
 
-def get_db():
+
+def get_db(request: Request = None):
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        if request is not None and db.info.get("has_written"):
+            mark_written(client_key(request))
+        db.close()
+
+
+def get_read_db(request: Request = None):
+    # Read only session. Falls back to primary right after the same
+    # user wrote, so they see their own changes.
+    if request is not None and is_sticky(client_key(request)):
+        db = SessionLocal()
+    else:
+        db = next_read_sessionmaker()()
     try:
         yield db
     finally:
@@ -0,0 +1,131 @@
+import gzip
+import json
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.responses import FileResponse, StreamingResponse
+
+from backend.env_variables import COMPRESSION_MIN_BYTES
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used without it
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional, clients asking for msgpack get json
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def parse_accept(header: str):
+    # "gzip;q=0.5, br" -> {"gzip": 0.5, "br": 1.0}
+    accepted = {}
+    for part in header.split(","):
+        token, *params = [item.strip() for item in part.split(";")]
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[token.lower()] = quality
+    return accepted
+
+
+def choose_media_type(accept: str):
+    accepted = parse_accept(accept)
+    if msgpack is not None:
+        for media_type in MSGPACK_MEDIA_TYPES:
+            if accepted.get(media_type, 0) > 0:
+                return media_type
+    return "application/json"
+
+
+def choose_content_encoding(accept_encoding: str):
+    accepted = parse_accept(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def encode_body(json_body: bytes, media_type: str):
+    if media_type in MSGPACK_MEDIA_TYPES:
+        return msgpack.packb(json.loads(json_body))
+    return json_body
+
+
+def compress_body(body: bytes, content_encoding: str):
+    if content_encoding == "br":
+        # Quality 4 is close to gzip 6 in size at a fraction of the CPU
+        return brotli.compress(body, quality=4)
+    if content_encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def negotiate_response(request: Request, response: Response):
+    if isinstance(response, (StreamingResponse, FileResponse)):
+        return response
+    if response.media_type != "application/json" and not response.headers.get(
+        "content-type", ""
+    ).startswith("application/json"):
+        return response
+
+    media_type = choose_media_type(request.headers.get("accept", ""))
+    body = encode_body(response.body, media_type)
+    content_encoding = None
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        content_encoding = choose_content_encoding(
+            request.headers.get("accept-encoding", "")
+        )
+        body = compress_body(body, content_encoding)
+
+    headers = {
+        key: value
+        for key, value in response.headers.items()
+        if key not in ("content-length", "content-type", "vary")
+    }
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(
+        content=body,
+        status_code=response.status_code,
+        headers=headers,
+        media_type=media_type,
+        background=response.background,
+    )
+
+
+class NegotiatedRoute(APIRoute):
+    """Route that compresses large JSON responses (br or gzip) and encodes
+    them as MessagePack when the Accept header asks for it."""
+
+    def get_route_handler(self):
+        route_handler = super().get_route_handler()
+
+        async def negotiated_route_handler(request: Request):
+            response = await route_handler(request)
+            # Compressing or converting a large body would block the event
+            # loop, small JSON bodies pass through as they are
+            media_type = choose_media_type(request.headers.get("accept", ""))
+            body = getattr(response, "body", b"")
+            if (
+                len(body) < COMPRESSION_MIN_BYTES
+                and media_type == "application/json"
+            ):
+                return negotiate_response(request, response)
+            return await run_in_threadpool(
+                negotiate_response, request, response
+            )
+
+        return negotiated_route_handler
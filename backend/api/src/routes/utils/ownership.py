@@ -0,0 +1,132 @@
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.notifications.changes import TRACKED
+
+# Tags, lists and descriptions carry their task's user_id, so reads can be
+# scoped (and partitions pruned) by user without joining up to the task.
+# (child, parent, foreign key to parent, parent collection of children),
+# tasks before lists so lists pass on the user they just got.
+_CHILDREN = [
+    (models.BBR_Tag, models.BBR_Task, "task_id", "tags"),
+    (
+        models.BBR_TaskDescriptionList,
+        models.BBR_Task,
+        "task_id",
+        "description_lists",
+    ),
+    (
+        models.BBR_TaskDescription,
+        models.BBR_TaskDescriptionList,
+        "description_list_id",
+        "descriptions",
+    ),
+]
+
+
+def owned_by(model, user_id):
+    """Filter on the denormalized user_id, templates have none."""
+    if user_id is None:
+        return model.user_id.is_(None)
+    return model.user_id == user_id
+
+
+def _parent_user_ids(session: Session, model, ids: set):
+    # Identity map first, one query for the rest
+    user_ids = {}
+    for id in ids:
+        row = session.identity_map.get(identity_key(model, id))
+        if row is not None and "user_id" in inspect(row).dict:
+            user_ids[id] = inspect(row).dict["user_id"]
+    missing = ids - user_ids.keys()
+    if missing:
+        user_ids.update(
+            session.connection()
+            .execute(
+                select(model.id, model.user_id).where(model.id.in_(missing))
+            )
+            .all()
+        )
+    return user_ids
+
+
+def _reparented(obj, foreign_key: str):
+    return inspect(obj).attrs[foreign_key].history.has_changes()
+
+
+def _set_user_id(session: Session, obj, user_id):
+    state = inspect(obj)
+    old_user_id = state.dict.get("user_id")
+    if state.pending or old_user_id == user_id:
+        obj.user_id = user_id
+        return
+    # Moved out of a user's routine, their clients drop it on sync. The
+    # version is the flush's, see routes/sync/versions.py
+    if old_user_id is not None:
+        session.add(
+            models.BBR_Tombstone(
+                entity=TRACKED[type(obj)][0],
+                entity_id=obj.id,
+                user_id=old_user_id,
+                version=None,
+            )
+        )
+    obj.user_id = user_id
+    if isinstance(obj, models.BBR_TaskDescriptionList):
+        for description in obj.descriptions:
+            _set_user_id(session, description, user_id)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _set_child_user_ids(session: Session, flush_context, instances):
+    # New children, and children moved to another parent, which may belong
+    # to another user
+    pending = {}
+    for child_model, _, foreign_key, _ in _CHILDREN:
+        for obj in session.new:
+            if type(obj) is child_model:
+                pending[id(obj)] = obj
+        for obj in session.dirty:
+            if type(obj) is child_model and _reparented(obj, foreign_key):
+                pending[id(obj)] = obj
+
+    with session.no_autoflush:
+        for child_model, parent_model, foreign_key, collection in _CHILDREN:
+            # Children appended to a parent's collection have no foreign
+            # key before the flush, they take the parent's user
+            for parent in [*session.new, *session.dirty]:
+                if type(parent) is not parent_model:
+                    continue
+                state = inspect(parent)
+                if collection not in state.dict:
+                    continue
+                added = {
+                    id(child)
+                    for child in state.attrs[collection].history.added
+                }
+                for child in state.dict[collection]:
+                    moved = id(child) in added
+                    if pending.pop(id(child), None) is not None or moved:
+                        _set_user_id(session, child, parent.user_id)
+            # The rest name their parent by foreign key
+            children = [
+                obj
+                for obj in pending.values()
+                if type(obj) is child_model
+                and getattr(obj, foreign_key) is not None
+            ]
+            if not children:
+                continue
+            user_ids = _parent_user_ids(
+                session,
+                parent_model,
+                {getattr(obj, foreign_key) for obj in children},
+            )
+            for obj in children:
+                _set_user_id(
+                    session, obj, user_ids.get(getattr(obj, foreign_key))
+                )
+                del pending[id(obj)]
@@ -0,0 +1,174 @@
+"""Hot writes in one network flight on Postgres.
+
+An ORM write waits for a round trip per statement: the sync version, the
+INSERT or UPDATE, the change notification, the COMMIT and the SELECT that
+refreshes the row after it. With PIPELINE_WRITES, the hot inserts and
+updates are a single statement instead. It takes the version from the
+sequence, copies the user from the parent row, sends the notification and
+returns the row. With psycopg 3 (POSTGRES_DRIVER=psycopg) the BEGIN, the
+statement and the COMMIT are sent together in pipeline mode, one round
+trip, and the statement is prepared on the server from its first run on a
+connection. Other
+statements wait for PREPARE_THRESHOLD runs, see config/database.py, but
+psycopg forgets its prepared statements on every ROLLBACK, which ends each
+read-only session. psycopg2 sends them one after the other.
+
+The statements skip the flush listeners, so they do everything those do
+for a single row, and the routine summary is invalidated here. With
+psycopg 3 the slow query log does not see them. Their COMMIT would also
+commit whatever the session flushed before, so a session with ORM work
+in its transaction, such as a copy-on-write copy, writes through the ORM.
+"""
+
+from sqlalchemy import Text, case, cast, event, func, literal, select
+from sqlalchemy.orm import Session
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal, psycopg
+from backend.api.src.routes.utils.cache import (
+    routine_summary_key,
+    shared_cache,
+)
+from backend.api.src.routes.notifications.changes import TRACKED
+from backend.api.src.routes.sync.controller import sync_version_value
+from backend.api.src.routes.utils.projection import record_type
+from backend.env_variables import NOTIFY_CHANNEL, PIPELINE_WRITES
+
+
+# Transaction status of a psycopg 3 connection outside a transaction
+IDLE = psycopg.pq.TransactionStatus.IDLE if psycopg is not None else None
+
+
+def pipelined_writes(db: Session):
+    return (
+        PIPELINE_WRITES
+        and db.get_bind().dialect.name == "postgresql"
+        and not _has_orm_work(db)
+    )
+
+
+def _has_orm_work(db: Session):
+    # Pending objects, or rows flushed in the current transaction
+    return bool(db.new or db.dirty or db.deleted) or db.info.get("flushed")
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flushed(session, flush_context):
+    session.info["flushed"] = True
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _clear_flushed(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("flushed", None)
+
+
+def written_values(values: dict):
+    """values with the columns the flush listeners would set."""
+    return {
+        **values,
+        "version": sync_version_value(),
+        "updated_at": models.utcnow(),
+    }
+
+
+def parent_user_id(parent_model, parent_id):
+    # Children carry their parent's user, see utils/ownership.py
+    return (
+        select(parent_model.user_id)
+        .where(parent_model.id == parent_id)
+        .scalar_subquery()
+    )
+
+
+def _text(value: str):
+    # json_build_object takes "any", psycopg 3 sends str untyped
+    return cast(literal(value), Text)
+
+
+def _notifying(statement, model, op: str):
+    # The written row, and the change event sent with the transaction in
+    # the format of notifications/broker.py
+    table = model.__table__
+    row = statement.returning(*table.c).cte("written")
+    change_type, parent = TRACKED[model]
+    event = [
+        _text("type"),
+        _text(change_type),
+        _text("op"),
+        _text(op),
+        _text("id"),
+        row.c.id,
+    ]
+    if parent:
+        event += [_text(parent), row.c[parent]]
+    payload = func.json_build_object(
+        _text("user_id"),
+        row.c.user_id,
+        _text("events"),
+        func.json_build_array(func.json_build_object(*event)),
+    )
+    # Templates have no owner to notify
+    notified = case(
+        (
+            row.c.user_id.is_not(None),
+            cast(func.pg_notify(NOTIFY_CHANNEL, cast(payload, Text)), Text),
+        )
+    )
+    return select(*row.c, notified.label("notified"))
+
+
+def _execute(db: Session, statement):
+    assert not _has_orm_work(db), "check pipelined_writes() first"
+    connection = db.connection()
+    if connection.dialect.driver != "psycopg":
+        try:
+            row = connection.execute(statement).one()
+        except Exception:
+            db.rollback()
+            raise
+        db.commit()
+        return row
+    compiled = statement.compile(dialect=connection.dialect)
+    dbapi_connection = connection.connection.driver_connection
+    # psycopg waits for the result of its own BEGIN and of commit(), BEGIN
+    # and COMMIT queries are queued with the statement instead
+    idle = dbapi_connection.info.transaction_status == IDLE
+    autocommit = dbapi_connection.autocommit
+    try:
+        if idle:
+            dbapi_connection.autocommit = True
+        with dbapi_connection.pipeline():
+            cursor = dbapi_connection.cursor()
+            if idle:
+                cursor.execute("BEGIN")
+            # Preparing adds no round trip here, and rollbacks would keep
+            # resetting the PREPARE_THRESHOLD count
+            cursor.execute(
+                compiled.string, compiled.construct_params(), prepare=True
+            )
+            dbapi_connection.cursor().execute("COMMIT")
+        # All sent and answered in one flight when the pipeline closed
+        row = cursor.fetchone()
+    except Exception:
+        dbapi_connection.rollback()
+        db.rollback()
+        raise
+    finally:
+        dbapi_connection.autocommit = autocommit
+    # Nothing left to commit, this closes the session's transaction
+    db.commit()
+    return row
+
+
+def write_returning(db: Session, statement, model, op: str):
+    """Run the INSERT or UPDATE statement of one model row and commit.
+    Returns the written row as a read-only record, see utils/projection.py.
+    """
+    row = _execute(db, _notifying(statement, model, op))
+    db.info["has_written"] = True
+    columns = model.__table__.c.keys()
+    record = record_type(model)(columns, row[: len(columns)])
+    if record.user_id is not None:
+        shared_cache.invalidate(routine_summary_key(record.user_id))
+    return record
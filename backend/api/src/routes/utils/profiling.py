@@ -0,0 +1,213 @@
+import functools
+import inspect
+import os
+import random
+import selectors
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi.routing import APIRoute
+
+from backend.api.src.routes.internal.controller import is_internal_token
+from backend.env_variables import (
+    PROFILE_DIR,
+    PROFILE_INTERVAL_MS,
+    PROFILE_SAMPLE_RATE,
+)
+
+_SELECTORS = selectors.__file__
+
+current_sampler: ContextVar[Optional["RequestSampler"]] = ContextVar(
+    "current_sampler", default=None
+)
+
+
+class RequestSampler:
+    """Stack sampling profiler for one request.
+
+    A background thread samples the stacks of the threads registered for
+    the request: the event loop thread, and worker threads while they run
+    the request's endpoint, dependencies or response validation. Samples
+    are kept as folded stacks, the input format of flamegraph.pl,
+    speedscope and inferno.
+
+    The event loop thread is shared, so its samples can include other
+    requests that were awaited at the same time.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = Counter()
+        self._threads = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample, name="bbr-profiler", daemon=True
+        )
+
+    def enter_thread(self):
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def exit_thread(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                thread_ids = list(self._threads)
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                # An event loop waiting in its selector is idle, not slow
+                if frame is None or frame.f_code.co_filename == _SELECTORS:
+                    continue
+                self.samples[fold_stack(frame)] += 1
+
+    def write(self, directory: str, name: str, root: str):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.folded")
+        with open(path, "w") as file:
+            for stack, count in self.samples.items():
+                file.write(f"{root};{stack} {count}\n")
+        return path
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        file_name = os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({file_name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _profiled(call):
+    # Register the calling thread with the request's sampler while call
+    # runs. Without a sampler this is a single ContextVar lookup.
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def profiled_async_call(*args, **kwargs):
+            sampler = current_sampler.get()
+            if sampler is None:
+                return await call(*args, **kwargs)
+            sampler.enter_thread()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                sampler.exit_thread()
+
+        return profiled_async_call
+
+    @functools.wraps(call)
+    def profiled_call(*args, **kwargs):
+        sampler = current_sampler.get()
+        if sampler is None:
+            return call(*args, **kwargs)
+        sampler.enter_thread()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            sampler.exit_thread()
+
+    return profiled_call
+
+
+def _instrument_dependant(dependant):
+    call = dependant.call
+    # Plain functions only. Generator dependencies (sessions) and callable
+    # instances (security schemes, admission) keep their own call.
+    if (
+        inspect.isfunction(call)
+        and not inspect.isgeneratorfunction(call)
+        and not inspect.isasyncgenfunction(call)
+        and not getattr(call, "__profiled__", False)
+    ):
+        dependant.call = _profiled(call)
+        dependant.call.__profiled__ = True
+    for sub_dependant in dependant.dependencies:
+        _instrument_dependant(sub_dependant)
+
+
+def instrument_routes(routes):
+    """Let profiled requests see work FastAPI runs in worker threads."""
+    for route in routes:
+        if not isinstance(route, APIRoute):
+            continue
+        _instrument_dependant(route.dependant)
+        response_field = route.secure_cloned_response_field
+        if response_field is not None and not hasattr(
+            response_field.validate, "__profiled__"
+        ):
+            response_field.validate = _profiled(response_field.validate)
+            response_field.validate.__profiled__ = True
+
+
+def _should_profile(scope):
+    headers = dict(scope.get("headers") or [])
+    if headers.get(b"x-profile") == b"1":
+        token = headers.get(b"x-internal-token", b"").decode("latin-1")
+        if is_internal_token(token):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """Profiles requests sent with X-Profile: 1 and a valid
+    X-Internal-Token, and a PROFILE_SAMPLE_RATE fraction of all requests.
+    Files go to PROFILE_DIR named by time, route and duration."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = RequestSampler(PROFILE_INTERVAL_MS / 1000)
+        token = current_sampler.set(sampler)
+        sampler.enter_thread()
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            sampler.exit_thread()
+            sampler.stop()
+            current_sampler.reset(token)
+            self._write(scope, sampler, duration_ms)
+
+    def _write(self, scope, sampler: RequestSampler, duration_ms: float):
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+        slug = (
+            path.strip("/").replace("/", "_").replace("{", "").replace("}", "")
+        )
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        name = (
+            f"{stamp}_{scope['method']}_{slug or 'root'}_{duration_ms:.0f}ms"
+        )
+        path = sampler.write(
+            PROFILE_DIR, name, root=f"{scope['method']} {path}"
+        )
+        print("Request profile written to", path)
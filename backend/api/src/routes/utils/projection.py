@@ -0,0 +1,146 @@
+"""Read-only records for list and tree endpoints.
+
+ORM instances carry instance state, an identity map entry and relationship
+collections per row, and list endpoints throw all of that away after
+serializing. Projections select the columns a response needs as plain
+rows, one query per level of the tree like selectinload, and keep each
+row in a __slots__ record. Records are not tracked by the session, and
+reading an attribute that was not loaded raises AttributeError.
+"""
+
+from typing import Optional
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+from backend.api.src.routes.utils.sparse import SparseModel, SparseSelection
+
+# selectinload's IN chunk size
+CHUNK_SIZE = 500
+
+
+class Record:
+    __slots__ = ()
+
+    def __init__(self, names, values):
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.__slots__
+            if hasattr(self, name)
+        )
+        return f"{type(self).__name__}({values})"
+
+
+_record_types = {}
+
+
+def record_type(model):
+    # Slots for every column and relationship, loaded or not
+    if model not in _record_types:
+        mapper = inspect(model)
+        _record_types[model] = type(
+            f"{model.__name__}Record",
+            (Record,),
+            {
+                "__slots__": (
+                    *mapper.column_attrs.keys(),
+                    *mapper.relationships.keys(),
+                )
+            },
+        )
+    return _record_types[model]
+
+
+def full_selection(sparse_model: SparseModel):
+    """Every column and relationship, what the endpoint returns without
+    fields= or expand=."""
+
+    def tree(sparse_model: SparseModel):
+        return {
+            name: tree(child)
+            for name, child in sparse_model.relationships.items()
+        }
+
+    return SparseSelection(sparse_model.columns, tree(sparse_model))
+
+
+def _parent_key(model, name: str):
+    # The child column that refers to the parent's id
+    ((_, child_column),) = getattr(model, name).property.local_remote_pairs
+    return child_column.key
+
+
+def _columns(sparse_model: SparseModel, columns: list, required: list):
+    names = [*columns, *sparse_model.keys, *required]
+    return list(dict.fromkeys(names))
+
+
+def _records(db: Session, model, columns: list, statement):
+    record = record_type(model)
+    return [record(columns, row) for row in db.execute(statement)]
+
+
+def _load_children(db: Session, sparse_model: SparseModel, parents, expand):
+    model = sparse_model.model
+    for name, children in expand.items():
+        child_model = sparse_model.relationships[name]
+        parent_key = _parent_key(model, name)
+        columns = _columns(child_model, child_model.columns, [parent_key])
+        by_parent = {parent.id: [] for parent in parents}
+        ids = list(by_parent)
+        records = []
+        for start in range(0, len(ids), CHUNK_SIZE):
+            records += _records(
+                db,
+                child_model.model,
+                columns,
+                select(
+                    *[getattr(child_model.model, column) for column in columns]
+                )
+                .where(
+                    getattr(child_model.model, parent_key).in_(
+                        ids[start : start + CHUNK_SIZE]
+                    )
+                )
+                .order_by(child_model.model.id),
+            )
+        for child in records:
+            by_parent[getattr(child, parent_key)].append(child)
+        for parent in parents:
+            setattr(parent, name, by_parent[parent.id])
+        if children and records:
+            _load_children(db, child_model, records, children)
+
+
+def load_records(
+    db: Session,
+    sparse_model: SparseModel,
+    selection: Optional[SparseSelection],
+    *where,
+    order_by=(),
+    offset: Optional[int] = None,
+    limit: Optional[int] = None,
+):
+    """Records of sparse_model.model matching where, with the selected
+    columns and expanded relationships. selection None loads the full
+    tree."""
+    if selection is None:
+        selection = full_selection(sparse_model)
+    model = sparse_model.model
+    required = ["id"] if selection.expand else []
+    columns = _columns(sparse_model, selection.columns, required)
+    statement = (
+        select(*[getattr(model, column) for column in columns])
+        .where(*where)
+        .order_by(*order_by)
+        .offset(offset)
+        .limit(limit)
+    )
+    records = _records(db, model, columns, statement)
+    if records:
+        _load_children(db, sparse_model, records, selection.expand)
+    return records
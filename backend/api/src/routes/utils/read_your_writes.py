@@ -0,0 +1,52 @@
+import threading
+import time
+
+from fastapi import Request
+from jose import JWTError, jwt
+
+from backend.env_variables import READ_YOUR_WRITES, READ_YOUR_WRITES_SECONDS
+
+_lock = threading.Lock()
+_sticky_until: dict[str, float] = {}
+
+
+def user_key(username: str):
+    return f"user:{username}"
+
+
+def client_key(request: Request):
+    # Used only for routing, so the token signature is not verified here.
+    # Authorization is still done by get_current_user on every endpoint.
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            username = jwt.get_unverified_claims(authorization[7:]).get("sub")
+        except JWTError:
+            username = None
+        if username:
+            return user_key(username)
+    if request.client:
+        return f"client:{request.client.host}"
+    return None
+
+
+def mark_written(key: str):
+    if key is None or not READ_YOUR_WRITES:
+        return
+    now = time.monotonic()
+    with _lock:
+        _sticky_until[key] = now + READ_YOUR_WRITES_SECONDS
+        # Keep the table small, drop expired entries
+        if len(_sticky_until) > 10000:
+            for stale_key in [
+                k for k, until in _sticky_until.items() if until <= now
+            ]:
+                del _sticky_until[stale_key]
+
+
+def is_sticky(key: str):
+    if not READ_YOUR_WRITES or key is None:
+        return False
+    with _lock:
+        until = _sticky_until.get(key)
+    return until is not None and until > time.monotonic()
@@ -0,0 +1,7 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class BatchIds(BaseModel):
+    ids: List[int] = Field(max_length=500)
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from backend.env_variables import SINGLEFLIGHT_STALE_SECONDS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one execution.
+
+    The first caller for a key runs fn, callers arriving while it runs
+    wait and share its result or exception. With stale_seconds set, a
+    result that recent is returned right away to callers arriving while a
+    newer one is being fetched (stale while revalidate).
+
+    Only use it for idempotent reads that do not depend on the caller.
+    """
+
+    def __init__(self, stale_seconds: float = 0.0):
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._calls: dict[object, _Call] = {}
+        self._recent: dict[object, tuple[float, object]] = {}
+        self.metrics = {
+            "requests": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "stale_hits": 0,
+        }
+
+    def do(self, key, fn):
+        with self._lock:
+            self.metrics["requests"] += 1
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self.metrics["executions"] += 1
+            else:
+                recent = self._recent.get(key)
+                if (
+                    recent is not None
+                    and time.monotonic() - recent[0] < self.stale_seconds
+                ):
+                    self.metrics["stale_hits"] += 1
+                    return recent[1]
+                self.metrics["coalesced"] += 1
+
+        if is_leader:
+            return self._lead(key, call, fn)
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _lead(self, key, call: _Call, fn):
+        try:
+            call.result = fn()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.stale_seconds:
+                    self._recent[key] = (time.monotonic(), call.result)
+                    self._drop_expired_recent()
+            call.done.set()
+        return call.result
+
+    def _drop_expired_recent(self):
+        if len(self._recent) < 1000:
+            return
+        now = time.monotonic()
+        for key in [
+            key
+            for key, (stored, _) in self._recent.items()
+            if now - stored >= self.stale_seconds
+        ]:
+            del self._recent[key]
+
+    def snapshot(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+        shared = metrics["coalesced"] + metrics["stale_hits"]
+        metrics["coalescing_ratio"] = (
+            shared / metrics["requests"] if metrics["requests"] else 0.0
+        )
+        return metrics
+
+
+# Shared by the null user (template) read endpoints
+read_coalescer = SingleFlight(stale_seconds=SINGLEFLIGHT_STALE_SECONDS)
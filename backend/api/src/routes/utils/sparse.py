@@ -0,0 +1,120 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+
+class SparseModel:
+    """Columns and relationships a client may select on a read endpoint.
+
+    Columns come from the response schema, so fields= can only select
+    what the endpoint returns anyway. keys are columns the server needs
+    to build the response but does not return, see utils/projection.py.
+    """
+
+    def __init__(
+        self, model, schema, relationships: dict = None, keys: list = ()
+    ):
+        self.model = model
+        self.relationships = relationships or {}
+        self.keys = list(keys)
+        self.columns = [
+            name
+            for name in schema.model_fields
+            if name not in self.relationships
+        ]
+
+
+class SparseSelection:
+    def __init__(self, columns: list[str], expand: dict):
+        self.columns = columns
+        self.expand = expand
+
+
+def _split(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_sparse(
+    sparse_model: SparseModel, fields: Optional[str], expand: Optional[str]
+):
+    # None keeps the endpoint's full response
+    if fields is None and expand is None:
+        return None
+
+    columns = sparse_model.columns
+    if fields is not None:
+        columns = _split(fields)
+        unknown = [
+            name for name in columns if name not in sparse_model.columns
+        ]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields {', '.join(unknown)}"
+            )
+        if "id" not in columns:
+            columns = ["id", *columns]
+
+    expand_tree = {}
+    for path in _split(expand or ""):
+        node, current = expand_tree, sparse_model
+        for name in path.split("."):
+            if name not in current.relationships:
+                raise HTTPException(
+                    status_code=400, detail=f"Unknown expand {path}"
+                )
+            node = node.setdefault(name, {})
+            current = current.relationships[name]
+
+    return SparseSelection(columns, expand_tree)
+
+
+def _relationship_options(sparse_model: SparseModel, expand: dict):
+    return [
+        selectinload(getattr(sparse_model.model, name)).options(
+            *_relationship_options(sparse_model.relationships[name], children),
+            raiseload("*"),
+        )
+        for name, children in expand.items()
+    ]
+
+
+def sparse_options(sparse_model: SparseModel, selection: SparseSelection):
+    # Only the selected columns are in the SELECT, expanded relationships
+    # are selectin loaded and anything else raises instead of lazy loading
+    model = sparse_model.model
+    return [
+        load_only(
+            *[getattr(model, name) for name in selection.columns],
+            raiseload=True,
+        ),
+        *_relationship_options(sparse_model, selection.expand),
+        raiseload("*"),
+    ]
+
+
+def _dump(sparse_model: SparseModel, obj, columns: list[str], expand: dict):
+    data = {name: getattr(obj, name) for name in columns}
+    for name, children in expand.items():
+        child_model = sparse_model.relationships[name]
+        data[name] = [
+            _dump(child_model, item, child_model.columns, children)
+            for item in getattr(obj, name)
+        ]
+    return data
+
+
+def sparse_response(
+    sparse_model: SparseModel, selection: SparseSelection, content
+):
+    if isinstance(content, list):
+        return JSONResponse(
+            [
+                _dump(sparse_model, obj, selection.columns, selection.expand)
+                for obj in content
+            ]
+        )
+    return JSONResponse(
+        _dump(sparse_model, content, selection.columns, selection.expand)
+    )
@@ -5,6 +5,89 @@ load_dotenv(".env")
 SQLALCHEMY_DATABASE_URL = os.getenv("POSTGRES_URL").replace(
     "postgres:", "postgresql:"
 )
+# Comma separated list of read replica urls. Empty means reads go to primary.
+SQLALCHEMY_REPLICA_URLS = [
+    url.strip().replace("postgres:", "postgresql:")
+    for url in os.getenv("POSTGRES_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Route a user's reads to primary for a while after they wrote something
+READ_YOUR_WRITES = os.getenv("READ_YOUR_WRITES", "true").lower() == "true"
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Users with more rows than this are soft deleted and purged in background
+PURGE_THRESHOLD_ROWS = int(os.getenv("PURGE_THRESHOLD_ROWS", "1000"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+# In-process background jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY_SECONDS = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "5"))
+# Running jobs not updated for this long are assumed orphaned by a crash
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+# How often a running runner looks for them
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "60"))
+# How often a running job touches its row, well below JOB_STALE_SECONDS
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "60"))
+# Admission control for routes that run bcrypt. Rates are per second.
+AUTH_CLIENT_RATE = float(os.getenv("AUTH_CLIENT_RATE", "1"))
+AUTH_CLIENT_BURST = float(os.getenv("AUTH_CLIENT_BURST", "5"))
+AUTH_GLOBAL_RATE = float(os.getenv("AUTH_GLOBAL_RATE", "20"))
+AUTH_GLOBAL_BURST = float(os.getenv("AUTH_GLOBAL_BURST", "40"))
+AUTH_MAX_IN_FLIGHT = int(os.getenv("AUTH_MAX_IN_FLIGHT", os.cpu_count() or 2))
+# Only enable behind a proxy that overwrites X-Forwarded-For (Vercel does)
+TRUST_FORWARDED_FOR = (
+    os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+)
+# Token for /api/internal endpoints. Unset disables them.
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+# Coalesced template reads may return a result this old while a fresher
+# one is being fetched. 0 disables it.
+SINGLEFLIGHT_STALE_SECONDS = float(
+    os.getenv("SINGLEFLIGHT_STALE_SECONDS", "0")
+)
+# Smaller responses are not worth compressing
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Request profiling. X-Profile: 1 with the internal token profiles one
+# request, PROFILE_SAMPLE_RATE profiles a random fraction of all requests.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Statements slower than SLOW_QUERY_MS are kept for /api/internal/slow-queries,
+# 0 turns the log off. Postgres SELECTs get an EXPLAIN (ANALYZE, BUFFERS).
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(
+    os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "60")
+)
+# Change notifications. Events per connection kept for a slow client
+# before it is told to resync, and seconds between idle heartbeats.
+NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "bbr_changes")
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))
+NOTIFY_HEARTBEAT_SECONDS = float(os.getenv("NOTIFY_HEARTBEAT_SECONDS", "25"))
+# Default mode of template copies, copy-on-write copies reference the
+# template and copy a description list on its first edit
+TEMPLATE_COPY_ON_WRITE = (
+    os.getenv("TEMPLATE_COPY_ON_WRITE", "false").lower() == "true"
+)
+# Postgres driver, psycopg2 or psycopg (psycopg 3, optional). psycopg 3
+# prepares statements server side after PREPARE_THRESHOLD executions.
+POSTGRES_DRIVER = os.getenv("POSTGRES_DRIVER", "psycopg2")
+PREPARE_THRESHOLD = int(os.getenv("PREPARE_THRESHOLD", "5"))
+# Hot inserts and updates as single statements, pipelined with psycopg 3,
+# see routes/utils/pipeline.py. Postgres only.
+PIPELINE_WRITES = os.getenv("PIPELINE_WRITES", "false").lower() == "true"
+# Cache shared by the workers, see routes/utils/cache.py. A Redis protocol
+# url, empty keeps entries and invalidations in process (one worker).
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_CHANNEL = os.getenv("CACHE_CHANNEL", "bbr_cache")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+# Recently read entries kept in process, dropped on invalidation messages
+CACHE_LOCAL_SECONDS = float(os.getenv("CACHE_LOCAL_SECONDS", "5"))
+# Startup warm-up in the background, /api/health/ready answers 503 until
+# it has finished. Connections opened per engine, kept up to the pool size.
+WARMUP = os.getenv("WARMUP", "true").lower() == "true"
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "2"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
@@ -0,0 +1,202 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# The app reads its settings at import time, so configure a throwaway
+# database before anything from backend.api is imported. Point
+# TEST_DATABASE_URL to a local Postgres to run against it instead.
+_database_path = os.path.join(tempfile.mkdtemp(), "bbr_test.db")
+os.environ["POSTGRES_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{_database_path}"
+)
+os.environ["POSTGRES_REPLICA_URLS"] = ""
+# Tests recreate the tables, a background warm-up would race them
+os.environ["WARMUP"] = "false"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from backend.api import models  # noqa: E402
+from backend.api.main import app  # noqa: E402
+from backend.api.src.config.database import SessionLocal, engine  # noqa
+from backend.api.src.routes.auth.controller import (  # noqa: E402
+    create_access_token,
+    get_password_hash,
+)
+from backend.api.src.routes.taskcategories.registry import (  # noqa: E402
+    task_category_registry,
+)
+from backend.api.src.routes.utils.cache import shared_cache  # noqa: E402
+
+# Data scale the budgets are asserted at
+TASKS = 20
+LISTS_PER_TASK = 3
+DESCRIPTIONS_PER_LIST = 5
+
+_hashed_password = get_password_hash("password")
+
+
+class StatementRecorder:
+    """Records SQL statements sent to the engine and ORM rows loaded."""
+
+    def __init__(self):
+        self.statements = []
+        self.rows = 0
+        self.active = False
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        if self.active:
+            self.statements.append((statement, parameters))
+
+    def on_load(self, target, context):
+        if self.active:
+            self.rows += 1
+
+    def report(self):
+        return "\n".join(
+            f"[{index}] {statement}\n    params: {parameters}"
+            for index, (statement, parameters) in enumerate(
+                self.statements, start=1
+            )
+        )
+
+
+@pytest.fixture
+def statement_recorder():
+    recorder = StatementRecorder()
+    event.listen(
+        engine, "before_cursor_execute", recorder.before_cursor_execute
+    )
+    event.listen(models.Base, "load", recorder.on_load, propagate=True)
+    try:
+        yield recorder
+    finally:
+        event.remove(
+            engine, "before_cursor_execute", recorder.before_cursor_execute
+        )
+        event.remove(models.Base, "load", recorder.on_load)
+
+
+@pytest.fixture
+def statement_budget(statement_recorder):
+    """Usage: with statement_budget(max_statements=3, max_rows=20): ..."""
+
+    @contextmanager
+    def budget(max_statements: int, max_rows: int = None):
+        statement_recorder.statements.clear()
+        statement_recorder.rows = 0
+        statement_recorder.active = True
+        try:
+            yield statement_recorder
+        finally:
+            statement_recorder.active = False
+
+        # Postgres sends change notifications with one pg_notify per
+        # writing commit, see notifications/broker.py. Budgets are measured
+        # on sqlite, so those are listed but not counted.
+        statements = len(
+            [
+                statement
+                for statement, _ in statement_recorder.statements
+                if not statement.startswith("SELECT pg_notify(")
+            ]
+        )
+        rows = statement_recorder.rows
+        over_statements = statements > max_statements
+        over_rows = max_rows is not None and rows > max_rows
+        if over_statements or over_rows:
+            pytest.fail(
+                f"Budget exceeded: {statements} statements "
+                f"(max {max_statements}), {rows} rows (max {max_rows})\n"
+                + statement_recorder.report(),
+                pytrace=False,
+            )
+
+    return budget
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def routine(client):
+    """Fresh database with one user routine and one template task tree."""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    with SessionLocal() as db:
+        db_user = models.BBR_User(
+            username="budget",
+            email=None,
+            full_name=None,
+            hashed_password=_hashed_password,
+        )
+        db_category = models.BBR_TaskCategory(title="Mobility")
+        db.add_all([db_user, db_category])
+        db.flush()
+
+        def build_task(user_id, index):
+            return models.BBR_Task(
+                title=f"Task {index}",
+                task_category_id=db_category.id,
+                user_id=user_id,
+                sort_order=(index + 1) * 100,
+                tags=[models.BBR_Tag(title=f"tag {index}", task_id=None)],
+                description_lists=[
+                    models.BBR_TaskDescriptionList(
+                        title=f"List {index}.{list_index}",
+                        task_id=None,
+                        descriptions=[
+                            models.BBR_TaskDescription(
+                                description=f"Step {n}",
+                                description_list_id=None,
+                            )
+                            for n in range(DESCRIPTIONS_PER_LIST)
+                        ],
+                    )
+                    for list_index in range(LISTS_PER_TASK)
+                ],
+            )
+
+        db_tasks = [build_task(db_user.id, index) for index in range(TASKS)]
+        db_template = build_task(None, TASKS)
+        db.add_all([*db_tasks, db_template])
+        db.commit()
+
+        first_task = db_tasks[0]
+        first_list = first_task.description_lists[0]
+        ids = {
+            "user_id": db_user.id,
+            "category_id": db_category.id,
+            "task_id": first_task.id,
+            "task_ids": [db_task.id for db_task in db_tasks],
+            "list_id": first_list.id,
+            "list_ids": [
+                db_list.id
+                for db_task in db_tasks
+                for db_list in db_task.description_lists
+            ],
+            "description_id": first_list.descriptions[0].id,
+            "description_ids": [
+                db_description.id
+                for db_list in first_task.description_lists
+                for db_description in db_list.descriptions
+            ],
+            "template_id": db_template.id,
+            "template_list_id": db_template.description_lists[0].id,
+        }
+
+    task_category_registry.bump_version()
+    shared_cache.clear()
+    token = create_access_token(data={"sub": "budget"})
+    ids["headers"] = {"Authorization": f"Bearer {token}"}
+    return ids
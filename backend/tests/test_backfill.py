@@ -0,0 +1,104 @@
+from sqlalchemy import func, inspect, select, update
+
+from backend.api import models
+from backend.api.src.config import backfill
+from backend.api.src.config.database import SessionLocal, engine
+
+from test_ownership import mismatched_children
+
+
+def clear_user_ids():
+    with SessionLocal() as db:
+        for model in [
+            models.BBR_Tag,
+            models.BBR_TaskDescriptionList,
+            models.BBR_TaskDescription,
+        ]:
+            db.execute(update(model).values(user_id=None))
+        db.commit()
+
+
+def run(name, **options):
+    with engine.connect() as connection:
+        return backfill.run(
+            connection, backfill.BACKFILLS[name], sleep=0, **options
+        )
+
+
+def test_backfill_in_batches_and_resume(routine):
+    clear_user_ids()
+    name = "BBR_taskdescriptions.user_id"
+    for child in ["BBR_tags.user_id", "BBR_taskdescriptionlists.user_id"]:
+        run(child, restart=True)
+
+    progress = run(name, batch_size=7, restart=True)
+    assert progress.rows == 21 * 3 * 5
+    assert mismatched_children() == []
+
+    # The finished backfill forgot its checkpoint, a rerun has no work
+    with SessionLocal() as db:
+        assert (
+            db.scalar(
+                select(backfill.checkpoints.c.name).where(
+                    backfill.checkpoints.c.name == name
+                )
+            )
+            is None
+        )
+    # A rerun goes over the table again, only template rows are still empty
+    with SessionLocal() as db:
+        empty = db.scalar(
+            select(func.count()).where(
+                models.BBR_TaskDescription.user_id.is_(None)
+            )
+        )
+    assert run(name).rows == empty
+    assert mismatched_children() == []
+
+
+def test_backfill_again_after_downgrade(routine):
+    # Downgrade drops the column, upgrade adds it back empty
+    for name in [
+        "BBR_tags.user_id",
+        "BBR_taskdescriptionlists.user_id",
+        "BBR_taskdescriptions.user_id",
+    ]:
+        run(name, restart=True)
+    clear_user_ids()
+    assert run("BBR_tags.user_id").rows > 0
+    assert run("BBR_taskdescriptionlists.user_id").rows == 21 * 3
+    assert run("BBR_taskdescriptions.user_id").rows == 21 * 3 * 5
+    assert mismatched_children() == []
+
+
+def test_create_index(routine):
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        for _ in range(2):
+            backfill.create_index(
+                connection,
+                "ix_BBR_tasks_title_sort_order",
+                "BBR_tasks",
+                ["title", "sort_order"],
+            )
+    assert "ix_BBR_tasks_title_sort_order" in {
+        index["name"] for index in inspect(engine).get_indexes("BBR_tasks")
+    }
+
+
+def test_create_partial_index(routine):
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        backfill.create_index(
+            connection,
+            "ix_BBR_tasks_title_active",
+            "BBR_tasks",
+            ["title"],
+            where="is_active" if postgres else "is_active = 1",
+        )
+    assert "ix_BBR_tasks_title_active" in {
+        index["name"] for index in inspect(engine).get_indexes("BBR_tasks")
+    }
@@ -0,0 +1,58 @@
+from backend.api.src.routes.utils.cache import MemoryBackend, SharedCache
+
+
+def test_invalidation_reaches_other_workers():
+    # Two workers on one backend, as with a shared CACHE_URL
+    backend = MemoryBackend()
+    worker_a = SharedCache(backend)
+    worker_b = SharedCache(backend)
+    worker_b.local_seconds = 60
+    for worker in (worker_a, worker_b):
+        worker.start()
+    invalidated = []
+    worker_b.on_invalidate("taskcategories", lambda: invalidated.append(1))
+
+    value, version = worker_b.get("summary:1")
+    assert value is None
+    worker_b.set("summary:1", version, {"tasks": 1})
+    assert worker_b.get("summary:1")[0] == {"tasks": 1}
+    assert worker_b.get("summary:1")[0] == {"tasks": 1}
+
+    # A read that started before the write cannot store over it
+    _, stale_version = worker_a.get("summary:1")
+    worker_a.invalidate("summary:1", "taskcategories")
+    worker_a.set("summary:1", stale_version, {"tasks": 1})
+    assert worker_b.get("summary:1")[0] is None
+    assert invalidated == [1]
+
+    metrics = worker_b.snapshot()
+    assert metrics["hits"] == 1
+    assert metrics["local_hits"] == 1
+    assert metrics["misses"] == 2
+    assert metrics["invalidations_received"] == 1
+    assert "invalidation_latency_ms" in metrics
+
+
+def test_summary_and_user_cached_until_write(
+    client, routine, statement_recorder
+):
+    headers = routine["headers"]
+    summary = client.get("/api/tasks/user-tasks/summary", headers=headers)
+    statement_recorder.active = True
+    cached = client.get("/api/tasks/user-tasks/summary", headers=headers)
+    statement_recorder.active = False
+    assert cached.json() == summary.json()
+    assert statement_recorder.statements == []
+
+    client.post(
+        f"/api/descriptionlists/{routine['list_id']}/descriptions",
+        json={
+            "description": "Hold 30 s",
+            "description_list_id": routine["list_id"],
+        },
+        headers=headers,
+    )
+    summary = client.get(
+        "/api/tasks/user-tasks/summary", headers=headers
+    ).json()
+    assert summary["descriptions"] == cached.json()["descriptions"] + 1
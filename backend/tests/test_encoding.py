@@ -0,0 +1,29 @@
+from backend.api.src.routes.utils import encoding
+
+
+def test_large_bodies_are_encoded_off_the_event_loop(
+    client, routine, monkeypatch
+):
+    offloaded = []
+    run_in_threadpool = encoding.run_in_threadpool
+
+    async def recording_run_in_threadpool(func, *args):
+        offloaded.append(func)
+        return await run_in_threadpool(func, *args)
+
+    monkeypatch.setattr(
+        encoding, "run_in_threadpool", recording_run_in_threadpool
+    )
+    headers = {**routine["headers"], "Accept-Encoding": "gzip"}
+
+    response = client.get("/api/tasks/user-tasks", headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == len(routine["task_ids"])
+    assert offloaded == [encoding.negotiate_response]
+
+    # Below COMPRESSION_MIN_BYTES the body is sent as it is, in the loop
+    response = client.get(
+        "/api/tasks/user-tasks?fields=title&limit=1", headers=headers
+    )
+    assert "content-encoding" not in response.headers
+    assert offloaded == [encoding.negotiate_response]
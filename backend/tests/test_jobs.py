@@ -0,0 +1,89 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.jobs import runner as runner_module
+from backend.api.src.routes.jobs.controller import (
+    claim_job,
+    create_job,
+    get_job_by_id,
+    requeue_stale_jobs,
+    update_job,
+)
+from backend.api.src.routes.jobs.handlers import copy_task_job
+from backend.api.src.routes.jobs.runner import JobRunner
+
+
+def count_tasks(user_id):
+    with SessionLocal() as db:
+        return db.scalar(
+            select(func.count()).where(models.BBR_Task.user_id == user_id)
+        )
+
+
+def test_failed_copy_leaves_no_task(routine):
+    def crash(progress):
+        raise RuntimeError("worker died")
+
+    before = count_tasks(routine["user_id"])
+    payload = {
+        "task_id": routine["template_id"],
+        "user_id": routine["user_id"],
+    }
+    with SessionLocal() as db, pytest.raises(RuntimeError):
+        copy_task_job(db, payload, crash)
+    assert count_tasks(routine["user_id"]) == before
+
+    with SessionLocal() as db:
+        result = copy_task_job(db, payload, lambda progress: None)
+    assert count_tasks(routine["user_id"]) == before + 1
+    with SessionLocal() as db:
+        copied = db.get(models.BBR_Task, result["task_id"])
+        assert copied.sort_order == copied.id * 100
+        assert len(copied.description_lists) == 3
+
+
+def test_requeue_stale_jobs(routine):
+    with SessionLocal() as db:
+        stale = create_job(db, "copy_task", {})
+        running = create_job(db, "copy_task", {})
+        update_job(
+            db,
+            stale.id,
+            status="running",
+            updated_at=datetime.now(timezone.utc) - timedelta(hours=1),
+        )
+        update_job(db, running.id, status="running")
+
+        assert requeue_stale_jobs(db, 600) == [stale.id]
+        db.expire_all()
+        assert get_job_by_id(db, stale.id).status == "queued"
+        assert get_job_by_id(db, running.id).status == "running"
+
+
+def test_heartbeat_keeps_long_job_running(routine, monkeypatch):
+    monkeypatch.setattr(runner_module, "JOB_HEARTBEAT_SECONDS", 0.05)
+
+    def slow(db, payload, report_progress):
+        # One long step without progress reports
+        time.sleep(0.5)
+        with SessionLocal() as other:
+            return {"requeued": requeue_stale_jobs(other, 0.3)}
+
+    runner = JobRunner()
+    runner.register("slow", slow)
+    with SessionLocal() as db:
+        db_job = create_job(db, "slow", {})
+        assert claim_job(db, db_job.id)
+        db_job = get_job_by_id(db, db_job.id)
+        db.expunge(db_job)
+    runner._execute(db_job)
+
+    with SessionLocal() as db:
+        db_job = get_job_by_id(db, db_job.id)
+        assert db_job.status == "succeeded"
+        assert db_job.result == {"requeued": []}
@@ -0,0 +1,70 @@
+from backend.api.src.routes.mutations import controller
+
+
+def mutate(client, routine, *operations):
+    return client.post(
+        "/api/mutations",
+        json={"operations": list(operations)},
+        headers=routine["headers"],
+    )
+
+
+def test_null_for_required_field(client, routine):
+    response = mutate(
+        client,
+        routine,
+        {
+            "op": "update",
+            "type": "task",
+            "id": routine["task_id"],
+            "data": {"title": None},
+        },
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Operation 0: title cannot be null"
+
+    # sort_order is nullable
+    response = mutate(
+        client,
+        routine,
+        {
+            "op": "update",
+            "type": "task",
+            "id": routine["task_id"],
+            "data": {"sort_order": None},
+        },
+    )
+    assert response.status_code == 200
+
+
+def test_constraint_failure_rejects_batch(client, routine, monkeypatch):
+    # A category deleted after the registry last saw it
+    monkeypatch.setattr(
+        controller.task_category_registry, "exists", lambda id: True
+    )
+    response = mutate(
+        client,
+        routine,
+        {
+            "op": "create",
+            "type": "task",
+            "data": {
+                "title": "Not kept",
+                "task_category_id": routine["category_id"],
+            },
+        },
+        {
+            "op": "create",
+            "type": "task",
+            "data": {"title": "New", "task_category_id": 999999},
+        },
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Database constraint failed")
+    titles = [
+        task["title"]
+        for task in client.get(
+            "/api/tasks/user-tasks?fields=title", headers=routine["headers"]
+        ).json()
+    ]
+    assert "Not kept" not in titles
@@ -0,0 +1,113 @@
+from sqlalchemy import select
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+
+from test_statement_budget import MUTATIONS, resolve
+
+
+def mismatched_children():
+    # Children whose user_id is not their task's
+    task = models.BBR_Task
+    description_list = models.BBR_TaskDescriptionList
+    description = models.BBR_TaskDescription
+    with SessionLocal() as db:
+        tags = db.scalars(
+            select(models.BBR_Tag.id)
+            .join(task, task.id == models.BBR_Tag.task_id)
+            .where(models.BBR_Tag.user_id.is_distinct_from(task.user_id))
+        ).all()
+        lists = db.scalars(
+            select(description_list.id)
+            .join(task, task.id == description_list.task_id)
+            .where(description_list.user_id.is_distinct_from(task.user_id))
+        ).all()
+        descriptions = db.scalars(
+            select(description.id)
+            .join(
+                description_list,
+                description_list.id == description.description_list_id,
+            )
+            .join(task, task.id == description_list.task_id)
+            .where(description.user_id.is_distinct_from(task.user_id))
+        ).all()
+    return tags + lists + descriptions
+
+
+def test_children_carry_task_user(client, routine):
+    headers = routine["headers"]
+    writes = [
+        ("/api/tasks/user-tasks/{template_id}/copy", None),
+        (
+            "/api/tasks/{task_id}/descriptionlists",
+            {"title": "New list", "task_id": "task_id"},
+        ),
+        (
+            "/api/descriptionlists/{list_id}/descriptions",
+            {"description": "New step", "description_list_id": "list_id"},
+        ),
+        ("/api/mutations", {"operations": MUTATIONS}),
+    ]
+    for path, body in writes:
+        response = client.post(
+            path.format(**routine),
+            json=resolve(body, routine),
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+
+    assert mismatched_children() == []
+    with SessionLocal() as db:
+        assert db.scalar(
+            select(models.BBR_TaskDescription.id).where(
+                models.BBR_TaskDescription.user_id == routine["user_id"]
+            )
+        )
+
+
+def test_moved_children_take_new_task_user(client, routine):
+    headers = routine["headers"]
+    template = client.get(
+        f"/api/tasks/{routine['template_id']}/descriptionlists/nulluser",
+        headers=headers,
+    ).json()
+    with SessionLocal() as db:
+        # By foreign key and by collection, into template rows
+        tag = db.scalars(
+            select(models.BBR_Tag).where(
+                models.BBR_Tag.task_id == routine["task_id"]
+            )
+        ).first()
+        tag.task_id = routine["template_id"]
+        db_list = db.get(models.BBR_TaskDescriptionList, routine["list_id"])
+        db_template = db.get(models.BBR_Task, routine["template_id"])
+        db_template.description_lists.append(db_list)
+        db.commit()
+        assert (tag.user_id, db_list.user_id) == (None, None)
+
+    description = {
+        "id": routine["description_ids"][-1],
+        "description": "Moved",
+        "description_list_id": template[0]["id"],
+    }
+    response = client.post(
+        f"/api/descriptions/{description['id']}/update",
+        json=description,
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    with SessionLocal() as db:
+        moved = db.get(models.BBR_TaskDescription, description["id"])
+        assert moved.user_id is None
+        tombstones = db.execute(
+            select(models.BBR_Tombstone.entity, models.BBR_Tombstone.entity_id)
+            .where(models.BBR_Tombstone.user_id == routine["user_id"])
+            .order_by(models.BBR_Tombstone.id)
+        ).all()
+    assert tombstones == [
+        ("tag", tag.id),
+        ("description_list", routine["list_id"]),
+        *(("description", id) for id in routine["description_ids"][:5]),
+        ("description", description["id"]),
+    ]
+    assert mismatched_children() == []
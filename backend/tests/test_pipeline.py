@@ -0,0 +1,137 @@
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal, engine
+from backend.api.src.routes.utils import pipeline
+
+
+def test_write_is_one_statement():
+    values = pipeline.written_values(
+        {
+            "description": "Hold 30 s",
+            "description_list_id": 1,
+            "user_id": pipeline.parent_user_id(
+                models.BBR_TaskDescriptionList, 1
+            ),
+        }
+    )
+    statement = pipeline._notifying(
+        insert(models.BBR_TaskDescription).values(**values),
+        models.BBR_TaskDescription,
+        "create",
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.count("INSERT INTO") == 1
+    assert "RETURNING" in sql
+    assert "pg_current_xact_id()" in sql
+    assert "pg_advisory" not in sql
+    assert "pg_notify" in sql
+
+
+def test_orm_writes_off_postgres(client, routine, monkeypatch):
+    monkeypatch.setattr(pipeline, "PIPELINE_WRITES", True)
+    response = client.post(
+        f"/api/descriptionlists/{routine['list_id']}/descriptions",
+        json={
+            "description": "Hold 30 s",
+            "description_list_id": routine["list_id"],
+        },
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200
+    assert response.json()["description"] == "Hold 30 s"
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="pipelined writes"
+)
+def test_pipelined_writes(client, routine, monkeypatch):
+    # Repeated writes reuse the statement prepared by the first on psycopg 3
+    monkeypatch.setattr(pipeline, "PIPELINE_WRITES", True)
+    created = []
+    for n in range(10):
+        response = client.post(
+            f"/api/descriptionlists/{routine['list_id']}/descriptions",
+            json={
+                "description": f"Step {n}",
+                "description_list_id": routine["list_id"],
+            },
+            headers=routine["headers"],
+        )
+        assert response.status_code == 200, response.text
+        created.append(response.json()["id"])
+    response = client.post(
+        f"/api/descriptions/{created[0]}/update",
+        json={
+            "id": created[0],
+            "description": "Edited",
+            "description_list_id": routine["list_id"],
+        },
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(
+                models.BBR_TaskDescription.description,
+                models.BBR_TaskDescription.user_id,
+                models.BBR_TaskDescription.version,
+            )
+            .where(models.BBR_TaskDescription.id.in_(created))
+            .order_by(models.BBR_TaskDescription.id)
+        ).all()
+    assert [description for description, _, _ in rows] == [
+        "Edited",
+        *(f"Step {n}" for n in range(1, 10)),
+    ]
+    assert {user_id for _, user_id, _ in rows} == {routine["user_id"]}
+    versions = [version for _, _, version in rows]
+    assert versions[1:] == sorted(versions[1:])
+    assert versions[0] > versions[-1]
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="pipelined writes"
+)
+def test_failed_pipelined_write_rolls_back(routine):
+    values = pipeline.written_values(
+        {"description": "Orphan", "description_list_id": 0, "user_id": None}
+    )
+    with SessionLocal() as db:
+        with pytest.raises(Exception):
+            pipeline.write_returning(
+                db,
+                insert(models.BBR_TaskDescription).values(**values),
+                models.BBR_TaskDescription,
+                "create",
+            )
+        # The session and its connection are usable again
+        assert (
+            db.scalar(
+                select(models.BBR_TaskDescription.id).where(
+                    models.BBR_TaskDescription.description == "Orphan"
+                )
+            )
+            is None
+        )
+        driver_connection = db.connection().connection.driver_connection
+        assert not driver_connection.autocommit
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="pipelined writes"
+)
+def test_orm_work_writes_through_orm(routine, monkeypatch):
+    monkeypatch.setattr(pipeline, "PIPELINE_WRITES", True)
+    with SessionLocal() as db:
+        assert pipeline.pipelined_writes(db)
+        db.add(models.BBR_Tag(title="pending", task_id=routine["task_id"]))
+        assert not pipeline.pipelined_writes(db)
+        # Flushed rows would commit with the pipelined COMMIT
+        db.flush()
+        assert not pipeline.pipelined_writes(db)
+        db.commit()
+        assert pipeline.pipelined_writes(db)
@@ -0,0 +1,60 @@
+import pytest
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.tasks.controller import (
+    task_sparse_model,
+    task_tree_options,
+)
+from backend.api.src.routes.tasks.schemas import Task
+from backend.api.src.routes.utils.projection import load_records
+from backend.api.src.routes.utils.sparse import parse_sparse
+
+
+def orm_tasks(user_id):
+    with SessionLocal() as db:
+        db_tasks = (
+            db.query(models.BBR_Task)
+            .filter(models.BBR_Task.user_id == user_id)
+            .options(*task_tree_options)
+            .order_by(models.BBR_Task.sort_order)
+            .all()
+        )
+        return [
+            Task.model_validate(db_task).model_dump(mode="json")
+            for db_task in db_tasks
+        ]
+
+
+def test_records_match_orm(client, routine):
+    response = client.get("/api/tasks/user-tasks", headers=routine["headers"])
+    assert response.json() == orm_tasks(routine["user_id"])
+
+    response = client.post(
+        "/api/tasks/user/batch",
+        json={"ids": routine["task_ids"][::-1]},
+        headers=routine["headers"],
+    )
+    assert response.json()["items"] == orm_tasks(routine["user_id"])[::-1]
+
+
+def test_sparse_records(client, routine):
+    response = client.get(
+        "/api/tasks/user-tasks?fields=title&expand=tags",
+        headers=routine["headers"],
+    )
+    task = response.json()[0]
+    assert set(task) == {"id", "title", "tags"}
+    assert set(task["tags"][0]) == {"id", "title", "task_id"}
+
+    with SessionLocal() as db:
+        (record, *_) = load_records(
+            db,
+            task_sparse_model,
+            parse_sparse(task_sparse_model, "title", None),
+            models.BBR_Task.user_id == routine["user_id"],
+        )
+        assert record.title == "Task 0"
+        assert db.identity_map.keys() == set()
+    with pytest.raises(AttributeError):
+        record.description_lists
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from backend.api.src.config.database import engine
+from backend.api.src.config.slow_queries import SlowQueryLog, normalize_sql
+
+
+def test_normalize_sql():
+    assert (
+        normalize_sql(
+            "SELECT * FROM t WHERE id IN (?, ?, ?)\n AND title = 'a''b' LIMIT 10"
+        )
+        == "SELECT * FROM t WHERE id IN (...) AND title = ? LIMIT ?"
+    )
+
+
+def test_explaining_is_per_execution():
+    # One pooled DBAPI connection, so every checkout shares its info dict
+    log = SlowQueryLog(0.000001, 10, explain=False)
+    sqlite = create_engine("sqlite://", poolclass=StaticPool)
+    log.attach(sqlite)
+
+    with sqlite.connect().execution_options(explaining=True) as conn:
+        conn.execute(text("SELECT 1"))
+    assert log.recorded == 0
+
+    with sqlite.connect() as conn:
+        conn.execute(text("SELECT 2"))
+    assert [entry["sql"] for entry in log.entries] == ["SELECT ?"]
+    assert log.entries[0]["origin"] is None
+
+
+def test_failed_statement_leaves_no_timing():
+    log = SlowQueryLog(0.000001, 10, explain=False)
+    sqlite = create_engine("sqlite://", poolclass=StaticPool)
+    log.attach(sqlite)
+
+    with sqlite.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+        assert "query_started" not in conn.info
+    assert [entry["sql"] for entry in log.entries] == ["SELECT ?"]
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="EXPLAIN ANALYZE is Postgres"
+)
+def test_explain_plan(routine):
+    log = SlowQueryLog(0.000001, 10)
+    entry = {"plan": None}
+    log._explain(
+        engine,
+        'SELECT id FROM "BBR_tasks" WHERE user_id = %(user_id)s',
+        {"user_id": routine["user_id"]},
+        entry,
+    )
+    assert "Execution Time" in entry["plan"]
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="EXPLAIN ANALYZE is Postgres"
+)
+def test_volatile_statements_are_not_analyzed(routine):
+    log = SlowQueryLog(0.000001, 10)
+    entry = {"plan": None}
+    log._explain(
+        engine,
+        'SELECT id FROM "BBR_tasks" WHERE user_id = %(user_id)s FOR UPDATE',
+        {"user_id": routine["user_id"]},
+        entry,
+    )
+    assert "LockRows" in entry["plan"]
+    assert "Execution Time" not in entry["plan"]
@@ -0,0 +1,206 @@
+import pytest
+
+# (method, path, json body, max statements, max ORM rows) at the data scale
+# in conftest. Paths are formatted with the ids of the seeded routine.
+# Authenticated requests spend one statement on the current user lookup,
+# the cache is empty at the start of every test.
+# Budgets are measured on sqlite. Postgres batches multi-row INSERTs, so it
+# stays at or below them, its pg_notify statements are not counted. New
+# lists and descriptions spend one statement copying their parent's user_id
+# when the parent is not loaded. Every flush that writes routine rows takes
+# one sync version, deletes also insert a tombstone. Sync looks up the
+# user's copy-on-write tasks, and its watermark on Postgres. Task list
+# endpoints and the current user are read-only records, not ORM rows.
+READ_ENDPOINTS = [
+    ("GET", "/api/tasks", None, 4, 0),
+    ("GET", "/api/tasks/user-tasks", None, 5, 1),
+    ("GET", "/api/tasks/user-tasks?fields=title", None, 2, 1),
+    (
+        "GET",
+        "/api/tasks/user-tasks?expand=description_lists.descriptions",
+        None,
+        4,
+        1,
+    ),
+    ("POST", "/api/tasks/{task_id}/user", None, 5, 21),
+    ("POST", "/api/tasks/{template_id}/nulluser", None, 4, 20),
+    ("POST", "/api/tasks/user/batch", {"ids": "task_ids"}, 5, 1),
+    ("GET", "/api/tasks/user-tasks/summary", None, 2, 1),
+    ("GET", "/api/sync", None, 7, 401),
+    ("GET", "/api/sync?since=1000000", None, 8, 1),
+    ("GET", "/api/tasks/{task_id}/descriptionlists/user", None, 4, 20),
+    ("GET", "/api/tasks/{template_id}/descriptionlists/nulluser", None, 3, 19),
+    ("GET", "/api/descriptionlists/{list_id}/user", None, 3, 7),
+    ("GET", "/api/descriptionlists/{template_list_id}/nulluser", None, 3, 7),
+    ("POST", "/api/descriptionlists/user/batch", {"ids": "list_ids"}, 3, 361),
+    ("GET", "/api/descriptionlists/{list_id}/descriptions/user", None, 3, 8),
+    (
+        "GET",
+        "/api/descriptionlists/{template_list_id}/descriptions/nulluser",
+        None,
+        2,
+        7,
+    ),
+    (
+        "POST",
+        "/api/descriptions/user/batch",
+        {"ids": "description_ids"},
+        2,
+        16,
+    ),
+    ("GET", "/api/tasks/user-tasks?tag=tag 0", None, 5, 0),
+    ("GET", "/api/tasks/user-tasks?is_active=false", None, 2, 0),
+    (
+        "GET",
+        "/api/tasks/user-tasks?task_category_id={category_id}"
+        "&title_prefix=task 1",
+        None,
+        5,
+        0,
+    ),
+    ("GET", "/api/tasks?is_active=true&title_prefix=task", None, 4, 0),
+    ("GET", "/api/tags/user", None, 2, 20),
+    ("GET", "/api/tags/user/facets", None, 2, 0),
+    ("GET", "/api/taskcategories", None, 1, 1),
+    ("POST", "/api/taskcategories/{category_id}", None, 1, 1),
+]
+
+# An offline client's replay: a new task with two lists of five steps,
+# plus edits to the seeded routine
+MUTATIONS = [
+    {
+        "op": "create",
+        "type": "task",
+        "temp_id": "new task",
+        "data": {"title": "Offline", "task_category_id": "category_id"},
+    },
+    *(
+        {
+            "op": "create",
+            "type": "description_list",
+            "temp_id": f"new list {index}",
+            "data": {"title": f"List {index}", "task_id": "new task"},
+        }
+        for index in range(2)
+    ),
+    *(
+        {
+            "op": "create",
+            "type": "description",
+            "data": {
+                "description": f"Step {index}",
+                "description_list_id": f"new list {index % 2}",
+            },
+        }
+        for index in range(10)
+    ),
+    {
+        "op": "update",
+        "type": "task",
+        "id": "task_id",
+        "data": {"title": "Edit"},
+    },
+    {
+        "op": "update",
+        "type": "description",
+        "id": "description_id",
+        "data": {"description": "Edited"},
+    },
+    {"op": "delete", "type": "description_list", "id": "list_id"},
+]
+
+WRITE_ENDPOINTS = [
+    (
+        "POST",
+        "/api/tasks",
+        {"title": "New", "task_category_id": "category_id", "is_active": True},
+        10,
+        2,
+    ),
+    (
+        "POST",
+        "/api/tasks/{task_id}/descriptionlists",
+        {"title": "New list", "task_id": "task_id"},
+        6,
+        2,
+    ),
+    (
+        "POST",
+        "/api/descriptionlists/{list_id}/descriptions",
+        {"description": "New step", "description_list_id": "list_id"},
+        5,
+        2,
+    ),
+    (
+        "POST",
+        "/api/descriptionlists/{list_id}/update",
+        {"id": "list_id", "title": "Renamed", "task_id": "task_id"},
+        7,
+        7,
+    ),
+    (
+        "POST",
+        "/api/mutations",
+        {"operations": MUTATIONS},
+        26,
+        5,
+    ),
+    ("POST", "/api/tags", {"title": "New", "task_id": "task_id"}, 7, 1),
+    ("POST", "/api/descriptions/{description_id}/delete", None, 5, 2),
+    ("POST", "/api/descriptionlists/{list_id}/delete", None, 5, 2),
+    ("POST", "/api/tasks/user-tasks/{task_id}/delete", None, 5, 2),
+    ("POST", "/api/tasks/user-tasks/{template_id}/copy", None, 46, 60),
+    (
+        "POST",
+        "/api/tasks/user-tasks/{template_id}/copy?copy_on_write=true",
+        None,
+        29,
+        60,
+    ),
+]
+
+ENDPOINTS = READ_ENDPOINTS + WRITE_ENDPOINTS
+
+
+def resolve(value, routine):
+    # Body values naming a routine key are replaced with its id(s)
+    if isinstance(value, dict):
+        return {key: resolve(item, routine) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, routine) for item in value]
+    if isinstance(value, str) and value in routine:
+        return routine[value]
+    return value
+
+
+@pytest.mark.parametrize(
+    "method, path, body, max_statements, max_rows",
+    ENDPOINTS,
+    ids=[f"{method} {path}" for method, path, *_ in ENDPOINTS],
+)
+def test_endpoint_statement_budget(
+    client,
+    routine,
+    statement_budget,
+    method,
+    path,
+    body,
+    max_statements,
+    max_rows,
+):
+    with statement_budget(max_statements, max_rows):
+        response = client.request(
+            method,
+            path.format(**routine),
+            json=resolve(body, routine),
+            headers=routine["headers"],
+        )
+    assert response.status_code == 200, response.text
+
+
+def test_budget_failure_lists_statements(client, routine, statement_budget):
+    with pytest.raises(pytest.fail.Exception) as failure:
+        with statement_budget(max_statements=0):
+            client.get("/api/tasks/user-tasks", headers=routine["headers"])
+    assert "Budget exceeded" in str(failure.value)
+    assert "BBR_tasks" in str(failure.value)
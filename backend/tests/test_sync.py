@@ -0,0 +1,40 @@
+import pytest
+
+from backend.api.src.config.database import SessionLocal, engine
+from backend.api.src.routes.sync.controller import next_sync_version
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="transaction id versions"
+)
+def test_sync_waits_for_running_writers(client, routine):
+    since = client.get("/api/sync", headers=routine["headers"]).json()[
+        "version"
+    ]
+    running = SessionLocal()
+    running_version = next_sync_version(running)
+
+    # Commits without waiting for the running transaction
+    response = client.post(
+        "/api/tags",
+        json={"title": "later", "task_id": routine["task_id"]},
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+    tag_id = response.json()["id"]
+
+    def sync():
+        return client.get(
+            f"/api/sync?since={since}", headers=routine["headers"]
+        ).json()
+
+    # The running transaction may still commit a lower version
+    changes = sync()
+    assert changes["tags"] == []
+    assert since <= changes["version"] < running_version
+
+    running.commit()
+    running.close()
+    changes = sync()
+    assert [tag["id"] for tag in changes["tags"]] == [tag_id]
+    assert changes["version"] >= running_version
@@ -0,0 +1,64 @@
+def test_tag_crud(client, routine):
+    headers = routine["headers"]
+    task_id = routine["task_id"]
+    created = client.post(
+        "/api/tags",
+        json={"title": "morning", "task_id": task_id},
+        headers=headers,
+    )
+    assert created.status_code == 200
+    tag = created.json()
+
+    duplicate = client.post(
+        "/api/tags",
+        json={"title": "morning", "task_id": task_id},
+        headers=headers,
+    )
+    assert duplicate.status_code == 400
+    template = client.post(
+        "/api/tags",
+        json={"title": "morning", "task_id": routine["template_id"]},
+        headers=headers,
+    )
+    assert template.status_code == 400
+
+    updated = client.post(
+        f"/api/tags/{tag['id']}/update",
+        json={"title": "evening", "task_id": task_id},
+        headers=headers,
+    )
+    assert updated.json() == {**tag, "title": "evening"}
+
+    titles = [
+        tag["title"]
+        for tag in client.get("/api/tags/user", headers=headers).json()
+    ]
+    assert "evening" in titles
+
+    assert client.post(f"/api/tags/{tag['id']}/delete", headers=headers).json()
+    titles = [
+        tag["title"]
+        for tag in client.get("/api/tags/user", headers=headers).json()
+    ]
+    assert "evening" not in titles
+
+
+def test_filter_and_facets(client, routine):
+    headers = routine["headers"]
+    first, second = routine["task_ids"][:2]
+    for task_id in (first, second):
+        client.post(
+            "/api/tags",
+            json={"title": "stretch", "task_id": task_id},
+            headers=headers,
+        ).raise_for_status()
+
+    tasks = client.get(
+        "/api/tasks/user-tasks?tag=stretch&fields=title", headers=headers
+    ).json()
+    assert [task["id"] for task in tasks] == [first, second]
+
+    facets = client.get("/api/tags/user/facets", headers=headers).json()
+    assert facets[0] == {"title": "stretch", "tasks": 2}
+    assert {"title": "tag 0", "tasks": 1} in facets
+    assert len(facets) == len(routine["task_ids"]) + 1
@@ -0,0 +1,65 @@
+from sqlalchemy import update
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+
+
+def set_tasks(ids, **values):
+    with SessionLocal() as db:
+        db.execute(
+            update(models.BBR_Task)
+            .where(models.BBR_Task.id.in_(ids))
+            .values(**values)
+        )
+        db.commit()
+
+
+def task_ids(client, url, headers):
+    return [task["id"] for task in client.get(url, headers=headers).json()]
+
+
+def test_user_task_filters(client, routine):
+    headers = routine["headers"]
+    first, second, third, *rest = routine["task_ids"]
+    set_tasks([first, second], is_active=False)
+    with SessionLocal() as db:
+        category = models.BBR_TaskCategory(title="Strength")
+        db.add(category)
+        db.commit()
+        category_id = category.id
+    set_tasks([second, third], task_category_id=category_id)
+    set_tasks([third], title="Evening_stretch")
+
+    url = "/api/tasks/user-tasks?fields=title"
+    assert task_ids(client, f"{url}&is_active=false", headers) == [
+        first,
+        second,
+    ]
+    assert task_ids(client, f"{url}&is_active=true", headers) == [
+        third,
+        *rest,
+    ]
+    assert task_ids(
+        client, f"{url}&task_category_id={category_id}", headers
+    ) == [second, third]
+    assert task_ids(
+        client,
+        f"{url}&is_active=true&task_category_id={category_id}",
+        headers,
+    ) == [third]
+
+    # Case-insensitive, and _ matches itself only
+    assert task_ids(client, f"{url}&title_prefix=evening_", headers) == [third]
+    assert task_ids(client, f"{url}&title_prefix=Evening%25", headers) == []
+    set_tasks([first], title="EveningXstretch")
+    assert task_ids(client, f"{url}&title_prefix=evening_", headers) == [third]
+
+
+def test_template_filters(client, routine):
+    template_id = routine["template_id"]
+    assert task_ids(client, "/api/tasks?is_active=true", {}) == [template_id]
+    assert task_ids(client, "/api/tasks?is_active=false", {}) == []
+    assert task_ids(client, "/api/tasks?title_prefix=task", {}) == [
+        template_id
+    ]
+    assert task_ids(client, "/api/tasks?title_prefix=other", {}) == []
@@ -0,0 +1,330 @@
+from sqlalchemy import func, select
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.tasks.controller import delete_task
+
+
+def copy_on_write(client, routine):
+    response = client.post(
+        f"/api/tasks/user-tasks/{routine['template_id']}/copy"
+        "?copy_on_write=true",
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def count_rows(model, **filters):
+    with SessionLocal() as db:
+        return db.scalar(
+            select(func.count()).select_from(model).filter_by(**filters)
+        )
+
+
+def user_task(client, routine, task_id):
+    response = client.post(
+        f"/api/tasks/{task_id}/user", headers=routine["headers"]
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_copy_on_write_references_template(client, routine):
+    template = client.post(f"/api/tasks/{routine['template_id']}/nulluser")
+    template = template.json()
+    task = copy_on_write(client, routine)
+
+    assert task["template_id"] == routine["template_id"]
+    assert [
+        (db_list["id"], db_list["title"], db_list["task_id"])
+        for db_list in task["description_lists"]
+    ] == [
+        (db_list["id"], db_list["title"], task["id"])
+        for db_list in template["description_lists"]
+    ]
+    assert count_rows(models.BBR_TaskDescriptionList, task_id=task["id"]) == 0
+    assert len(task["tags"]) == len(template["tags"])
+
+    # A second copy of the same template is a full copy
+    second = copy_on_write(client, routine)
+    assert second["template_id"] is None
+    assert count_rows(
+        models.BBR_TaskDescriptionList, task_id=second["id"]
+    ) == len(template["description_lists"])
+
+
+def test_first_edit_copies_list(client, routine):
+    task = copy_on_write(client, routine)
+    template_list, other_list = task["description_lists"][:2]
+    template_description = template_list["descriptions"][0]
+
+    response = client.post(
+        f"/api/descriptions/{template_description['id']}/update",
+        json={**template_description, "description": "Edited"},
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+    edited = response.json()
+    assert edited["id"] != template_description["id"]
+
+    lists = user_task(client, routine, task["id"])["description_lists"]
+    assert [db_list["title"] for db_list in lists] == [
+        db_list["title"] for db_list in task["description_lists"]
+    ]
+    assert lists[0]["id"] != template_list["id"]
+    assert lists[0]["task_id"] == task["id"]
+    # Unordered relationship, Postgres returns updated rows last
+    copied = sorted(lists[0]["descriptions"], key=lambda d: d["id"])
+    assert [d["description"] for d in copied] == [
+        "Edited",
+        *(d["description"] for d in template_list["descriptions"][1:]),
+    ]
+    assert lists[1]["id"] == other_list["id"]
+
+    # The template itself is unchanged
+    with SessionLocal() as db:
+        db_description = db.get(
+            models.BBR_TaskDescription, template_description["id"]
+        )
+        assert db_description.description == "Step 0"
+
+    # A second edit through the template's id finds the same copy
+    second = template_list["descriptions"][1]
+    response = client.post(
+        f"/api/descriptions/{second['id']}/update",
+        json={**second, "description": "Edited again"},
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["description_list_id"] == lists[0]["id"]
+    assert (
+        count_rows(
+            models.BBR_TaskDescriptionList,
+            task_id=task["id"],
+        )
+        == 1
+    )
+
+
+def test_sync_shows_template_rows(client, routine):
+    task = copy_on_write(client, routine)
+    changes = client.get("/api/sync", headers=routine["headers"]).json()
+    template_lists = {
+        db_list["id"]: db_list
+        for db_list in changes["description_lists"]
+        if db_list["task_id"] == task["id"]
+    }
+    assert set(template_lists) == {
+        db_list["id"] for db_list in task["description_lists"]
+    }
+
+    template_list = task["description_lists"][0]
+    response = client.post(
+        f"/api/descriptionlists/{template_list['id']}/update",
+        json={**template_list, "title": "Renamed"},
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+    copy_id = response.json()["id"]
+
+    delta = client.get(
+        f"/api/sync?since={changes['version']}", headers=routine["headers"]
+    ).json()
+    assert {"description_list", template_list["id"]} <= {
+        value
+        for tombstone in delta["deleted"]
+        for value in (tombstone["entity"], tombstone["entity_id"])
+    }
+    assert [db_list["id"] for db_list in delta["description_lists"]] == [
+        copy_id
+    ]
+
+
+def test_delete_template_list_detaches_task(client, routine):
+    task = copy_on_write(client, routine)
+    removed, *kept = task["description_lists"]
+
+    response = client.post(
+        f"/api/descriptionlists/{removed['id']}/delete",
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+
+    task = user_task(client, routine, task["id"])
+    assert task["template_id"] is None
+    assert [db_list["title"] for db_list in task["description_lists"]] == [
+        db_list["title"] for db_list in kept
+    ]
+    assert (
+        count_rows(
+            models.BBR_TaskDescriptionList, task_id=routine["template_id"]
+        )
+        == len(kept) + 1
+    )
+
+
+def test_mutations_resolve_template_ids(client, routine):
+    task = copy_on_write(client, routine)
+    template_list = task["description_lists"][0]
+    response = client.post(
+        "/api/mutations",
+        json={
+            "operations": [
+                {
+                    "op": "update",
+                    "type": "description",
+                    "id": template_list["descriptions"][0]["id"],
+                    "data": {"description": "Edited"},
+                },
+                {
+                    "op": "create",
+                    "type": "description",
+                    "data": {
+                        "description": "Added",
+                        "description_list_id": template_list["id"],
+                    },
+                },
+            ]
+        },
+        headers=routine["headers"],
+    )
+    assert response.status_code == 200, response.text
+
+    lists = user_task(client, routine, task["id"])["description_lists"]
+    descriptions = [d["description"] for d in lists[0]["descriptions"]]
+    assert descriptions[0] == "Edited"
+    assert descriptions[-1] == "Added"
+    assert count_rows(models.BBR_TaskDescriptionList, task_id=task["id"]) == 1
+
+
+def test_summary_counts_template_rows(client, routine):
+    full = client.post(
+        f"/api/tasks/user-tasks/{routine['template_id']}/copy",
+        headers=routine["headers"],
+    ).json()
+    task = copy_on_write(client, routine)
+    summary = client.get(
+        "/api/tasks/user-tasks/summary", headers=routine["headers"]
+    ).json()
+    counts = {count["task_id"]: count for count in summary["task_counts"]}
+    assert (
+        counts[task["id"]]["description_lists"],
+        counts[task["id"]]["descriptions"],
+    ) == (
+        counts[full["id"]]["description_lists"],
+        counts[full["id"]]["descriptions"],
+    )
+
+
+def test_reads_by_template_ids(client, routine):
+    task = copy_on_write(client, routine)
+    template_list = task["description_lists"][0]
+    headers = routine["headers"]
+
+    lists = client.post(
+        "/api/descriptionlists/user/batch",
+        json={"ids": [template_list["id"]]},
+        headers=headers,
+    ).json()
+    assert [db_list["task_id"] for db_list in lists["items"]] == [task["id"]]
+
+    description_ids = [d["id"] for d in template_list["descriptions"]]
+    descriptions = client.post(
+        "/api/descriptions/user/batch",
+        json={"ids": description_ids},
+        headers=headers,
+    ).json()
+    assert descriptions["missing"] == []
+
+    response = client.get(
+        f"/api/descriptionlists/{template_list['id']}/descriptions/user",
+        headers=headers,
+    )
+    assert [d["id"] for d in response.json()] == description_ids
+
+    response = client.get(
+        f"/api/tasks/{task['id']}/descriptionlists/user?fields=title",
+        headers=headers,
+    )
+    assert [db_list["title"] for db_list in response.json()] == [
+        db_list["title"] for db_list in task["description_lists"]
+    ]
+
+
+def test_template_rows_are_read_only(client, routine):
+    # Without a copy-on-write task the user has nothing to copy into
+    template = client.post(
+        f"/api/tasks/{routine['template_id']}/nulluser"
+    ).json()
+    template_list = template["description_lists"][0]
+    template_description = template_list["descriptions"][0]
+    headers = routine["headers"]
+    for path, body in [
+        (f"/api/tasks/{template['id']}/update", template),
+        (
+            f"/api/tasks/{template['id']}/descriptionlists",
+            {"title": "Added", "task_id": template["id"]},
+        ),
+        (
+            f"/api/descriptionlists/{template_list['id']}/update",
+            {**template_list, "title": "Renamed"},
+        ),
+        (f"/api/descriptionlists/{template_list['id']}/delete", None),
+        (
+            f"/api/descriptionlists/{template_list['id']}/descriptions",
+            {"description": "Added", "description_list_id": 0},
+        ),
+        (
+            f"/api/descriptions/{template_description['id']}/update",
+            {**template_description, "description": "Edited"},
+        ),
+        (f"/api/descriptions/{template_description['id']}/delete", None),
+    ]:
+        response = client.post(path, json=body, headers=headers)
+        assert response.status_code == 400, path
+        assert response.json()["detail"] == "Templates cannot be changed"
+
+    assert (
+        client.post(f"/api/tasks/{routine['template_id']}/nulluser").json()
+        == template
+    )
+
+
+def test_sync_drops_deleted_template_rows(client, routine):
+    task = copy_on_write(client, routine)
+    changes = client.get("/api/sync", headers=routine["headers"]).json()
+    template_list, other_list = task["description_lists"][:2]
+    description = other_list["descriptions"][0]
+
+    # Templates are maintained outside the user routes
+    with SessionLocal() as db:
+        db.delete(db.get(models.BBR_TaskDescriptionList, template_list["id"]))
+        db.delete(db.get(models.BBR_TaskDescription, description["id"]))
+        db.commit()
+
+    delta = client.get(
+        f"/api/sync?since={changes['version']}", headers=routine["headers"]
+    ).json()
+    assert {
+        (tombstone["entity"], tombstone["entity_id"])
+        for tombstone in delta["deleted"]
+    } >= {
+        ("description_list", template_list["id"]),
+        ("description", description["id"]),
+    }
+
+
+def test_delete_template_detaches_adopters(client, routine):
+    task = copy_on_write(client, routine)
+    with SessionLocal() as db:
+        delete_task(db, db.get(models.BBR_Task, routine["template_id"]))
+
+    copied = user_task(client, routine, task["id"])
+    assert copied["template_id"] is None
+    assert [db_list["title"] for db_list in copied["description_lists"]] == [
+        db_list["title"] for db_list in task["description_lists"]
+    ]
+    assert count_rows(
+        models.BBR_TaskDescriptionList, task_id=task["id"]
+    ) == len(task["description_lists"])
@@ -0,0 +1,34 @@
+from sqlalchemy import select
+
+from backend.api import models
+from backend.api.src.config.database import SessionLocal
+from backend.api.src.routes.users import main as users_main
+from backend.api.src.routes.users.controller import count_user_rows
+
+from conftest import DESCRIPTIONS_PER_LIST, LISTS_PER_TASK, TASKS
+
+
+def test_count_user_rows_stops_at_limit(routine):
+    total = TASKS * (1 + LISTS_PER_TASK * (1 + DESCRIPTIONS_PER_LIST))
+    with SessionLocal() as db:
+        assert count_user_rows(db, routine["user_id"], 10) == 10
+        assert count_user_rows(db, routine["user_id"], total + 1) == total
+        assert count_user_rows(db, 0, 10) == 0
+
+
+def test_soft_delete_queues_purge(client, routine, monkeypatch):
+    monkeypatch.setattr(users_main, "PURGE_THRESHOLD_ROWS", 10)
+    # Left queued, so the user is still there to look at
+    monkeypatch.setattr(users_main.job_runner, "submit", lambda id: None)
+    response = client.post("/api/users/delete", headers=routine["headers"])
+    assert response.status_code == 200, response.text
+
+    with SessionLocal() as db:
+        db_user = db.get(models.BBR_User, routine["user_id"])
+        assert db_user.disabled and db_user.deleted_at is not None
+        jobs = db.execute(
+            select(models.BBR_Job.kind, models.BBR_Job.status).where(
+                models.BBR_Job.user_id == routine["user_id"]
+            )
+        ).all()
+    assert jobs == [("purge_user", "queued")]
@@ -0,0 +1,25 @@
+from backend.api.src.routes.health.warmup import warm_up
+
+
+def test_ready_after_warm_up(client, routine, statement_recorder):
+    warm_up.ready.clear()
+    assert client.get("/api/health").status_code == 200
+    assert client.get("/api/health/ready").status_code == 503
+
+    warm_up.run()
+    response = client.get("/api/health/ready")
+    assert response.status_code == 200
+    assert set(response.json()["steps_ms"]) == {
+        "connections",
+        "password_hashing",
+        "statements",
+        "catalog",
+    }
+
+    # Categories are loaded, validating one needs no query
+    statement_recorder.active = True
+    client.post(
+        f"/api/taskcategories/{routine['category_id']}"
+    ).raise_for_status()
+    statement_recorder.active = False
+    assert statement_recorder.statements == []